@@ -1,51 +1,308 @@
-from argparse import ArgumentParser
+import sys
+from argparse import SUPPRESS, Action, ArgumentParser, Namespace
+from contextlib import ExitStack
 from logging import DEBUG, INFO
+from os import getenv
+from typing import TYPE_CHECKING, Any, Dict, NoReturn, Sequence, TextIO, Union
 
-from ansible_generator.main import AnsibleGenerator
-from ansible_generator.version import __version__
+from ansible_generator.files import NATIVE_ROLE_BACKEND, ROLE_BACKENDS
 
+if TYPE_CHECKING:
+    from ansible_generator.main import AnsibleGenerator
+    from ansible_generator.version import __version__
 
-def cli() -> None:
-    """Run the CLI and application function via ArgumentParser."""
-    try:
-        parser = ArgumentParser(
-            prog="ansible-generate",
-            description="Generate an ansible playbook directory structure",
-        )
-        parser.add_argument(
-            "-a", "--alternate-layout", action="store_true", dest="alternate_layout"
-        )
-        parser.add_argument(
-            "-i",
-            "--inventories",
-            nargs="+",
-            default=["production", "staging"],
-            dest="inventories",
-            type=str,
-        )
-        parser.add_argument(
-            "-r", "--roles", nargs="+", default=[], dest="roles", type=str
-        )
-        parser.add_argument("-v", "--verbose", action="store_true", dest="verbosity")
-        parser.add_argument(
-            "-p", "--projects", nargs="+", default=[], dest="projects", type=str
+__all__ = ["AnsibleGenerator", "__version__", "cli"]
+
+
+def __getattr__(name: str) -> Any:
+    """Lazily import the generator so that ``--version`` only loads the CLI.
+
+    Args:
+        name: The name of the attribute being accessed.
+
+    Raises:
+        AttributeError: The attribute does not exist.
+
+    Returns:
+        Any: The requested attribute.
+    """
+    if name == "AnsibleGenerator":
+        from ansible_generator.main import AnsibleGenerator
+
+        return AnsibleGenerator
+    if name == "__version__":
+        from ansible_generator.version import __version__
+
+        return __version__
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class VersionAction(Action):
+    """Print the version, only reading the package metadata when requested."""
+
+    def __init__(
+        self,
+        option_strings: Sequence[str],
+        dest: str = SUPPRESS,
+        default: str = SUPPRESS,
+        help: str = "show program's version number and exit",
+    ) -> None:
+        """Initialize a VersionAction instance
+
+        Args:
+            option_strings: The option strings which trigger the action.
+            dest (optional): The namespace attribute. Defaults to SUPPRESS.
+            default (optional): The default value. Defaults to SUPPRESS.
+            help (optional): The help text. Defaults to argparse's version help.
+        """
+        super().__init__(
+            option_strings=option_strings,
+            dest=dest,
+            default=default,
+            nargs=0,
+            help=help,
         )
-        parser.add_argument(
-            "--version",
-            action="version",
-            version=f"%(prog)s {__version__}",
+
+    def __call__(
+        self,
+        parser: ArgumentParser,
+        namespace: Namespace,
+        values: Union[str, Sequence[Any], None],
+        option_string: Union[str, None] = None,
+    ) -> NoReturn:
+        """Print the program version and exit.
+
+        Args:
+            parser: The argument parser.
+            namespace: The parsed arguments so far.
+            values: The option's values, unused.
+            option_string (optional): The option string used. Defaults to None.
+        """
+        from ansible_generator.version import __version__
+
+        print(f"{parser.prog} {__version__}")
+        parser.exit()
+
+
+def cli(argv: Union[Sequence[str], None] = None) -> None:
+    """Run the CLI and application function via ArgumentParser.
+
+    ``ansible-generate serve`` starts a generation server instead, and
+    ``--server`` forwards the arguments to a running server, on the default
+    socket unless a socket path is given.
+
+    Args:
+        argv (optional): The command line arguments. Defaults to None, which
+            uses ``sys.argv``.
+    """
+    try:
+        arguments = sys.argv[1:] if argv is None else list(argv)
+        if arguments[:1] == ["serve"]:
+            from ansible_generator.server import serve_cli
+
+            serve_cli(argv=arguments[1:])
+            return
+
+        parser = build_parser()
+        args = parser.parse_args(arguments)
+        if args.server is not None:
+            from ansible_generator.client import forward, get_default_socket
+
+            raise SystemExit(
+                forward(
+                    address=args.server or get_default_socket(),
+                    argv=arguments,
+                    stdin=(
+                        sys.stdin.read()
+                        if "-" in (args.spec, args.projects_from)
+                        else None
+                    ),
+                )
+            )
+        execute(
+            parser=parser,
+            args=args,
+            stdin=sys.stdin,
+            stdout=sys.stdout,
+            stderr=sys.stderr,
         )
+    except KeyboardInterrupt:
+        print("Interrupt detected, exiting...")
+
+
+def build_parser() -> ArgumentParser:
+    """Build the CLI argument parser.
+
+    Returns:
+        ArgumentParser: The parser.
+    """
+    parser = ArgumentParser(
+        prog="ansible-generate",
+        description="Generate an ansible playbook directory structure",
+    )
+    parser.add_argument(
+        "-a", "--alternate-layout", action="store_true", dest="alternate_layout"
+    )
+    parser.add_argument(
+        "-i",
+        "--inventories",
+        nargs="+",
+        default=["production", "staging"],
+        dest="inventories",
+        type=str,
+    )
+    parser.add_argument("-r", "--roles", nargs="+", default=[], dest="roles", type=str)
+    parser.add_argument(
+        "--role-backend",
+        choices=ROLE_BACKENDS,
+        default=NATIVE_ROLE_BACKEND,
+        dest="role_backend",
+    )
+    parser.add_argument("--role-skeleton", default=None, dest="role_skeleton", type=str)
+    parser.add_argument("-j", "--jobs", default=1, dest="jobs", type=int)
+    parser.add_argument("-n", "--dry-run", action="store_true", dest="dry_run")
+    parser.add_argument("-v", "--verbose", action="store_true", dest="verbosity")
+    parser.add_argument(
+        "-p", "--projects", nargs="+", default=[], dest="projects", type=str
+    )
+    parser.add_argument("--projects-from", default=None, dest="projects_from", type=str)
+    parser.add_argument("-s", "--spec", default=None, dest="spec", type=str)
+    parser.add_argument("--content", action="store_true", dest="content")
+    parser.add_argument("--templates", default=None, dest="templates", type=str)
+    parser.add_argument("--no-manifest", action="store_true", dest="no_manifest")
+    parser.add_argument("--touch", action="store_true", dest="touch")
+    parser.add_argument("--atomic", action="store_true", dest="atomic")
+    parser.add_argument("-k", "--keep-going", action="store_true", dest="keep_going")
+    parser.add_argument("--shards", default=1, dest="shards", type=int)
+    parser.add_argument("--archive", default=None, dest="archive", type=str)
+    parser.add_argument(
+        "--archive-format",
+        choices=("tar.gz", "zip"),
+        default=None,
+        dest="archive_format",
+    )
+    parser.add_argument(
+        "--stats", nargs="?", const="-", default=None, dest="stats", type=str
+    )
+    parser.add_argument(
+        "--server",
+        nargs="?",
+        const="",
+        default=getenv("ANSIBLE_GENERATE_SERVER"),
+        dest="server",
+        type=str,
+    )
+    parser.add_argument("--version", action=VersionAction)
+
+    return parser
+
+
+def execute(
+    parser: ArgumentParser,
+    args: Namespace,
+    stdin: TextIO,
+    stdout: TextIO,
+    stderr: TextIO,
+) -> None:
+    """Generate the layout described by parsed CLI arguments.
 
-        args = parser.parse_args()
+    Args:
+        parser: The parser the arguments came from, used to report errors.
+        args: The parsed arguments.
+        stdin: The stream read for ``--spec -`` and ``--projects-from -``.
+        stdout: The stream reports are written to.
+        stderr: The stream failures are written to.
+
+    Raises:
+        SystemExit: Any project failed with ``--keep-going`` or ``--shards``.
+    """
+    from ansible_generator.executor import FailureReport
+    from ansible_generator.main import AnsibleGenerator
+    from ansible_generator.manifest import MANIFEST_NAME
+    from ansible_generator.spec import SpecError, load_spec
+    from ansible_generator.utilities import read_names
+
+    specs = None
+    if args.spec is not None:
+        try:
+            specs = load_spec(args.spec, stdin=stdin)
+        except SpecError as e:
+            parser.error(str(e))
+
+    templates = None
+    if args.content or args.templates is not None:
+        from ansible_generator.content import LayoutTemplates, TemplateError
+
+        try:
+            templates = (
+                LayoutTemplates()
+                if args.templates is None
+                else LayoutTemplates.from_directory(args.templates)
+            )
+        except TemplateError as e:
+            parser.error(str(e))
+
+    verbosity = DEBUG if args.verbosity else INFO
+    with ExitStack() as stack:
+        project_stream = None
+        if args.projects_from == "-":
+            project_stream = read_names(stdin)
+        elif args.projects_from is not None:
+            try:
+                projects_file = stack.enter_context(
+                    open(args.projects_from, encoding="utf-8")
+                )
+            except OSError as e:
+                parser.error(f"failed to read projects {args.projects_from}: {e}")
+            project_stream = read_names(projects_file)
 
-        verbosity = DEBUG if args.verbosity else INFO
         generator = AnsibleGenerator(
             inventories=args.inventories,
             alternate_layout=args.alternate_layout,
             projects=args.projects,
             roles=args.roles,
             verbosity=verbosity,
+            role_backend=args.role_backend,
+            role_skeleton=args.role_skeleton,
+            jobs=args.jobs,
+            specs=specs,
+            project_stream=project_stream,
+            manifest=None if args.no_manifest else MANIFEST_NAME,
+            create_only=not args.touch,
+            atomic=args.atomic,
+            archive=args.archive,
+            archive_format=args.archive_format,
+            keep_going=args.keep_going,
+            shards=args.shards,
+            templates=templates,
         )
-        generator.run()
-    except KeyboardInterrupt:
-        print("Interrupt detected, exiting...")
+        report = generator.run(dry_run=args.dry_run)
+        if args.stats is not None:
+            write_stats(
+                path=args.stats,
+                stats=generator.stats.to_dict(),
+                stream=stderr if args.archive == "-" else stdout,
+            )
+        if isinstance(report, FailureReport):
+            if report:
+                print(report.format(), file=stderr)
+                raise SystemExit(1)
+        elif report is not None:
+            print(report.format(), file=stdout)
+
+
+def write_stats(path: str, stats: Dict[str, Any], stream: TextIO) -> None:
+    """Write run stats as JSON.
+
+    Args:
+        path: The stats path, or ``-`` for ``stream``.
+        stats: The serialized run stats.
+        stream: The stream to write to when the path is ``-``.
+    """
+    from json import dumps
+
+    if path != "-":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(dumps(stats, indent=2) + "\n")
+        return
+    print(dumps(stats), file=stream)
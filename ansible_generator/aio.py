@@ -0,0 +1,241 @@
+"""aio applies layout plans from asyncio code without blocking the event loop.
+
+Filesystem work runs in batches on the event loop's default executor and the
+ansible-galaxy skeleton is generated with an asyncio subprocess. Cancelling a
+task stops it once the batch in progress has finished, so no worker thread is
+left writing to the layout.
+"""
+from asyncio import CancelledError, Semaphore, gather, get_running_loop, shield, wait
+from functools import partial
+from logging import Logger
+from typing import TYPE_CHECKING, Callable, TypeVar, Union
+
+from ansible_generator.backends import DiskBackend, FilesystemBackend
+from ansible_generator.dirfd import split_path
+from ansible_generator.executor import FailureReport, collect_failures, count_skipped
+from ansible_generator.files import GALAXY_ROLE_BACKEND, NATIVE_ROLE_BACKEND
+from ansible_generator.plan import LayoutPlan
+from ansible_generator.utilities import iter_batches
+
+if TYPE_CHECKING:
+    from ansible_generator.content import FileContents
+    from ansible_generator.stats import RunStats
+
+T = TypeVar("T")
+
+# The number of directories or files created by each executor call. Roles are
+# created in batches of ``jobs`` instead, as each one writes a whole skeleton.
+ASYNC_BATCH_SIZE = 256
+
+
+async def offload(function: Callable[[], T]) -> T:
+    """Run a blocking function on the event loop's default executor.
+
+    If the awaiting task is cancelled, the function is allowed to finish before
+    the cancellation is raised.
+
+    Args:
+        function: The function to call.
+
+    Returns:
+        T: The function's result.
+    """
+    future = get_running_loop().run_in_executor(None, function)
+    try:
+        return await shield(future)
+    except CancelledError:
+        await wait([future])
+        raise
+
+
+async def apply_plan_async(
+    plan: LayoutPlan,
+    logger: Logger,
+    role_backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    jobs: int = 1,
+    create_only: bool = True,
+    backend: Union[FilesystemBackend, None] = None,
+    stats: Union["RunStats", None] = None,
+    contents: Union["FileContents", None] = None,
+    batch_size: int = ASYNC_BATCH_SIZE,
+) -> bool:
+    """Create the directories, files and roles described by the plan, one batch
+    at a time.
+
+    Args:
+        plan: The layout plan to apply.
+        logger: A logger.
+        role_backend (optional): The role creation backend, either ``native`` or
+            ``galaxy``. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            role backend. Defaults to None.
+        jobs (optional): The number of directory groups, file groups or roles
+            each batch creates concurrently. Defaults to 1.
+        create_only (optional): Leave existing files and their times untouched
+            rather than updating their times. Defaults to True.
+        backend (optional): The filesystem backend to apply the plan to.
+            Defaults to None, which uses the disk relative to the current
+            working directory.
+        stats (optional): Run stats to record phase times and counts in.
+            Defaults to None.
+        contents (optional): The renderer for the content written to new
+            files. Defaults to None, which leaves them empty.
+        batch_size (optional): The number of directories or files created by
+            each executor call. Defaults to ASYNC_BATCH_SIZE.
+
+    Returns:
+        bool: True if the plan was applied successfully, False otherwise.
+    """
+    from ansible_generator.stats import RunStats
+
+    logger.debug('msg="applying plan asynchronously" plan="%s"', plan)
+    if backend is None:
+        backend = DiskBackend()
+    stats = RunStats() if stats is None else stats
+    with stats.phase("preflight"):
+        missing = await offload(
+            partial(
+                backend.remove_existing,
+                plan=plan,
+                logger=logger,
+                skip_files=create_only,
+            )
+        )
+    count_skipped(stats=stats, plan=plan, missing=missing)
+
+    # batches are created in order, so parents come before their children
+    with stats.phase("directories"):
+        for batch in iter_batches(
+            sorted(missing.directories, key=split_path), batch_size
+        ):
+            if not await offload(
+                partial(
+                    backend.create_directories,
+                    logger=logger,
+                    dir_paths=batch,
+                    jobs=jobs,
+                )
+            ):
+                return False
+            stats.count("directories", created=len(batch))
+    with stats.phase("files"):
+        for batch in iter_batches(sorted(missing.files, key=split_path), batch_size):
+            if not await offload(
+                partial(
+                    backend.create_files,
+                    logger=logger,
+                    filenames=batch,
+                    create_only=create_only,
+                    jobs=jobs,
+                    contents=contents,
+                    stats=stats,
+                )
+            ):
+                return False
+            stats.count("files", created=len(batch))
+    with stats.phase("roles"):
+        if missing.roles and role_backend == GALAXY_ROLE_BACKEND:
+            from ansible_generator.galaxy import aget_galaxy_skeleton
+
+            # generate the skeleton here, so that workers only copy it
+            if (
+                await aget_galaxy_skeleton(logger=logger, role_skeleton=role_skeleton)
+                is None
+            ):
+                return False
+        for roles in iter_batches(sorted(missing.roles), max(jobs, 1)):
+            if not await offload(
+                partial(
+                    backend.create_roles,
+                    logger=logger,
+                    roles=roles,
+                    role_backend=role_backend,
+                    role_skeleton=role_skeleton,
+                    jobs=jobs,
+                    stats=stats,
+                )
+            ):
+                return False
+    return True
+
+
+async def apply_plan_keep_going_async(
+    plan: LayoutPlan,
+    logger: Logger,
+    role_backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    jobs: int = 1,
+    create_only: bool = True,
+    backend: Union[FilesystemBackend, None] = None,
+    stats: Union["RunStats", None] = None,
+    contents: Union["FileContents", None] = None,
+) -> FailureReport:
+    """Apply each project of a plan independently, continuing past failures.
+
+    Up to ``jobs`` projects are applied concurrently as tasks on the event
+    loop, and their output is emitted in order once every project has finished.
+
+    Args:
+        plan: The layout plan to apply.
+        logger: A logger.
+        role_backend (optional): The role creation backend, either ``native`` or
+            ``galaxy``. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            role backend. Defaults to None.
+        jobs (optional): The number of projects to apply concurrently.
+            Defaults to 1.
+        create_only (optional): Leave existing files and their times untouched
+            rather than updating their times. Defaults to True.
+        backend (optional): The filesystem backend to apply the plan to.
+            Defaults to None, which uses the disk relative to the current
+            working directory.
+        stats (optional): Run stats to record phase times and counts in.
+            Defaults to None.
+        contents (optional): The renderer for the content written to new
+            files. Defaults to None, which leaves them empty.
+
+    Returns:
+        FailureReport: The errors of every project which failed.
+    """
+    from logging import ERROR
+    from logging.handlers import BufferingHandler
+    from sys import maxsize
+
+    partitions = plan.partition()
+    semaphore = Semaphore(max(jobs, 1))
+    if plan.roles and role_backend == GALAXY_ROLE_BACKEND:
+        from ansible_generator.galaxy import aget_galaxy_skeleton
+
+        # populate the skeleton cache once rather than once per project
+        await aget_galaxy_skeleton(logger=logger, role_skeleton=role_skeleton)
+
+    async def apply_partition(name: str, partition: LayoutPlan) -> BufferingHandler:
+        output = BufferingHandler(capacity=maxsize)
+        partition_logger = Logger(name=logger.name, level=logger.getEffectiveLevel())
+        partition_logger.addHandler(output)
+        async with semaphore:
+            try:
+                success = await apply_plan_async(
+                    plan=partition,
+                    logger=partition_logger,
+                    role_backend=role_backend,
+                    role_skeleton=role_skeleton,
+                    create_only=create_only,
+                    backend=backend,
+                    stats=stats,
+                    contents=contents,
+                )
+            except Exception:
+                partition_logger.error("failed to apply %s", name, exc_info=True)
+                success = False
+        if not success and not any(record.levelno >= ERROR for record in output.buffer):
+            partition_logger.error("failed to apply %s", name)
+        return output
+
+    outputs = await gather(
+        *(apply_partition(name, partition) for name, partition in partitions.items())
+    )
+    return collect_failures(
+        logger=logger, names=list(partitions), outputs=outputs, level=ERROR
+    )
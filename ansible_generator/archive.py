@@ -0,0 +1,276 @@
+"""archive streams a layout plan into a tar.gz or zip archive.
+
+Nothing is written to disk: directories and files come straight from the plan
+and file contents and role files are rendered in memory, so the archive can be
+written to stdout or any other stream.
+"""
+from io import BufferedIOBase, BytesIO
+from logging import Logger
+from stat import S_IFDIR, S_IFREG
+from tarfile import DIRTYPE, TarFile, TarInfo
+from tarfile import open as open_tar
+from time import localtime, time
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, BinaryIO, Set, Type, Union
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from ansible_generator.files import (
+    DIRECTORY_MODE,
+    FILE_MODE,
+    NATIVE_ROLE_BACKEND,
+    iter_role_entries,
+)
+from ansible_generator.plan import LayoutPlan
+
+if TYPE_CHECKING:
+    from ansible_generator.content import FileContents
+
+TAR_FORMAT = "tar.gz"
+ZIP_FORMAT = "zip"
+ARCHIVE_FORMATS = (TAR_FORMAT, ZIP_FORMAT)
+
+
+def get_archive_format(path: str) -> str:
+    """Choose an archive format from an output path.
+
+    Args:
+        path: The output path, or ``-`` for stdout.
+
+    Returns:
+        str: ``zip`` for ``.zip`` paths, otherwise ``tar.gz``.
+    """
+    return ZIP_FORMAT if path.lower().endswith(".zip") else TAR_FORMAT
+
+
+class GuardedOutput(BufferedIOBase):
+    """A GuardedOutput passes writes through to a stream until it is aborted,
+    after which they are dropped so that an incomplete archive is never
+    finished off as though it were whole. Closing it leaves the stream open.
+    """
+
+    output: BinaryIO
+    aborted: bool
+
+    def __init__(self, output: BinaryIO) -> None:
+        """Initialize a GuardedOutput instance
+
+        Args:
+            output: The binary stream to write to.
+        """
+        super().__init__()
+        self.output = output
+        self.aborted = False
+
+    def writable(self) -> bool:
+        """Report that the output accepts writes.
+
+        Returns:
+            bool: Always True.
+        """
+        return True
+
+    def write(self, data: Any) -> int:
+        """Write to the stream unless aborted.
+
+        Args:
+            data: The bytes to write.
+
+        Returns:
+            int: The number of bytes accepted.
+        """
+        if self.aborted:
+            return len(data)
+        return self.output.write(data)
+
+    def flush(self) -> None:
+        """Flush the stream unless aborted or already closed."""
+        if not self.aborted and not self.output.closed:
+            self.output.flush()
+
+
+class ArchiveWriter:
+    """An ArchiveWriter adds directories and files to a tar.gz or zip stream,
+    adding every missing parent directory first so the archive extracts with
+    the expected permissions.
+    """
+
+    archive: Union[TarFile, ZipFile]
+    output: GuardedOutput
+    mtime: float
+    directories: Set[str]
+
+    def __init__(
+        self,
+        output: BinaryIO,
+        archive_format: str = TAR_FORMAT,
+        mtime: Union[float, None] = None,
+    ) -> None:
+        """Initialize an ArchiveWriter instance
+
+        Args:
+            output: The binary stream to write to. It does not need to be
+                seekable.
+            archive_format (optional): Either ``tar.gz`` or ``zip``. Defaults to
+                ``tar.gz``.
+            mtime (optional): The modification time of every entry. Defaults to
+                None, which uses the current time.
+
+        Raises:
+            ValueError: The archive format is not supported.
+        """
+        self.output = GuardedOutput(output)
+        if archive_format == TAR_FORMAT:
+            self.archive = open_tar(fileobj=self.output, mode="w|gz")
+        elif archive_format == ZIP_FORMAT:
+            self.archive = ZipFile(self.output, mode="w", compression=ZIP_DEFLATED)
+        else:
+            raise ValueError(f"unsupported archive format {archive_format}")
+        self.mtime = time() if mtime is None else mtime
+        self.directories = set()
+
+    def __enter__(self) -> "ArchiveWriter":
+        """Enter the writer's context.
+
+        Returns:
+            ArchiveWriter: The writer.
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Union[Type[BaseException], None],
+        exc_value: Union[BaseException, None],
+        traceback: Union[TracebackType, None],
+    ) -> None:
+        """Finish the archive, or abandon it if an exception was raised.
+
+        Args:
+            exc_type: The exception type, if any.
+            exc_value: The exception, if any.
+            traceback: The traceback, if any.
+        """
+        if exc_type is not None:
+            self.abort()
+        self.archive.close()
+
+    def abort(self) -> None:
+        """Abandon the archive, so that nothing more is written to the output
+        and the archive is left without its end-of-archive records.
+        """
+        self.output.aborted = True
+
+    def add_directory(self, path: str, mode: int = DIRECTORY_MODE) -> None:
+        """Add a directory and its parents, unless already added.
+
+        Args:
+            path: The directory path within the archive.
+            mode (optional): The permission bits. Defaults to 0o755.
+        """
+        if not path or path in self.directories:
+            return
+        parent = path.rpartition("/")[0]
+        self.add_directory(parent)
+        self.directories.add(path)
+        self.add(path=path, content=None, mode=mode)
+
+    def add_file(self, path: str, content: bytes = b"", mode: int = FILE_MODE) -> None:
+        """Add a file and its parent directories.
+
+        Args:
+            path: The file path within the archive.
+            content (optional): The file content. Defaults to empty.
+            mode (optional): The permission bits. Defaults to 0o644.
+        """
+        self.add_directory(path.rpartition("/")[0])
+        self.add(path=path, content=content, mode=mode)
+
+    def add(self, path: str, content: Union[bytes, None], mode: int) -> None:
+        """Write a single entry.
+
+        Args:
+            path: The entry's path within the archive.
+            content: The file content, or None for a directory.
+            mode: The permission bits.
+        """
+        if isinstance(self.archive, TarFile):
+            info = TarInfo(name=path)
+            info.mtime = int(self.mtime)
+            info.mode = mode
+            if content is None:
+                info.type = DIRTYPE
+                self.archive.addfile(info)
+            else:
+                info.size = len(content)
+                self.archive.addfile(info, BytesIO(content))
+            return
+
+        date_time = localtime(self.mtime)[:6]
+        if content is None:
+            zip_info = ZipInfo(filename=f"{path}/", date_time=date_time)
+            # the low byte holds the MS-DOS directory attribute
+            zip_info.external_attr = ((S_IFDIR | mode) << 16) | 0x10
+            self.archive.writestr(zip_info, b"")
+        else:
+            zip_info = ZipInfo(filename=path, date_time=date_time)
+            zip_info.external_attr = (S_IFREG | mode) << 16
+            zip_info.compress_type = ZIP_DEFLATED
+            self.archive.writestr(zip_info, content)
+
+
+def write_plan(
+    plan: LayoutPlan,
+    writer: ArchiveWriter,
+    logger: Logger,
+    role_backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    contents: Union["FileContents", None] = None,
+) -> bool:
+    """Add the directories, files and roles described by the plan to an archive.
+
+    Args:
+        plan: The layout plan to archive. Every path must be relative and must
+            not contain ``..``.
+        writer: The archive writer.
+        logger: A logger.
+        role_backend (optional): The role creation backend, either ``native`` or
+            ``galaxy``. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            role backend. Defaults to None.
+        contents (optional): The renderer for the content of each file.
+            Defaults to None, which leaves them empty.
+
+    Returns:
+        bool: True if the plan was archived successfully, False otherwise.
+    """
+    logger.debug('msg="archiving plan" plan="%s"', plan)
+    for path in (*plan.directories, *plan.files, *(d for d, _ in plan.roles)):
+        if path.startswith("/") or ".." in path.split("/"):
+            logger.error("archives require relative paths, found %s", path)
+            return False
+
+    for directory in plan.directories:
+        logger.info("adding directory %s", directory)
+        writer.add_directory(directory)
+    for filename in plan.files:
+        logger.info("adding file %s", filename)
+        writer.add_file(
+            filename, content=b"" if contents is None else contents.render(filename)
+        )
+    for directory, rolename in plan.roles:
+        role_path = f"{directory}/{rolename}"
+        logger.info("adding role %s", role_path)
+        entries = iter_role_entries(
+            rolename=rolename,
+            logger=logger,
+            backend=role_backend,
+            role_skeleton=role_skeleton,
+        )
+        if entries is None:
+            return False
+        for relative_path, content, mode in entries:
+            path = role_path if relative_path == "." else f"{role_path}/{relative_path}"
+            if content is None:
+                writer.add_directory(path, mode=mode)
+            else:
+                writer.add_file(path, content=content, mode=mode)
+    return True
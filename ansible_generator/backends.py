@@ -0,0 +1,663 @@
+"""backends are the filesystems a layout plan can be applied to.
+
+The disk backend creates the layout relative to a base directory, while the
+memory backend keeps it in dictionaries so that layouts can be rendered,
+previewed or compared without touching disk.
+"""
+import posixpath
+from abc import ABC, abstractmethod
+from functools import partial
+from logging import Logger
+from pathlib import Path
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from ansible_generator.directories import create_directories, log_directory_error
+from ansible_generator.dirfd import (
+    create_directories_at,
+    dir_fd_supported,
+    split_path,
+    touch_files_at,
+)
+from ansible_generator.files import (
+    NATIVE_ROLE_BACKEND,
+    create_roles,
+    iter_role_entries,
+    touch_files,
+)
+from ansible_generator.plan import LayoutPlan
+from ansible_generator.preflight import PreflightIndex, remove_existing
+from ansible_generator.utilities import PathResolver
+
+if TYPE_CHECKING:
+    from ansible_generator.content import FileContents
+    from ansible_generator.stats import RunStats
+
+# The existing directories, files and roles of a plan.
+Existing = Tuple[List[str], List[str], List[Tuple[str, str]]]
+
+
+class FilesystemBackend(ABC):
+    """A FilesystemBackend creates the entries of a layout plan. Paths are
+    relative to the backend's base directory unless they are absolute.
+    """
+
+    @abstractmethod
+    def existing(self, plan: LayoutPlan) -> Existing:
+        """Find the entries of a plan which already exist.
+
+        Args:
+            plan: The layout plan to check.
+
+        Returns:
+            Existing: The existing directories, files and roles.
+        """
+        ...
+
+    def remove_existing(
+        self, plan: LayoutPlan, logger: Logger, skip_files: bool = True
+    ) -> LayoutPlan:
+        """Drop every planned entry which already exists.
+
+        Args:
+            plan: The layout plan to check.
+            logger: A logger.
+            skip_files (optional): Drop existing files too. Defaults to True.
+
+        Returns:
+            LayoutPlan: A plan containing only the missing entries.
+        """
+        directories, files, roles = self.existing(plan)
+        for path in directories:
+            logger.info("directory %s exists", path)
+        if skip_files:
+            for path in files:
+                logger.info("file %s exists", path)
+        return LayoutPlan(
+            directories=set(plan.directories).difference(directories),
+            files=set(plan.files).difference(files if skip_files else ()),
+            roles=set(plan.roles).difference(roles),
+        )
+
+    @abstractmethod
+    def create_directories(
+        self, logger: Logger, dir_paths: Sequence[str], jobs: int = 1
+    ) -> bool:
+        """Create directories and their parents, stopping on the first failure.
+
+        Args:
+            logger: A logger.
+            dir_paths: The directory paths.
+            jobs (optional): The number of directories to create concurrently,
+                where supported. Defaults to 1.
+
+        Returns:
+            bool: True if every directory was created, False otherwise.
+        """
+        ...
+
+    @abstractmethod
+    def create_files(
+        self,
+        logger: Logger,
+        filenames: Sequence[str],
+        create_only: bool = True,
+        jobs: int = 1,
+        contents: Union["FileContents", None] = None,
+        stats: Union["RunStats", None] = None,
+    ) -> bool:
+        """Create files, stopping on the first failure.
+
+        Args:
+            logger: A logger.
+            filenames: The file paths.
+            create_only (optional): Leave existing files untouched rather than
+                updating their times. Defaults to True.
+            jobs (optional): The number of files to create concurrently, where
+                supported. Defaults to 1.
+            contents (optional): The renderer for the content written to new or
+                empty files. Defaults to None, which leaves them empty.
+            stats (optional): Run stats to record bytes written in. Defaults to
+                None.
+
+        Returns:
+            bool: True if every file was created, False otherwise.
+        """
+        ...
+
+    @abstractmethod
+    def create_roles(
+        self,
+        logger: Logger,
+        roles: Sequence[Tuple[str, str]],
+        role_backend: str = NATIVE_ROLE_BACKEND,
+        role_skeleton: Union[str, None] = None,
+        jobs: int = 1,
+        stats: Union["RunStats", None] = None,
+    ) -> bool:
+        """Create roles, stopping on the first failure.
+
+        Args:
+            logger: A logger.
+            roles: The ``(directory, rolename)`` pairs to create.
+            role_backend (optional): The role creation backend, either ``native``
+                or ``galaxy``. Defaults to ``native``.
+            role_skeleton (optional): A custom role skeleton path for the
+                ``galaxy`` role backend. Defaults to None.
+            jobs (optional): The number of roles to create concurrently, where
+                supported. Defaults to 1.
+            stats (optional): Run stats to record role latencies and bytes
+                written in. Defaults to None.
+
+        Returns:
+            bool: True if every role was created, False otherwise.
+        """
+        ...
+
+
+class DiskBackend(FilesystemBackend):
+    """A DiskBackend creates layouts on disk, relative to directory fds where
+    the platform supports them.
+    """
+
+    base: Path
+
+    def __init__(self, base: Union[Path, None] = None) -> None:
+        """Initialize a DiskBackend instance
+
+        Args:
+            base (optional): The directory relative paths are created in.
+                Defaults to None, which uses the current working directory.
+        """
+        self.base = Path.cwd() if base is None else base
+
+    def existing(self, plan: LayoutPlan) -> Existing:
+        """Find the entries of a plan which already exist with a preflight scan.
+
+        Args:
+            plan: The layout plan to check.
+
+        Returns:
+            Existing: The existing directories, files and roles.
+        """
+        return PreflightIndex(base=self.base).existing(plan)
+
+    def remove_existing(
+        self, plan: LayoutPlan, logger: Logger, skip_files: bool = True
+    ) -> LayoutPlan:
+        """Drop every planned entry which exists, reading each directory once.
+
+        Args:
+            plan: The layout plan to check.
+            logger: A logger.
+            skip_files (optional): Drop existing files too. Defaults to True.
+
+        Returns:
+            LayoutPlan: A plan containing only the missing entries.
+        """
+        return remove_existing(
+            plan=plan,
+            logger=logger,
+            index=PreflightIndex(base=self.base),
+            skip_files=skip_files,
+        )
+
+    def create_directories(
+        self, logger: Logger, dir_paths: Sequence[str], jobs: int = 1
+    ) -> bool:
+        """Create directories on disk, stopping on the first failure.
+
+        With more than one job, the directories are grouped by parent and the
+        groups are created concurrently, so that several round trips to a
+        network filesystem are outstanding at once.
+
+        Args:
+            logger: A logger.
+            dir_paths: The directory paths.
+            jobs (optional): The number of groups of directories to create
+                concurrently. Defaults to 1.
+
+        Returns:
+            bool: True if every directory was created, False otherwise.
+        """
+        if jobs > 1:
+            return apply_grouped(
+                logger=logger,
+                function=self.create_directories,
+                groups=group_by_parent(dir_paths),
+                jobs=jobs,
+            )
+        if dir_fd_supported():
+            return create_directories_at(
+                logger=logger, dir_paths=dir_paths, base=self.base
+            )
+        return create_directories(
+            logger=logger, dir_paths=dir_paths, resolver=PathResolver(base=self.base)
+        )
+
+    def create_files(
+        self,
+        logger: Logger,
+        filenames: Sequence[str],
+        create_only: bool = True,
+        jobs: int = 1,
+        contents: Union["FileContents", None] = None,
+        stats: Union["RunStats", None] = None,
+    ) -> bool:
+        """Create files on disk, stopping on the first failure.
+
+        With more than one job, the files are grouped by parent and the groups
+        are created concurrently.
+
+        Args:
+            logger: A logger.
+            filenames: The file paths.
+            create_only (optional): Leave existing files untouched rather than
+                updating their times. Defaults to True.
+            jobs (optional): The number of groups of files to create
+                concurrently. Defaults to 1.
+            contents (optional): The renderer for the content written to new or
+                empty files. Defaults to None, which leaves them empty.
+            stats (optional): Run stats to record bytes written in. Defaults to
+                None.
+
+        Returns:
+            bool: True if every file was created, False otherwise.
+        """
+        if jobs > 1:
+            return apply_grouped(
+                logger=logger,
+                function=partial(
+                    self.create_files,
+                    create_only=create_only,
+                    contents=contents,
+                    stats=stats,
+                ),
+                groups=group_by_parent(filenames),
+                jobs=jobs,
+            )
+        if dir_fd_supported():
+            return touch_files_at(
+                logger=logger,
+                filenames=filenames,
+                base=self.base,
+                create_only=create_only,
+                contents=contents,
+                stats=stats,
+            )
+        return touch_files(
+            logger=logger,
+            filenames=filenames,
+            resolver=PathResolver(base=self.base),
+            create_only=create_only,
+            contents=contents,
+            stats=stats,
+        )
+
+    def create_roles(
+        self,
+        logger: Logger,
+        roles: Sequence[Tuple[str, str]],
+        role_backend: str = NATIVE_ROLE_BACKEND,
+        role_skeleton: Union[str, None] = None,
+        jobs: int = 1,
+        stats: Union["RunStats", None] = None,
+    ) -> bool:
+        """Create roles on disk, stopping on the first failure.
+
+        Args:
+            logger: A logger.
+            roles: The ``(directory, rolename)`` pairs to create.
+            role_backend (optional): The role creation backend, either ``native``
+                or ``galaxy``. Defaults to ``native``.
+            role_skeleton (optional): A custom role skeleton path for the
+                ``galaxy`` role backend. Defaults to None.
+            jobs (optional): The number of roles to create concurrently.
+                Defaults to 1.
+            stats (optional): Run stats to record role latencies and bytes
+                written in. Defaults to None.
+
+        Returns:
+            bool: True if every role was created, False otherwise.
+        """
+        resolver = PathResolver(base=self.base)
+        return create_roles(
+            role_targets=[
+                (str(resolver.resolve(directory)), rolename)
+                for directory, rolename in roles
+            ],
+            logger=logger,
+            backend=role_backend,
+            role_skeleton=role_skeleton,
+            jobs=jobs,
+            stats=stats,
+        )
+
+
+class MemoryBackend(FilesystemBackend):
+    """A MemoryBackend keeps the layout in memory. Paths are normalized, and
+    the base directory is the empty path.
+    """
+
+    directories: Set[str]
+    files: Dict[str, bytes]
+    modes: Dict[str, int]
+
+    def __init__(self) -> None:
+        """Initialize an empty MemoryBackend instance"""
+        self.directories = set()
+        self.files = {}
+        self.modes = {}
+
+    def is_dir(self, path: str) -> bool:
+        """Check whether a path is a directory.
+
+        Args:
+            path: The path.
+
+        Returns:
+            bool: True if the path is the base, the root or a created directory.
+        """
+        path = normalize(path)
+        return path in ("", "/") or path in self.directories
+
+    def exists(self, path: str) -> bool:
+        """Check whether a path exists.
+
+        Args:
+            path: The path.
+
+        Returns:
+            bool: True if the path is a directory or a file.
+        """
+        return self.is_dir(path) or normalize(path) in self.files
+
+    def read(self, path: str) -> bytes:
+        """Read a file.
+
+        Args:
+            path: The file path.
+
+        Returns:
+            bytes: The file's content.
+        """
+        return self.files[normalize(path)]
+
+    def tree(self) -> List[str]:
+        """List every entry.
+
+        Returns:
+            List[str]: The sorted paths, with directories ending in ``/``.
+        """
+        return sorted([f"{path}/" for path in self.directories] + list(self.files))
+
+    def existing(self, plan: LayoutPlan) -> Existing:
+        """Find the entries of a plan which already exist in memory.
+
+        Args:
+            plan: The layout plan to check.
+
+        Returns:
+            Existing: The existing directories, files and roles.
+        """
+        return (
+            [path for path in plan.directories if self.is_dir(path)],
+            [path for path in plan.files if self.exists(path)],
+            [
+                (directory, rolename)
+                for directory, rolename in plan.roles
+                if self.exists(posixpath.join(directory, rolename))
+            ],
+        )
+
+    def make_directory(self, path: str, mode: int = 0o755) -> None:
+        """Create a directory and its parents.
+
+        Args:
+            path: The directory path.
+            mode (optional): The permission bits. Defaults to 0o755.
+
+        Raises:
+            NotADirectoryError: The path or one of its parents is a file.
+        """
+        path = normalize(path)
+        if self.is_dir(path):
+            return
+        if path in self.files:
+            raise NotADirectoryError(path)
+        self.make_directory(posixpath.dirname(path))
+        self.directories.add(path)
+        self.modes[path] = mode
+
+    def write_file(self, path: str, content: bytes = b"", mode: int = 0o644) -> bool:
+        """Create a file and its parents, unless it exists.
+
+        Args:
+            path: The file path.
+            content (optional): The file content. Defaults to empty.
+            mode (optional): The permission bits. Defaults to 0o644.
+
+        Raises:
+            IsADirectoryError: The path is a directory.
+
+        Returns:
+            bool: True if the file was created, False if it already existed.
+        """
+        path = normalize(path)
+        if self.is_dir(path):
+            raise IsADirectoryError(path)
+        if path in self.files:
+            return False
+        self.make_directory(posixpath.dirname(path))
+        self.files[path] = content
+        self.modes[path] = mode
+        return True
+
+    def create_directories(
+        self, logger: Logger, dir_paths: Sequence[str], jobs: int = 1
+    ) -> bool:
+        """Create directories in memory, stopping on the first failure.
+
+        Args:
+            logger: A logger.
+            dir_paths: The directory paths.
+            jobs (optional): Unused, directories are created serially.
+                Defaults to 1.
+
+        Returns:
+            bool: True if every directory was created, False otherwise.
+        """
+        for dir_path in sorted(dir_paths):
+            try:
+                logger.info("creating directory %s", dir_path)
+                self.make_directory(dir_path)
+            except NotADirectoryError as e:
+                log_directory_error(logger=logger, dir_path=dir_path, error=e)
+                return False
+        return True
+
+    def create_files(
+        self,
+        logger: Logger,
+        filenames: Sequence[str],
+        create_only: bool = True,
+        jobs: int = 1,
+        contents: Union["FileContents", None] = None,
+        stats: Union["RunStats", None] = None,
+    ) -> bool:
+        """Create files in memory, stopping on the first failure.
+
+        Files have no times in memory, so ``create_only`` makes no difference.
+
+        Args:
+            logger: A logger.
+            filenames: The file paths.
+            create_only (optional): Unused. Defaults to True.
+            jobs (optional): Unused, files are created serially. Defaults to 1.
+            contents (optional): The renderer for the content written to new
+                files. Defaults to None, which leaves them empty.
+            stats (optional): Run stats to record bytes written in. Defaults to
+                None.
+
+        Returns:
+            bool: True if every file was created, False otherwise.
+        """
+        for filename in sorted(filenames):
+            content = b"" if contents is None else contents.render(filename)
+            try:
+                if self.write_file(filename, content=content):
+                    logger.info("creating file %s", filename)
+                    if content and stats is not None:
+                        stats.add_bytes(len(content))
+                else:
+                    logger.info("file %s exists", filename)
+            except OSError:
+                logger.error("failed to create file", exc_info=True)
+                return False
+        return True
+
+    def create_roles(
+        self,
+        logger: Logger,
+        roles: Sequence[Tuple[str, str]],
+        role_backend: str = NATIVE_ROLE_BACKEND,
+        role_skeleton: Union[str, None] = None,
+        jobs: int = 1,
+        stats: Union["RunStats", None] = None,
+    ) -> bool:
+        """Render roles into memory, stopping on the first failure.
+
+        Args:
+            logger: A logger.
+            roles: The ``(directory, rolename)`` pairs to create.
+            role_backend (optional): The role creation backend, either ``native``
+                or ``galaxy``. Defaults to ``native``.
+            role_skeleton (optional): A custom role skeleton path for the
+                ``galaxy`` role backend. Defaults to None.
+            jobs (optional): Unused, roles are rendered serially. Defaults to 1.
+            stats (optional): Run stats to record role latencies and bytes
+                written in. Defaults to None.
+
+        Returns:
+            bool: True if every role was created, False otherwise.
+        """
+        for directory, rolename in roles:
+            role_path = posixpath.join(directory, rolename)
+            if self.exists(role_path):
+                logger.info("role %s exists", role_path)
+                continue
+            logger.info("creating role %s", role_path)
+            start = perf_counter()
+            entries = iter_role_entries(
+                rolename=rolename,
+                logger=logger,
+                backend=role_backend,
+                role_skeleton=role_skeleton,
+            )
+            if entries is None:
+                return False
+            try:
+                for relative_path, content, mode in entries:
+                    path = posixpath.join(role_path, relative_path)
+                    if content is None:
+                        self.make_directory(path, mode=mode)
+                    else:
+                        self.write_file(path, content=content, mode=mode)
+                        if stats is not None:
+                            stats.add_bytes(len(content))
+            except OSError:
+                logger.error("failed to create role %s", role_path, exc_info=True)
+                return False
+            if stats is not None:
+                stats.record_role(seconds=perf_counter() - start)
+        return True
+
+
+def group_by_parent(paths: Iterable[str]) -> List[List[str]]:
+    """Group paths by their parent directory.
+
+    Entries with different parents only share ancestors, which are created
+    race free, so each group can be created independently of the others.
+
+    Args:
+        paths: The paths to group.
+
+    Returns:
+        List[List[str]]: The paths of each parent, sorted by component as the
+            serial backends visit them, ordered by their first path.
+    """
+    groups: Dict[str, List[str]] = {}
+    for path in paths:
+        groups.setdefault(posixpath.dirname(path.rstrip("/")), []).append(path)
+    return sorted(
+        (sorted(group, key=split_path) for group in groups.values()),
+        key=lambda group: split_path(group[0]),
+    )
+
+
+def apply_grouped(
+    logger: Logger,
+    function: Callable[..., bool],
+    groups: Sequence[Sequence[str]],
+    jobs: int,
+) -> bool:
+    """Apply a function to groups of paths on a pool of worker threads.
+
+    Each group's output is buffered and emitted in order once it has finished,
+    and the remaining groups are cancelled after the first failure.
+
+    Args:
+        logger: A logger.
+        function: Called with a ``logger`` and a group of paths, returning
+            True on success.
+        groups: The groups of paths.
+        jobs: The maximum number of groups to apply concurrently.
+
+    Returns:
+        bool: True if every group succeeded, False otherwise.
+    """
+    # imported lazily, they are only needed for concurrent creation
+    from concurrent.futures import ThreadPoolExecutor
+    from logging.handlers import BufferingHandler
+    from sys import maxsize
+
+    def apply_buffered(group: Sequence[str]) -> Tuple[bool, BufferingHandler]:
+        output = BufferingHandler(capacity=maxsize)
+        group_logger = Logger(name=logger.name, level=logger.getEffectiveLevel())
+        group_logger.addHandler(output)
+        return function(group_logger, group), output
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(apply_buffered, group) for group in groups]
+        for future in futures:
+            success, output = future.result()
+            for record in output.buffer:
+                logger.handle(record)
+            if not success:
+                for pending in futures:
+                    pending.cancel()
+                return False
+    return True
+
+
+def normalize(path: str) -> str:
+    """Normalize a path for use as a MemoryBackend key.
+
+    Args:
+        path: The path.
+
+    Returns:
+        str: The normalized path, with the base directory as ``""``.
+    """
+    path = posixpath.normpath(path)
+    return "" if path == "." else path
@@ -0,0 +1,121 @@
+"""client forwards ansible-generate invocations to a generation server."""
+import sys
+from http.client import HTTPConnection
+from typing import Sequence, Union
+
+# Generation requests may create many projects, so they are given a while.
+CLIENT_TIMEOUT = 3600
+
+# The environment variables a run depends on, which are sent with each request
+# so that a forwarded run behaves like a local one.
+FORWARDED_ENVIRONMENT = (
+    "PATH",
+    "XDG_CACHE_HOME",
+    "ANSIBLE_CONFIG",
+    "ANSIBLE_ROLE_SKELETON",
+    "DISABLE_ANSIBLE_GENERATE_TELEMETRY",
+)
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """An HTTP connection to a server listening on a Unix socket."""
+
+    def __init__(self, socket_path: str, timeout: float = CLIENT_TIMEOUT) -> None:
+        """Initialize a UnixHTTPConnection instance
+
+        Args:
+            socket_path: The path of the server's socket.
+            timeout (optional): The socket timeout in seconds. Defaults to
+                CLIENT_TIMEOUT.
+        """
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        """Connect to the server's socket."""
+        from socket import AF_UNIX, SOCK_STREAM, socket
+
+        self.sock = socket(AF_UNIX, SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def get_default_socket() -> str:
+    """Get the socket path servers listen on unless told otherwise.
+
+    Returns:
+        str: ``$XDG_RUNTIME_DIR/ansible-generator.sock``, falling back to
+            ``$XDG_CACHE_HOME/ansible-generator/server.sock`` (``~/.cache`` when
+            ``XDG_CACHE_HOME`` is not set), both private to the user.
+    """
+    from os import getenv
+    from pathlib import Path
+
+    runtime_directory = getenv("XDG_RUNTIME_DIR")
+    if runtime_directory:
+        return str(Path(runtime_directory).joinpath("ansible-generator.sock"))
+    cache_home = getenv("XDG_CACHE_HOME") or Path.home().joinpath(".cache")
+    return str(Path(cache_home).joinpath("ansible-generator", "server.sock"))
+
+
+def connect(address: str) -> HTTPConnection:
+    """Open a connection to a generation server.
+
+    Args:
+        address: The path of the server's Unix socket.
+
+    Returns:
+        HTTPConnection: The connection.
+    """
+    return UnixHTTPConnection(address)
+
+
+def forward(address: str, argv: Sequence[str], stdin: Union[str, None] = None) -> int:
+    """Run ansible-generate on a generation server, relaying its output.
+
+    The working directory and FORWARDED_ENVIRONMENT are sent along, so the
+    server runs the request as it would have run here.
+
+    Args:
+        address: The path of the server's Unix socket.
+        argv: The command line arguments.
+        stdin (optional): The text read for ``--spec -`` and
+            ``--projects-from -``. Defaults to None.
+
+    Returns:
+        int: The exit code of the run.
+    """
+    from base64 import b64decode
+    from json import dumps, loads
+    from os import environ, getcwd
+
+    env = {name: environ[name] for name in FORWARDED_ENVIRONMENT if name in environ}
+    body = dumps({"argv": list(argv), "cwd": getcwd(), "stdin": stdin, "env": env})
+    connection = connect(address)
+    try:
+        connection.request(
+            "POST",
+            "/generate",
+            body=body.encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        response = connection.getresponse()
+        result = loads(response.read())
+    except (OSError, ValueError) as e:
+        print(f"failed to reach server {address}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        connection.close()
+
+    if response.status != 200:
+        print(
+            f"server {address} rejected the request: {result.get('error')}",
+            file=sys.stderr,
+        )
+        return 1
+    sys.stderr.write(result["stderr"])
+    sys.stderr.flush()
+    sys.stdout.flush()
+    sys.stdout.buffer.write(b64decode(result["stdout"]))
+    sys.stdout.buffer.flush()
+    return int(result["exit_code"])
@@ -0,0 +1,277 @@
+"""content renders the boilerplate written into the files of a layout.
+
+Like the native role skeleton, templates use ``string.Template`` placeholders.
+They are compiled and checked once per run, then rendered for each file as it
+is created, so filling in the layout needs no second pass over the tree.
+
+Every template can use ``${project}``, the project directory or ``.``:
+
+- ``site.yml``: ``${roles}``, the project's roles as a YAML flow sequence.
+- ``inventory``: ``${inventory}`` and ``${groups}``, an INI group per role
+  plus an ``${inventory}:children`` group of them.
+- ``group_vars.yml``: ``${inventory}``, empty in the standard layout, and
+  ``${group}``, rendered to ``group_vars/all.yml``.
+- ``host_vars.yml``: ``${inventory}`` and ``${host}``, rendered to
+  ``host_vars/localhost.yml``.
+"""
+from pathlib import Path
+from string import Template
+from typing import Dict, Iterable, List, Tuple, Union
+
+from ansible_generator.plan import LayoutPlan
+
+SITE_TEMPLATE = "site.yml"
+INVENTORY_TEMPLATE = "inventory"
+GROUP_VARS_TEMPLATE = "group_vars.yml"
+HOST_VARS_TEMPLATE = "host_vars.yml"
+TEMPLATE_NAMES = (
+    SITE_TEMPLATE,
+    INVENTORY_TEMPLATE,
+    GROUP_VARS_TEMPLATE,
+    HOST_VARS_TEMPLATE,
+)
+
+# The vars directories filled in by a template, and the file each one gets.
+VARS_FILES: Dict[str, Tuple[str, str]] = {
+    "group_vars": (GROUP_VARS_TEMPLATE, "all"),
+    "host_vars": (HOST_VARS_TEMPLATE, "localhost"),
+}
+
+DEFAULT_TEMPLATES: Dict[str, str] = {
+    SITE_TEMPLATE: "---\n- name: ${project}\n  hosts: all\n  roles: ${roles}\n",
+    INVENTORY_TEMPLATE: "${groups}",
+    GROUP_VARS_TEMPLATE: "---\n# variables for ${group} hosts\n",
+    HOST_VARS_TEMPLATE: "---\n# variables for ${host}\nansible_connection: local\n",
+}
+
+# The placeholders each template may use.
+TEMPLATE_VARIABLES: Dict[str, Tuple[str, ...]] = {
+    SITE_TEMPLATE: ("project", "roles"),
+    INVENTORY_TEMPLATE: ("project", "inventory", "groups"),
+    GROUP_VARS_TEMPLATE: ("project", "inventory", "group"),
+    HOST_VARS_TEMPLATE: ("project", "inventory", "host"),
+}
+
+
+class TemplateError(Exception):
+    """TemplateError is raised when a content template cannot be read or is
+    invalid.
+    """
+
+
+class LayoutTemplates:
+    """LayoutTemplates are the compiled content templates of a run."""
+
+    templates: Dict[str, Template]
+
+    def __init__(self, templates: Union[Dict[str, str], None] = None) -> None:
+        """Initialize a LayoutTemplates instance, compiling every template.
+
+        Args:
+            templates (optional): Template text keyed by template name, which
+                replaces the default of each name given. Defaults to None.
+
+        Raises:
+            TemplateError: A template is unknown or uses an unknown placeholder.
+        """
+        sources = dict(DEFAULT_TEMPLATES)
+        for name, text in (templates or {}).items():
+            if name not in sources:
+                raise TemplateError(f"unknown template {name}")
+            sources[name] = text
+        self.templates = {}
+        for name, text in sources.items():
+            template = Template(text)
+            try:
+                # substituting every placeholder once catches mistakes up front
+                template.substitute(dict.fromkeys(TEMPLATE_VARIABLES[name], ""))
+            except KeyError as e:
+                raise TemplateError(f"unknown placeholder {e} in {name}") from e
+            except ValueError as e:
+                raise TemplateError(f"invalid template {name}: {e}") from e
+            self.templates[name] = template
+
+    @classmethod
+    def from_directory(cls, path: str) -> "LayoutTemplates":
+        """Compile the templates found in a directory, using the defaults for
+        any which are missing.
+
+        Args:
+            path: The directory containing templates named after
+                TEMPLATE_NAMES.
+
+        Raises:
+            TemplateError: The directory or a template could not be read, or a
+                template is invalid.
+
+        Returns:
+            LayoutTemplates: The compiled templates.
+        """
+        directory = Path(path)
+        if not directory.is_dir():
+            raise TemplateError(f"template directory {path} does not exist")
+        templates: Dict[str, str] = {}
+        for name in TEMPLATE_NAMES:
+            template_path = directory.joinpath(name)
+            if not template_path.is_file():
+                continue
+            try:
+                templates[name] = template_path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError) as e:
+                raise TemplateError(f"failed to read template {template_path}: {e}")
+        return cls(templates=templates)
+
+    def to_dict(self) -> Dict[str, str]:
+        """Serialize the templates.
+
+        Returns:
+            Dict[str, str]: The template text keyed by template name.
+        """
+        return {name: template.template for name, template in self.templates.items()}
+
+    def extend(self, plan: LayoutPlan) -> LayoutPlan:
+        """Add the vars files which templates fill in to a plan.
+
+        Args:
+            plan: The layout plan.
+
+        Returns:
+            LayoutPlan: The plan, with a vars file in every vars directory.
+        """
+        files: List[str] = []
+        for directory in plan.directories:
+            name = directory.rsplit("/", 1)[-1]
+            if name in VARS_FILES:
+                files.append(f"{directory}/{VARS_FILES[name][1]}.yml")
+        if not files:
+            return plan
+        return plan.merge(LayoutPlan(files=files))
+
+    def bind(self, plan: LayoutPlan) -> "FileContents":
+        """Prepare to render the files of a plan.
+
+        Args:
+            plan: The layout plan whose roles the templates refer to.
+
+        Returns:
+            FileContents: The renderer for the plan's files.
+        """
+        roles: Dict[str, List[str]] = {}
+        for directory, rolename in plan.roles:
+            project, _, name = directory.rpartition("/")
+            if name == "roles":
+                roles.setdefault(project or ".", []).append(rolename)
+        return FileContents(templates=self.templates, roles=roles)
+
+
+class FileContents:
+    """FileContents renders the content of each file in a plan."""
+
+    templates: Dict[str, Template]
+    roles: Dict[str, List[str]]
+
+    def __init__(
+        self, templates: Dict[str, Template], roles: Dict[str, List[str]]
+    ) -> None:
+        """Initialize a FileContents instance
+
+        Args:
+            templates: The compiled templates keyed by template name.
+            roles: The role names keyed by project directory.
+        """
+        self.templates = templates
+        self.roles = roles
+
+    def render(self, path: str) -> bytes:
+        """Render the content of a file in the plan.
+
+        Args:
+            path: The file path, as it appears in the plan.
+
+        Returns:
+            bytes: The rendered content.
+        """
+        name, project, inventory, entry = classify_path(path)
+        roles = self.roles.get(project, [])
+        if name == SITE_TEMPLATE:
+            variables = {"roles": format_roles(roles)}
+        elif name == INVENTORY_TEMPLATE:
+            variables = {"groups": format_groups(inventory=inventory, roles=roles)}
+        elif name == GROUP_VARS_TEMPLATE:
+            variables = {"group": entry}
+        else:
+            variables = {"host": entry}
+        return (
+            self.templates[name]
+            .substitute(variables, project=project, inventory=inventory)
+            .encode("utf-8")
+        )
+
+
+def classify_path(path: str) -> Tuple[str, str, str, str]:
+    """Work out which template renders a layout file.
+
+    Args:
+        path: The file path, as it appears in the plan.
+
+    Returns:
+        Tuple[str, str, str, str]: The template name, the project directory or
+            ``.``, the inventory name if any, and the vars file's group or host.
+    """
+    components = [part for part in path.split("/") if part not in ("", ".")]
+    parents, filename = components[:-1], components[-1]
+    if filename == "site.yml":
+        return SITE_TEMPLATE, join_components(parents), "", ""
+    if parents[-1:] and parents[-1] in VARS_FILES:
+        inventory = ""
+        project = parents[:-1]
+        if project[-2:-1] == ["inventories"]:
+            inventory = project[-1]
+            project = project[:-2]
+        name = VARS_FILES[parents[-1]][0]
+        return name, join_components(project), inventory, filename[: -len(".yml")]
+    if filename == "hosts" and parents[-2:-1] == ["inventories"]:
+        return INVENTORY_TEMPLATE, join_components(parents[:-2]), parents[-1], ""
+    return INVENTORY_TEMPLATE, join_components(parents), filename, ""
+
+
+def join_components(components: Iterable[str]) -> str:
+    """Join path components into a project directory.
+
+    Args:
+        components: The path components.
+
+    Returns:
+        str: The joined path, or ``.`` for no components.
+    """
+    return "/".join(components) or "."
+
+
+def format_roles(roles: Iterable[str]) -> str:
+    """Format role names as a YAML flow sequence.
+
+    Args:
+        roles: The role names.
+
+    Returns:
+        str: The sequence, such as ``[common, web]``.
+    """
+    return f"[{', '.join(roles)}]"
+
+
+def format_groups(inventory: str, roles: List[str]) -> str:
+    """Format the INI inventory groups of a project.
+
+    Args:
+        inventory: The inventory name.
+        roles: The role names, each of which gets a group.
+
+    Returns:
+        str: A group per role and a group of those groups named after the
+            inventory, or an empty inventory group without roles.
+    """
+    if not roles:
+        return f"[{inventory}]\n"
+    groups = "".join(f"[{role}]\n\n" for role in roles)
+    children = "".join(f"{role}\n" for role in roles)
+    return f"{groups}[{inventory}:children]\n{children}"
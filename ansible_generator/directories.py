@@ -1,41 +1,64 @@
 """directories is used to generate the necessary directory structures."""
-from logging import INFO, Logger
+from logging import DEBUG, INFO, Logger
 from pathlib import Path
-from typing import TYPE_CHECKING, Iterable, MutableSequence, Set
+from typing import TYPE_CHECKING, Collection, Iterable, Set, Union
 
 from ansible_generator.log import setup_logger
-from ansible_generator.utilities import join_cwd_and_directory_path
+from ansible_generator.utilities import (
+    PathResolver,
+    join_project_paths,
+    normalize_inventories,
+)
 
 if TYPE_CHECKING:
     from _typeshed import StrPath
 
 
 def create_directory_layout(
-    projects: Iterable[str],
-    inventories: MutableSequence[str],
+    projects: Collection[str],
+    inventories: Iterable[str],
     alternate_layout: bool = False,
     verbosity: int = INFO,
 ) -> bool:
     """Creates the directory layout.
 
     Args:
+        projects: An iterable of project names.
         inventories: Array of strings noting the names of the inventories.
         alternate_layout: Boolean noting whether this is the primary or
             alternate directory structure.
+        verbosity (optional): The logging level. Defaults to INFO.
 
     Returns:
         A boolean to say that it succeeded or failed.
     """
     logger = setup_logger(name=__name__, log_level=verbosity)
-    for itemNum, inventory in enumerate(inventories):
-        inventories[itemNum] = inventory.split("/")[-1]
-        if inventory == ".":
-            inventories[itemNum] = "dot"
-        if inventory == "..":
-            inventories[itemNum] = "dotdot"
-        if inventory == "*":
-            inventories[itemNum] = "star"
+    required_paths = get_directory_paths(
+        logger=logger,
+        projects=projects,
+        inventories=normalize_inventories(inventories),
+        alternate_layout=alternate_layout,
+    )
+    return create_directories(logger=logger, dir_paths=required_paths)
+
+
+def get_directory_paths(
+    logger: Logger,
+    projects: Collection[str],
+    inventories: Iterable[str],
+    alternate_layout: bool = False,
+) -> Set[str]:
+    """Compute the relative directory paths required by the layout.
+
+    Args:
+        logger: A logger.
+        projects: The project names, if any.
+        inventories: The normalized inventory names.
+        alternate_layout (optional): Use the alternate layout. Defaults to False.
 
+    Returns:
+        Set[str]: The directory paths, relative to the current working directory.
+    """
     if alternate_layout:
         required_paths = get_alternate_inventories_directory_paths(
             logger=logger, inventories=inventories
@@ -43,32 +66,50 @@ def create_directory_layout(
     else:
         required_paths = {"group_vars", "host_vars", "roles"}
 
-    logger.debug(
-        'msg="%s required directories" directories="%s"',
-        len(required_paths),
-        ", ".join(required_paths),
-    )
-    if projects:
-        logger.debug('msg="projects was defined" projects="%s"', ", ".join(projects))
-
-        final_paths: Set[str] = set()
-        for project in projects:
-            final_paths.update(
-                f"{project}/{required_path}" for required_path in required_paths
-            )
-        required_paths = final_paths
+    # joining every path is expensive for large inputs, only do so when needed
+    debug = logger.isEnabledFor(DEBUG)
+    if debug:
         logger.debug(
-            'msg="%s project required directories" directories="%s"',
+            'msg="%s required directories" directories="%s"',
             len(required_paths),
             ", ".join(required_paths),
         )
+    if projects:
+        required_paths = join_project_paths(projects=projects, paths=required_paths)
+        if debug:
+            logger.debug(
+                'msg="projects was defined" projects="%s"', ", ".join(projects)
+            )
+            logger.debug(
+                'msg="%s project required directories" directories="%s"',
+                len(required_paths),
+                ", ".join(required_paths),
+            )
+    return required_paths
 
-    create_paths = set(map(join_cwd_and_directory_path, required_paths))
-    for cp in create_paths:
+
+def create_directories(
+    logger: Logger,
+    dir_paths: Iterable[str],
+    resolver: Union[PathResolver, None] = None,
+) -> bool:
+    """Create each of the relative directory paths, stopping on the first failure.
+
+    Args:
+        logger: A logger.
+        dir_paths: The directory paths, relative to the current working directory.
+        resolver (optional): The path resolver to use. Defaults to None, which
+            creates one for the current working directory.
+
+    Returns:
+        bool: True if every directory was created, False otherwise.
+    """
+    if resolver is None:
+        resolver = PathResolver()
+    for cp in sorted(map(resolver.resolve, dir_paths)):
         success = create_directory(logger=logger, dir_path=cp)
         if not success:
             return False
-
     return True
 
 
@@ -92,7 +133,20 @@ def create_directory(logger: Logger, dir_path: "StrPath") -> bool:
         logger.info("creating directory %s", dir_path)
         dir_path.mkdir(parents=True, exist_ok=True)
         return True
-    except PermissionError:
+    except Exception as e:
+        log_directory_error(logger=logger, dir_path=dir_path, error=e)
+    return False
+
+
+def log_directory_error(logger: Logger, dir_path: "StrPath", error: Exception) -> None:
+    """Log a failure to create a directory with a helpful message.
+
+    Args:
+        logger: A logger.
+        dir_path: The directory which could not be created.
+        error: The exception raised while creating it.
+    """
+    if isinstance(error, PermissionError):
         logger.error(
             (
                 "PermissionError: failed to create %s\n"
@@ -100,14 +154,13 @@ def create_directory(logger: Logger, dir_path: "StrPath") -> bool:
             ),
             dir_path,
         )
-    except NotADirectoryError:
+    elif isinstance(error, NotADirectoryError):
         logger.error(
             "UsageError: non-directory target. Ansible Generate should be "
             + "directed to a directory"
         )
-    except Exception:
-        logger.error("failed to create %s", dir_path, exc_info=True)
-    return False
+    else:
+        logger.error("failed to create %s", dir_path, exc_info=error)
 
 
 def get_alternate_inventories_directory_paths(
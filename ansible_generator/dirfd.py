@@ -0,0 +1,210 @@
+"""dirfd creates layouts relative to open directory file descriptors.
+
+Rather than resolving every absolute path from the filesystem root, each
+directory is opened once and its children are created with the ``dir_fd``
+variants of ``mkdir``, ``open`` and ``utime``.
+"""
+import os
+from logging import Logger
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, List, Tuple, Union
+
+from ansible_generator.directories import log_directory_error
+from ansible_generator.files import write_content
+
+if TYPE_CHECKING:
+    from ansible_generator.content import FileContents
+    from ansible_generator.stats import RunStats
+
+DIRECTORY_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+CREATE_FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+
+
+def dir_fd_supported() -> bool:
+    """Check whether the platform supports the directory fd engine.
+
+    Returns:
+        bool: True if ``mkdir`` and ``open`` accept ``dir_fd`` and ``utime``
+            accepts an fd on this platform.
+    """
+    return (
+        os.mkdir in os.supports_dir_fd
+        and os.open in os.supports_dir_fd
+        and os.utime in os.supports_fd
+    )
+
+
+def split_path(path: str) -> List[str]:
+    """Split a path into components, beginning with the directory it is relative to.
+
+    Args:
+        path: A relative or absolute path.
+
+    Returns:
+        List[str]: ``"/"`` for absolute paths or ``"."`` for relative paths,
+            followed by each non-empty path component.
+    """
+    root = "/" if path.startswith("/") else "."
+    return [root, *(part for part in path.split("/") if part not in ("", "."))]
+
+
+class DirectoryCursor:
+    """A DirectoryCursor keeps the chain of directory fds for the most recently
+    entered directory open, so that entering a sibling or child directory only
+    opens the components which differ. Paths should be visited in sorted order
+    to make the most of this.
+    """
+
+    base: Path
+    stack: List[Tuple[str, int]]
+
+    def __init__(self, base: Union[Path, None] = None) -> None:
+        """Initialize a DirectoryCursor instance
+
+        Args:
+            base (optional): The directory relative paths are created in.
+                Defaults to None, which uses the current working directory.
+        """
+        self.base = Path.cwd() if base is None else base
+        self.stack = []
+
+    def __enter__(self) -> "DirectoryCursor":
+        """Enter the cursor's context.
+
+        Returns:
+            DirectoryCursor: The cursor.
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close every open directory fd.
+
+        Args:
+            args: The exception information, if any.
+        """
+        self.close(depth=0)
+
+    def close(self, depth: int) -> None:
+        """Close the directory fds deeper than ``depth``.
+
+        Args:
+            depth: The number of directory fds to keep open.
+        """
+        while len(self.stack) > depth:
+            _, fd = self.stack.pop()
+            os.close(fd)
+
+    def enter(self, components: List[str]) -> int:
+        """Open, creating if necessary, the directory made of ``components``.
+
+        Args:
+            components: The components of the directory, as from ``split_path``.
+
+        Returns:
+            int: A directory fd which remains owned by the cursor.
+        """
+        depth = 0
+        while (
+            depth < len(self.stack)
+            and depth < len(components)
+            and self.stack[depth][0] == components[depth]
+        ):
+            depth += 1
+        self.close(depth=depth)
+
+        for component in components[depth:]:
+            if not self.stack:
+                root = str(self.base) if component == "." else component
+                self.stack.append((component, os.open(root, DIRECTORY_FLAGS)))
+                continue
+            parent_fd = self.stack[-1][1]
+            try:
+                fd = os.open(component, DIRECTORY_FLAGS, dir_fd=parent_fd)
+            except FileNotFoundError:
+                try:
+                    os.mkdir(component, dir_fd=parent_fd)
+                except FileExistsError:
+                    pass
+                fd = os.open(component, DIRECTORY_FLAGS, dir_fd=parent_fd)
+            self.stack.append((component, fd))
+        return self.stack[-1][1]
+
+
+def create_directories_at(
+    logger: Logger, dir_paths: Iterable[str], base: Union[Path, None] = None
+) -> bool:
+    """Create each directory relative to its parent's fd, stopping on failure.
+
+    Args:
+        logger: A logger.
+        dir_paths: The directory paths, relative to ``base``.
+        base (optional): The base directory. Defaults to the current directory.
+
+    Returns:
+        bool: True if every directory was created, False otherwise.
+    """
+    with DirectoryCursor(base=base) as cursor:
+        for dir_path in sorted(dir_paths, key=split_path):
+            components = split_path(dir_path)
+            display_path = os.path.normpath(cursor.base.joinpath(dir_path))
+            try:
+                parent_fd = cursor.enter(components[:-1])
+                os.mkdir(components[-1], dir_fd=parent_fd)
+                logger.info("creating directory %s", display_path)
+            except FileExistsError:
+                logger.info("directory %s exists", display_path)
+            except Exception as e:
+                log_directory_error(logger=logger, dir_path=display_path, error=e)
+                return False
+    return True
+
+
+def touch_files_at(
+    logger: Logger,
+    filenames: Iterable[str],
+    base: Union[Path, None] = None,
+    create_only: bool = True,
+    contents: Union["FileContents", None] = None,
+    stats: Union["RunStats", None] = None,
+) -> bool:
+    """Touch each file relative to its parent's fd, stopping on failure.
+
+    Args:
+        logger: A logger.
+        filenames: The file paths, relative to ``base``.
+        base (optional): The base directory. Defaults to the current directory.
+        create_only (optional): Only create missing files, leaving existing
+            files and their times untouched. Defaults to True.
+        contents (optional): The renderer for the content written to new or
+            empty files. Defaults to None, which leaves them empty.
+        stats (optional): Run stats to record bytes written in. Defaults to
+            None.
+
+    Returns:
+        bool: True if every file was touched, False otherwise.
+    """
+    flags = CREATE_FILE_FLAGS if create_only else FILE_FLAGS
+    with DirectoryCursor(base=base) as cursor:
+        for filename in sorted(filenames, key=split_path):
+            components = split_path(filename)
+            display_path = os.path.normpath(cursor.base.joinpath(filename))
+            try:
+                parent_fd = cursor.enter(components[:-1])
+                fd = os.open(components[-1], flags, 0o666, dir_fd=parent_fd)
+                logger.info("creating file %s", display_path)
+                try:
+                    if contents is not None:
+                        write_content(
+                            fd=fd, content=contents.render(filename), stats=stats
+                        )
+                    if not create_only:
+                        os.utime(fd)
+                finally:
+                    os.close(fd)
+            except FileExistsError:
+                logger.info("file %s exists", display_path)
+            except Exception:
+                logger.error("failed to create file", exc_info=True)
+                return False
+    return True
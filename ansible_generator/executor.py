@@ -0,0 +1,622 @@
+"""executor applies a layout plan to the filesystem."""
+from itertools import chain
+from logging import Logger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple, Union
+
+from ansible_generator.backends import DiskBackend, FilesystemBackend
+from ansible_generator.dirfd import split_path
+from ansible_generator.files import GALAXY_ROLE_BACKEND, NATIVE_ROLE_BACKEND
+from ansible_generator.plan import LayoutPlan
+from ansible_generator.preflight import PreflightIndex, remove_existing
+from ansible_generator.skeleton import ROLE_DIRECTORIES, ROLE_FILES
+
+if TYPE_CHECKING:
+    from ansible_generator.content import FileContents
+    from ansible_generator.stats import RunStats
+
+# Estimated filesystem syscalls per operation, excluding path resolution.
+# Existence is checked by a preflight scan, costing at most one directory read
+# per entry, and only missing entries are created. Missing directories are
+# checked then created, missing files are checked, opened exclusively and
+# closed, and native roles write every skeleton directory and file, each file
+# being opened, written and closed.
+EXISTS_SYSCALLS = 1
+DIRECTORY_SYSCALLS = EXISTS_SYSCALLS + 1
+FILE_SYSCALLS = EXISTS_SYSCALLS + 2
+ROLE_FILE_SYSCALLS = 3
+ROLE_SYSCALLS = (
+    EXISTS_SYSCALLS + len(ROLE_DIRECTORIES) + len(ROLE_FILES) * ROLE_FILE_SYSCALLS
+)
+
+
+class DryRunReport:
+    """A DryRunReport describes what applying a plan would do, without doing it."""
+
+    plan: LayoutPlan
+    existing_directories: List[str]
+    existing_files: List[str]
+    existing_roles: List[Tuple[str, str]]
+
+    def __init__(
+        self,
+        plan: LayoutPlan,
+        existing_directories: List[str],
+        existing_files: List[str],
+        existing_roles: List[Tuple[str, str]],
+    ) -> None:
+        """Initialize a DryRunReport instance
+
+        Args:
+            plan: The plan which was inspected.
+            existing_directories: The planned directories which already exist.
+            existing_files: The planned files which already exist.
+            existing_roles: The planned roles which already exist.
+        """
+        self.plan = plan
+        self.existing_directories = existing_directories
+        self.existing_files = existing_files
+        self.existing_roles = existing_roles
+
+    def merge(self, *others: "DryRunReport") -> "DryRunReport":
+        """Combine reports into a new report.
+
+        Args:
+            others: The reports to merge with this one.
+
+        Returns:
+            DryRunReport: A report covering every report's plan.
+        """
+        reports = (self, *others)
+        return DryRunReport(
+            plan=self.plan.merge(*(report.plan for report in others)),
+            existing_directories=sorted(
+                {path for report in reports for path in report.existing_directories}
+            ),
+            existing_files=sorted(
+                {path for report in reports for path in report.existing_files}
+            ),
+            existing_roles=sorted(
+                {role for report in reports for role in report.existing_roles}
+            ),
+        )
+
+    @property
+    def predicted_syscalls(self) -> int:
+        """Estimate the filesystem syscalls needed to apply the plan.
+
+        Returns:
+            int: The estimated number of syscalls, excluding path resolution.
+        """
+        existing = (
+            len(self.existing_directories)
+            + len(self.existing_files)
+            + len(self.existing_roles)
+        ) * EXISTS_SYSCALLS
+        missing_directories = len(self.plan.directories) - len(
+            self.existing_directories
+        )
+        missing_files = len(self.plan.files) - len(self.existing_files)
+        missing_roles = len(self.plan.roles) - len(self.existing_roles)
+        return (
+            existing
+            + missing_directories * DIRECTORY_SYSCALLS
+            + missing_files * FILE_SYSCALLS
+            + missing_roles * ROLE_SYSCALLS
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the report.
+
+        Returns:
+            Dict[str, Any]: The report as JSON serializable primitives.
+        """
+        return {
+            "plan": self.plan.to_dict(),
+            "existing": {
+                "directories": list(self.existing_directories),
+                "files": list(self.existing_files),
+                "roles": [list(role) for role in self.existing_roles],
+            },
+            "predicted_syscalls": self.predicted_syscalls,
+        }
+
+    def format(self) -> str:
+        """Format the report for humans.
+
+        Returns:
+            str: One line per planned entry followed by a summary.
+        """
+        existing_directories = set(self.existing_directories)
+        existing_files = set(self.existing_files)
+        existing_roles = set(self.existing_roles)
+        lines = [
+            f"{'exists' if path in existing_directories else 'create'} "
+            f"directory {path}"
+            for path in self.plan.directories
+        ]
+        lines.extend(
+            f"{'exists' if path in existing_files else 'create'} file {path}"
+            for path in self.plan.files
+        )
+        lines.extend(
+            f"{'exists' if role in existing_roles else 'create'} "
+            f"role {role[0]}/{role[1]}"
+            for role in self.plan.roles
+        )
+        lines.append(
+            f"{len(self.plan.directories)} directories "
+            f"({len(self.existing_directories)} exist), "
+            f"{len(self.plan.files)} files ({len(self.existing_files)} exist), "
+            f"{len(self.plan.roles)} roles ({len(self.existing_roles)} exist), "
+            f"~{self.predicted_syscalls} filesystem syscalls"
+        )
+        return "\n".join(lines)
+
+
+class FailureReport:
+    """A FailureReport collects the errors of every part of a layout which
+    could not be applied, so that only those parts need to be retried.
+    """
+
+    attempted: int
+    failures: Dict[str, List[str]]
+
+    def __init__(
+        self,
+        attempted: int = 0,
+        failures: Union[Dict[str, List[str]], None] = None,
+    ) -> None:
+        """Initialize a FailureReport instance
+
+        Args:
+            attempted (optional): The number of parts which were applied.
+                Defaults to 0.
+            failures (optional): The errors of each failed part, keyed by its
+                top level path. Defaults to None.
+        """
+        self.attempted = attempted
+        self.failures = {} if failures is None else failures
+
+    def __bool__(self) -> bool:
+        """Check whether anything failed.
+
+        Returns:
+            bool: True if any part failed.
+        """
+        return bool(self.failures)
+
+    def merge(self, *others: "FailureReport") -> "FailureReport":
+        """Combine reports into a new report.
+
+        Args:
+            others: The reports to merge with this one.
+
+        Returns:
+            FailureReport: A report covering every report's parts.
+        """
+        reports = (self, *others)
+        failures: Dict[str, List[str]] = {}
+        for report in reports:
+            for name, errors in report.failures.items():
+                failures.setdefault(name, []).extend(errors)
+        return FailureReport(
+            attempted=sum(report.attempted for report in reports),
+            failures=failures,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the report.
+
+        Returns:
+            Dict[str, Any]: The report as JSON serializable primitives.
+        """
+        return {
+            "attempted": self.attempted,
+            "failed": len(self.failures),
+            "failures": {name: list(errors) for name, errors in self.failures.items()},
+        }
+
+    def format(self) -> str:
+        """Format the report for humans.
+
+        Returns:
+            str: One line per error followed by a summary and the failed parts,
+                one per line, suitable for ``--projects-from``.
+        """
+        lines = [
+            f"failed {name}: {error}"
+            for name, errors in sorted(self.failures.items())
+            for error in errors
+        ]
+        lines.append(f"{len(self.failures)} of {self.attempted} projects failed:")
+        lines.extend(sorted(self.failures))
+        return "\n".join(lines)
+
+
+def dry_run_plan(
+    plan: LayoutPlan,
+    logger: Logger,
+    backend: Union[FilesystemBackend, None] = None,
+) -> DryRunReport:
+    """Inspect which entries of the plan already exist, without creating any.
+
+    Args:
+        plan: The layout plan to inspect.
+        logger: A logger.
+        backend (optional): The filesystem backend to inspect. Defaults to None,
+            which uses the disk relative to the current working directory.
+
+    Returns:
+        DryRunReport: What applying the plan would do.
+    """
+    logger.debug('msg="inspecting plan" plan="%s"', plan)
+    if backend is None:
+        backend = DiskBackend()
+    directories, files, roles = backend.existing(plan)
+    return DryRunReport(
+        plan=plan,
+        existing_directories=directories,
+        existing_files=files,
+        existing_roles=roles,
+    )
+
+
+def apply_plan(
+    plan: LayoutPlan,
+    logger: Logger,
+    role_backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    jobs: int = 1,
+    create_only: bool = True,
+    base: Union[Path, None] = None,
+    backend: Union[FilesystemBackend, None] = None,
+    stats: Union["RunStats", None] = None,
+    contents: Union["FileContents", None] = None,
+) -> bool:
+    """Create the directories, files and roles described by the plan.
+
+    Args:
+        plan: The layout plan to apply.
+        logger: A logger.
+        role_backend (optional): The role creation backend, either ``native`` or
+            ``galaxy``. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            role backend. Defaults to None.
+        jobs (optional): The number of directory groups, file groups or roles to
+            create concurrently. Defaults to 1.
+        create_only (optional): Leave existing files and their times untouched
+            rather than updating their times. Defaults to True.
+        base (optional): The directory the plan is applied to. Defaults to None,
+            which uses the current working directory.
+        backend (optional): The filesystem backend to apply the plan to.
+            Defaults to None, which uses the disk relative to ``base``.
+        stats (optional): Run stats to record phase times and counts in.
+            Defaults to None.
+        contents (optional): The renderer for the content written to new
+            files. Defaults to None, which leaves them empty.
+
+    Returns:
+        bool: True if the plan was applied successfully, False otherwise.
+    """
+    logger.debug('msg="applying plan" plan="%s"', plan)
+    if backend is None:
+        backend = DiskBackend(base=base)
+    if stats is None:
+        from ansible_generator.stats import RunStats
+
+        stats = RunStats()
+    with stats.phase("preflight"):
+        missing = backend.remove_existing(
+            plan=plan, logger=logger, skip_files=create_only
+        )
+    count_skipped(stats=stats, plan=plan, missing=missing)
+    with stats.phase("directories"):
+        if not backend.create_directories(
+            logger=logger, dir_paths=missing.directories, jobs=jobs
+        ):
+            return False
+    stats.count("directories", created=len(missing.directories))
+    with stats.phase("files"):
+        if not backend.create_files(
+            logger=logger,
+            filenames=missing.files,
+            create_only=create_only,
+            jobs=jobs,
+            contents=contents,
+            stats=stats,
+        ):
+            return False
+    stats.count("files", created=len(missing.files))
+    with stats.phase("roles"):
+        return backend.create_roles(
+            logger=logger,
+            roles=missing.roles,
+            role_backend=role_backend,
+            role_skeleton=role_skeleton,
+            jobs=jobs,
+            stats=stats,
+        )
+
+
+def count_skipped(stats: "RunStats", plan: LayoutPlan, missing: LayoutPlan) -> None:
+    """Count the entries of a plan which already existed.
+
+    Args:
+        stats: The run stats to count in.
+        plan: The whole plan.
+        missing: The entries of the plan which did not exist.
+    """
+    stats.count("directories", skipped=len(plan.directories) - len(missing.directories))
+    stats.count("files", skipped=len(plan.files) - len(missing.files))
+    stats.count("roles", skipped=len(plan.roles) - len(missing.roles))
+
+
+def get_missing_roots(plan: LayoutPlan, index: PreflightIndex) -> List[str]:
+    """Find the topmost missing path above every entry of a plan.
+
+    Args:
+        plan: A plan containing only missing entries.
+        index: The preflight index for the base directory.
+
+    Returns:
+        List[str]: The missing paths whose parents exist, so that moving each
+            of them into place creates the whole plan.
+    """
+    roots = set()
+    entries = chain(
+        plan.directories,
+        plan.files,
+        (f"{directory}/{rolename}" for directory, rolename in plan.roles),
+    )
+    for entry in entries:
+        components = split_path(entry)[1:]
+        for depth in range(1, len(components) + 1):
+            prefix = "/".join(components[:depth])
+            if not index.exists(prefix):
+                roots.add(prefix)
+                break
+    return sorted(roots)
+
+
+def apply_plan_atomically(
+    plan: LayoutPlan,
+    logger: Logger,
+    role_backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    jobs: int = 1,
+    base: Union[Path, None] = None,
+    stats: Union["RunStats", None] = None,
+    contents: Union["FileContents", None] = None,
+) -> bool:
+    """Build the missing entries of a plan in a staging directory, then move them
+    into place.
+
+    The staging directory is created next to the layout so that it shares its
+    filesystem, and nothing is moved until every entry has been built. A failure
+    leaves the layout as it was, moving back any roots already in place when a
+    later one cannot be moved.
+
+    Args:
+        plan: The layout plan to apply. Every path must be relative and must not
+            contain ``..``.
+        logger: A logger.
+        role_backend (optional): The role creation backend, either ``native`` or
+            ``galaxy``. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            role backend. Defaults to None.
+        jobs (optional): The number of directory groups, file groups or roles to
+            create concurrently. Defaults to 1.
+        base (optional): The directory the plan is applied to. Defaults to None,
+            which uses the current working directory.
+        stats (optional): Run stats to record phase times and counts in.
+            Defaults to None.
+        contents (optional): The renderer for the content written to new
+            files. Defaults to None, which leaves them empty.
+
+    Returns:
+        bool: True if the plan was applied successfully, False otherwise.
+    """
+    from shutil import rmtree
+    from tempfile import mkdtemp
+
+    from ansible_generator.stats import RunStats
+
+    base = Path.cwd() if base is None else base
+    stats = RunStats() if stats is None else stats
+    with stats.phase("preflight"):
+        index = PreflightIndex(base=base)
+        missing = remove_existing(plan=plan, logger=logger, index=index)
+    count_skipped(stats=stats, plan=plan, missing=missing)
+    plan = missing
+    if not len(plan):
+        return True
+    for path in chain(plan.directories, plan.files, (d for d, _ in plan.roles)):
+        if path.startswith("/") or ".." in split_path(path):
+            logger.error("atomic mode requires relative paths, found %s", path)
+            return False
+
+    roots = get_missing_roots(plan=plan, index=index)
+    staging = Path(mkdtemp(prefix=".ansible-generator-", dir=base))
+    logger.debug('msg="staging layout" staging="%s"', staging)
+    try:
+        if not apply_plan(
+            plan=plan,
+            logger=logger,
+            role_backend=role_backend,
+            role_skeleton=role_skeleton,
+            jobs=jobs,
+            base=staging,
+            stats=stats,
+            contents=contents,
+        ):
+            return False
+        with stats.phase("commit"):
+            return move_into_place(
+                roots=roots, staging=staging, base=base, logger=logger
+            )
+    finally:
+        rmtree(staging, ignore_errors=True)
+
+
+def move_into_place(
+    roots: List[str], staging: Path, base: Path, logger: Logger
+) -> bool:
+    """Move staged roots into the layout, moving those already in place back
+    into staging if any of them fails.
+
+    Args:
+        roots: The staged paths to move, relative to both directories.
+        staging: The staging directory.
+        base: The directory the layout is applied to.
+        logger: A logger.
+
+    Returns:
+        bool: True if every root was moved, False if the layout was left as it
+            was.
+    """
+    moved: List[str] = []
+    try:
+        for root in roots:
+            destination = base.joinpath(root)
+            logger.debug('msg="moving into place" path="%s"', destination)
+            staging.joinpath(root).rename(destination)
+            moved.append(root)
+        return True
+    except OSError:
+        logger.error("failed to move the staged layout into place", exc_info=True)
+
+    for root in reversed(moved):
+        destination = base.joinpath(root)
+        logger.debug('msg="moving back to staging" path="%s"', destination)
+        try:
+            destination.rename(staging.joinpath(root))
+        except OSError:
+            logger.error("failed to remove %s", destination, exc_info=True)
+    return False
+
+
+def apply_plan_keep_going(
+    plan: LayoutPlan,
+    logger: Logger,
+    role_backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    jobs: int = 1,
+    create_only: bool = True,
+    backend: Union[FilesystemBackend, None] = None,
+    stats: Union["RunStats", None] = None,
+    contents: Union["FileContents", None] = None,
+) -> FailureReport:
+    """Apply each project of a plan independently, continuing past failures.
+
+    The plan is split by top level path, so that each project is applied on
+    its own. With more than one job, projects are applied concurrently and
+    their output is emitted in order once each has finished.
+
+    Args:
+        plan: The layout plan to apply.
+        logger: A logger.
+        role_backend (optional): The role creation backend, either ``native`` or
+            ``galaxy``. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            role backend. Defaults to None.
+        jobs (optional): The number of projects to apply concurrently.
+            Defaults to 1.
+        create_only (optional): Leave existing files and their times untouched
+            rather than updating their times. Defaults to True.
+        backend (optional): The filesystem backend to apply the plan to.
+            Defaults to None, which uses the disk relative to the current
+            working directory.
+        stats (optional): Run stats to record phase times and counts in, which
+            are summed across concurrent projects. Defaults to None.
+        contents (optional): The renderer for the content written to new
+            files. Defaults to None, which leaves them empty.
+
+    Returns:
+        FailureReport: The errors of every project which failed.
+    """
+    from logging import ERROR
+    from logging.handlers import BufferingHandler
+    from sys import maxsize
+
+    partitions = plan.partition()
+    # with several projects the jobs apply projects, not the roles within one
+    role_jobs = jobs if len(partitions) <= 1 else 1
+    if jobs > 1 and role_backend == GALAXY_ROLE_BACKEND:
+        from ansible_generator.galaxy import get_galaxy_skeleton
+
+        # populate the skeleton cache once rather than once per worker
+        get_galaxy_skeleton(logger=logger, role_skeleton=role_skeleton)
+
+    def apply_partition(name: str, partition: LayoutPlan) -> BufferingHandler:
+        output = BufferingHandler(capacity=maxsize)
+        partition_logger = Logger(name=logger.name, level=logger.getEffectiveLevel())
+        partition_logger.addHandler(output)
+        try:
+            success = apply_plan(
+                plan=partition,
+                logger=partition_logger,
+                role_backend=role_backend,
+                role_skeleton=role_skeleton,
+                jobs=role_jobs,
+                create_only=create_only,
+                backend=backend,
+                stats=stats,
+                contents=contents,
+            )
+        except Exception:
+            partition_logger.error("failed to apply %s", name, exc_info=True)
+            success = False
+        if not success and not any(record.levelno >= ERROR for record in output.buffer):
+            partition_logger.error("failed to apply %s", name)
+        return output
+
+    if jobs <= 1 or len(partitions) <= 1:
+        outputs = (
+            apply_partition(name, partition) for name, partition in partitions.items()
+        )
+        return collect_failures(
+            logger=logger, names=list(partitions), outputs=outputs, level=ERROR
+        )
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(apply_partition, name, partition)
+            for name, partition in partitions.items()
+        ]
+        return collect_failures(
+            logger=logger,
+            names=list(partitions),
+            outputs=(future.result() for future in futures),
+            level=ERROR,
+        )
+
+
+def collect_failures(
+    logger: Logger, names: List[str], outputs: Iterable[Any], level: int
+) -> FailureReport:
+    """Replay buffered output in order, collecting the errors of each part.
+
+    Args:
+        logger: The logger to replay each part's records to.
+        names: The name of each part.
+        outputs: The ``BufferingHandler`` of each part, in the same order.
+        level: The minimum level of the records which are errors.
+
+    Returns:
+        FailureReport: The errors of every part which logged one.
+    """
+    failures: Dict[str, List[str]] = {}
+    for name, output in zip(names, outputs):
+        for record in output.buffer:
+            logger.handle(record)
+            if record.levelno < level:
+                continue
+            error = record.getMessage().splitlines()[0]
+            if record.exc_info and record.exc_info[1] is not None:
+                exception = record.exc_info[1]
+                error = f"{error} ({type(exception).__name__}: {exception})"
+            failures.setdefault(name, []).append(error)
+    return FailureReport(attempted=len(names), failures=failures)
@@ -1,65 +1,119 @@
 """files is used to generate the necessary file."""
 from logging import INFO, Logger
+from os import O_CREAT, O_EXCL, O_WRONLY, close, fsdecode, fstat
+from os import open as os_open
 from os import utime
 from pathlib import Path
-from shlex import split
-from shutil import which
-from subprocess import Popen  # nosec
-from tempfile import TemporaryFile
+from time import perf_counter
 from typing import (
     TYPE_CHECKING,
     Collection,
     Iterable,
-    MutableSequence,
+    Iterator,
+    List,
+    Sequence,
     Set,
     Tuple,
     Union,
 )
 
 from ansible_generator.log import setup_logger
-from ansible_generator.utilities import join_cwd_and_directory_path
+from ansible_generator.skeleton import ROLE_DIRECTORIES, render_role
+from ansible_generator.utilities import (
+    PathResolver,
+    join_project_paths,
+    normalize_inventories,
+)
 
 if TYPE_CHECKING:
-    from _typeshed import StrOrBytesPath
+    from _typeshed import StrOrBytesPath, StrPath
+
+    from ansible_generator.content import FileContents
+    from ansible_generator.stats import RunStats
+
+NATIVE_ROLE_BACKEND = "native"
+GALAXY_ROLE_BACKEND = "galaxy"
+ROLE_BACKENDS = (NATIVE_ROLE_BACKEND, GALAXY_ROLE_BACKEND)
+DIRECTORY_MODE = 0o755
+FILE_MODE = 0o644
+
+# A role entry's path relative to the role, its content or None for a
+# directory, and its permission bits.
+RoleEntry = Tuple[str, Union[bytes, None], int]
 
 
 def create_file_layout(
     projects: Collection[str],
-    inventories: MutableSequence[str],
-    roles: MutableSequence[str],
+    inventories: Iterable[str],
+    roles: Iterable[str],
     alternate_layout: bool = False,
     verbosity: int = INFO,
+    role_backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    jobs: int = 1,
 ) -> bool:
     """Create the file layout for the inputs.
 
     Args:
         projects: An iterable of project names.
-        inventories: A mutable sequence of inventories.
-        roles: A mutable sequence of roles.
+        inventories: An iterable of inventories.
+        roles: An iterable of roles.
         alternate_layout (optional): Use the alternate layout. Defaults to False.
         verbosity (optional): The logging level. Defaults to INFO.
+        role_backend (optional): The role creation backend, either ``native`` or
+            ``galaxy``. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            role backend. Defaults to None.
+        jobs (optional): The number of roles to create concurrently. Defaults to 1.
 
     Returns:
         bool: True if the layout was created successfully, False otherwise.
     """
     logger = setup_logger(name=__name__, log_level=verbosity)
-    minimum_paths = ["site.yml"]
-
-    for itemNum, inventory in enumerate(inventories):
-        inventories[itemNum] = inventory.split("/")[-1]
-        if inventory == ".":
-            inventories[itemNum] = "dot"
-        if inventory == "..":
-            inventories[itemNum] = "dotdot"
-        if inventory == "*":
-            inventories[itemNum] = "star"
-
-    required_paths = set(minimum_paths)
+    required_paths = get_file_paths(
+        logger=logger,
+        projects=projects,
+        inventories=normalize_inventories(inventories),
+        alternate_layout=alternate_layout,
+    )
+    resolver = PathResolver()
+    if not touch_files(logger=logger, filenames=required_paths, resolver=resolver):
+        return False
+
+    return create_roles(
+        role_targets=[
+            (str(resolver.resolve(directory)), rolename)
+            for directory, rolename in get_role_targets(projects=projects, roles=roles)
+        ],
+        logger=logger,
+        backend=role_backend,
+        role_skeleton=role_skeleton,
+        jobs=jobs,
+    )
+
+
+def get_file_paths(
+    logger: Logger,
+    projects: Collection[str],
+    inventories: Iterable[str],
+    alternate_layout: bool = False,
+) -> Set[str]:
+    """Compute the relative file paths required by the layout.
+
+    Args:
+        logger: A logger.
+        projects: The project names, if any.
+        inventories: The normalized inventory names.
+        alternate_layout (optional): Use the alternate layout. Defaults to False.
+
+    Returns:
+        Set[str]: The file paths, relative to the current working directory.
+    """
+    required_paths = {"site.yml"}
     if alternate_layout:
         required_paths.update(
             get_alternate_inventories_file_paths(logger=logger, inventories=inventories)
         )
-        required_paths.update(minimum_paths)
     else:
         required_paths.update(inventories)
 
@@ -69,44 +123,75 @@ def create_file_layout(
 
     if projects:
         logger.debug('msg="projects was defined" projects="%s"', projects)
-
-        final_paths: Set[str] = set()
-        for project in projects:
-            final_paths.update(
-                f"{project}/{required_path}" for required_path in required_paths
-            )
-        required_paths = final_paths
+        required_paths = join_project_paths(projects=projects, paths=required_paths)
         logger.debug(
             'msg="%s project required files" files="%s"',
             len(required_paths),
             required_paths,
         )
+    return required_paths
 
-    touch_paths = set(map(join_cwd_and_directory_path, required_paths))
-    for tp in touch_paths:
-        success = touch(logger=logger, filename=tp)
-        if not success:
-            return False
 
-    if len(projects) > 0:
-        for project in projects:
-            for role in roles:
-                success = create_role(
-                    rolename=role,
-                    directory=f"{project}/roles",
-                    logger=logger,
-                )
-                if not success:
-                    return False
-    else:
-        for role in roles:
-            success = create_role(
-                rolename=role,
-                directory=f"{Path.cwd().resolve()}/roles",
-                logger=logger,
+def get_role_targets(
+    projects: Collection[str], roles: Iterable[str]
+) -> List[Tuple[str, str]]:
+    """Compute the roles required by the layout.
+
+    Args:
+        projects: The project names, if any.
+        roles: The role names.
+
+    Returns:
+        List[Tuple[str, str]]: ``(directory, rolename)`` pairs, where directory
+            is the roles directory relative to the current working directory.
+    """
+    roles_directories = sorted(join_project_paths(projects=projects, paths={"roles"}))
+    return [
+        (directory, rolename) for directory in roles_directories for rolename in roles
+    ]
+
+
+def touch_files(
+    logger: Logger,
+    filenames: Iterable[str],
+    resolver: Union[PathResolver, None] = None,
+    create_only: bool = True,
+    contents: Union["FileContents", None] = None,
+    stats: Union["RunStats", None] = None,
+) -> bool:
+    """Touch each of the relative file paths, stopping on the first failure.
+
+    Args:
+        logger: A logger.
+        filenames: The file paths, relative to the current working directory.
+        resolver (optional): The path resolver to use. Defaults to None, which
+            creates one for the current working directory.
+        create_only (optional): Only create missing files, leaving existing
+            files and their times untouched. Defaults to True.
+        contents (optional): The renderer for the content written to new or
+            empty files. Defaults to None, which leaves them empty.
+        stats (optional): Run stats to record bytes written in. Defaults to
+            None.
+
+    Returns:
+        bool: True if every file was touched, False otherwise.
+    """
+    if resolver is None:
+        resolver = PathResolver()
+    resolved = sorted(
+        ((resolver.resolve(filename), filename) for filename in filenames),
+        key=lambda item: item[0],
+    )
+    for tp, filename in resolved:
+        content = None if contents is None else contents.render(filename)
+        if create_only:
+            success = create_file(
+                logger=logger, filename=tp, content=content, stats=stats
             )
-            if not success:
-                return False
+        else:
+            success = touch(logger=logger, filename=tp, content=content, stats=stats)
+        if not success:
+            return False
     return True
 
 
@@ -133,6 +218,8 @@ def touch(
     logger: Logger,
     filename: Union["StrOrBytesPath", int],
     times: Union[Tuple[int, int], None] = None,
+    content: Union[bytes, None] = None,
+    stats: Union["RunStats", None] = None,
 ) -> bool:
     """Touch the file at the location provided.
 
@@ -140,14 +227,20 @@ def touch(
         logger: A logger.
         filename: The filename to touch.
         times (optional): The access and modification times or None. Defaults to None.
+        content (optional): The content to write if the file is empty. Defaults
+            to None.
+        stats (optional): Run stats to record bytes written in. Defaults to
+            None.
 
     Returns:
         bool: True if the file was touched, False if there was an error.
     """
     try:
         logger.info("creating file %s", filename)
-        with open(filename, "a") as f:
+        with open(filename, "ab") as f:
             try:
+                if content:
+                    write_content(fd=f.fileno(), content=content, stats=stats)
                 utime(filename, times)
             finally:
                 f.close()
@@ -157,53 +250,275 @@ def touch(
         return False
 
 
+def create_file(
+    logger: Logger,
+    filename: "StrOrBytesPath",
+    content: Union[bytes, None] = None,
+    stats: Union["RunStats", None] = None,
+) -> bool:
+    """Create a file unless it already exists, without updating its times.
+
+    Args:
+        logger: A logger.
+        filename: The filename to create.
+        content (optional): The content of a created file. Defaults to None,
+            which leaves it empty.
+        stats (optional): Run stats to record bytes written in. Defaults to
+            None.
+
+    Returns:
+        bool: True if the file was created or exists, False if there was an error.
+    """
+    try:
+        fd = os_open(filename, O_WRONLY | O_CREAT | O_EXCL, 0o666)
+    except FileExistsError:
+        logger.info("file %s exists", fsdecode(filename))
+        return True
+    except Exception:
+        logger.error("failed to create file", exc_info=True)
+        return False
+    try:
+        if content:
+            write_content(fd=fd, content=content, stats=stats)
+    except Exception:
+        logger.error("failed to create file", exc_info=True)
+        return False
+    finally:
+        close(fd)
+    logger.info("creating file %s", fsdecode(filename))
+    return True
+
+
+def write_content(
+    fd: int, content: bytes, stats: Union["RunStats", None] = None
+) -> bool:
+    """Write content to an open file, unless the file already has content.
+
+    Args:
+        fd: The file descriptor, opened for writing.
+        content: The content to write.
+        stats (optional): Run stats to record bytes written in. Defaults to
+            None.
+
+    Returns:
+        bool: True if the content was written, False if the file was not empty.
+    """
+    if fstat(fd).st_size:
+        return False
+    with open(fd, "wb", closefd=False) as f:
+        f.write(content)
+    if stats is not None:
+        stats.add_bytes(len(content))
+    return True
+
+
+def create_roles(
+    role_targets: Sequence[Tuple[str, str]],
+    logger: Logger,
+    backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    jobs: int = 1,
+    stats: Union["RunStats", None] = None,
+) -> bool:
+    """Create many roles, optionally using a bounded pool of worker threads.
+
+    When more than one job is used, the output of each role is buffered and
+    emitted in the order of ``role_targets`` once that role has finished.
+
+    Args:
+        role_targets: A sequence of ``(directory, rolename)`` pairs to create.
+        logger: A logger.
+        backend (optional): The role creation backend. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            backend. Defaults to None.
+        jobs (optional): The maximum number of roles to create concurrently.
+            Defaults to 1.
+        stats (optional): Run stats to record role latencies and bytes written
+            in. Defaults to None.
+
+    Returns:
+        bool: True if every role was created successfully, False otherwise.
+    """
+    if jobs <= 1 or len(role_targets) <= 1:
+        for directory, rolename in role_targets:
+            success = create_role(
+                rolename=rolename,
+                directory=directory,
+                logger=logger,
+                backend=backend,
+                role_skeleton=role_skeleton,
+                stats=stats,
+            )
+            if not success:
+                return False
+        return True
+
+    # imported lazily, they are only needed for concurrent role creation
+    from concurrent.futures import ThreadPoolExecutor
+    from logging.handlers import BufferingHandler
+    from sys import maxsize
+
+    if backend == GALAXY_ROLE_BACKEND:
+        from ansible_generator.galaxy import get_galaxy_skeleton
+
+        # populate the skeleton cache once rather than once per worker
+        if get_galaxy_skeleton(logger=logger, role_skeleton=role_skeleton) is None:
+            return False
+
+    def create_buffered_role(
+        directory: str, rolename: str
+    ) -> Tuple[bool, BufferingHandler]:
+        role_output = BufferingHandler(capacity=maxsize)
+        role_logger = Logger(name=logger.name, level=logger.getEffectiveLevel())
+        role_logger.addHandler(role_output)
+        success = create_role(
+            rolename=rolename,
+            directory=directory,
+            logger=role_logger,
+            backend=backend,
+            role_skeleton=role_skeleton,
+            stats=stats,
+        )
+        return success, role_output
+
+    logger.debug('msg="creating roles concurrently" jobs="%s"', jobs)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(create_buffered_role, directory, rolename)
+            for directory, rolename in role_targets
+        ]
+        for future in futures:
+            success, role_output = future.result()
+            for record in role_output.buffer:
+                logger.handle(record)
+            if not success:
+                for pending in futures:
+                    pending.cancel()
+                return False
+    return True
+
+
 def create_role(
-    rolename: str, directory: Union["StrOrBytesPath", None], logger: Logger
+    rolename: str,
+    directory: Union["StrOrBytesPath", None],
+    logger: Logger,
+    backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    stats: Union["RunStats", None] = None,
 ) -> bool:
-    """Create a role using ansible-galaxy.
+    """Create a role using the requested backend.
 
     Args:
         rolename: The name of the role to generate.
         directory: The directory where the role should be created.
         logger: A logger.
+        backend (optional): Either ``native`` to render the role skeleton
+            in-process or ``galaxy`` to use ansible-galaxy. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            backend. Defaults to None.
+        stats (optional): Run stats to record the role's latency and bytes
+            written in. Defaults to None.
 
     Returns:
         bool: True if the role was created successfully, False if there was an error.
     """
-    with TemporaryFile() as stdoutf:
-        with TemporaryFile() as stderrf:
-            galaxy_executable = which("ansible-galaxy")
-            if galaxy_executable is None:
-                logger.critical(
-                    (
-                        "ansible-galaxy executable was not found in your path, "
-                        "skipping role creation"
-                    )
-                )
-                return False
-            cmd = split(f"{galaxy_executable} init {rolename}")
-            process = Popen(
-                cmd,
-                universal_newlines=True,
-                shell=False,  # nosec
-                cwd=directory,
-                stdout=stdoutf,
-                stderr=stderrf,
-            )
-            process.wait()
+    start = perf_counter()
+    if backend == GALAXY_ROLE_BACKEND:
+        # imported lazily, ansible-galaxy support is only loaded when used
+        from ansible_generator.galaxy import create_galaxy_role
 
-            stdoutf.flush()
-            stdoutf.seek(0)
-            stderrf.flush()
-            stderrf.seek(0)
+        success = create_galaxy_role(
+            rolename=rolename,
+            directory=directory,
+            logger=logger,
+            role_skeleton=role_skeleton,
+            stats=stats,
+        )
+    elif backend == NATIVE_ROLE_BACKEND:
+        native_directory = Path.cwd() if directory is None else fsdecode(directory)
+        success = create_native_role(
+            rolename=rolename, directory=native_directory, logger=logger, stats=stats
+        )
+    else:
+        logger.critical("unknown role backend %s, skipping role creation", backend)
+        return False
+    if success and stats is not None:
+        stats.record_role(seconds=perf_counter() - start)
+    return success
 
-            stdout = stdoutf.read().decode("utf-8")
-            stderr = stderrf.read().decode("utf-8")
 
-            print(f"ansible-galaxy output for role {rolename}:")
-            if stdout:
-                print(stdout.strip())
-            if stderr:
-                print(stderr.strip())
-                return False
-    return True
+def iter_role_entries(
+    rolename: str,
+    logger: Logger,
+    backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+) -> Union[Iterator[RoleEntry], None]:
+    """Render the entries of a role in memory.
+
+    Args:
+        rolename: The name of the role.
+        logger: A logger.
+        backend (optional): The role creation backend, either ``native`` or
+            ``galaxy``. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            role backend. Defaults to None.
+
+    Returns:
+        Union[Iterator[RoleEntry], None]: The role's entries, parents first,
+            or None if the role could not be rendered.
+    """
+    if backend == GALAXY_ROLE_BACKEND:
+        from ansible_generator.galaxy import get_galaxy_skeleton, iter_skeleton_entries
+
+        skeleton_path = get_galaxy_skeleton(logger=logger, role_skeleton=role_skeleton)
+        if skeleton_path is None:
+            return None
+        return iter_skeleton_entries(rolename=rolename, skeleton_path=skeleton_path)
+
+    def iter_native_entries() -> Iterator[RoleEntry]:
+        yield ".", None, DIRECTORY_MODE
+        for role_directory in ROLE_DIRECTORIES:
+            yield role_directory, None, DIRECTORY_MODE
+        for role_file, content in render_role(rolename).items():
+            yield role_file, content.encode("utf-8"), FILE_MODE
+
+    return iter_native_entries()
+
+
+def create_native_role(
+    rolename: str,
+    directory: "StrPath",
+    logger: Logger,
+    stats: Union["RunStats", None] = None,
+) -> bool:
+    """Create a role by writing the ansible-galaxy skeleton directly.
+
+    Existing roles are left untouched so that repeated runs are idempotent.
+
+    Args:
+        rolename: The name of the role to generate.
+        directory: The directory where the role should be created.
+        logger: A logger.
+        stats (optional): Run stats to count bytes written in. Defaults to None.
+
+    Returns:
+        bool: True if the role was created successfully, False if there was an error.
+    """
+    role_path = Path(directory).joinpath(rolename)
+    if role_path.exists():
+        logger.info("role %s exists", role_path)
+        return True
+
+    try:
+        logger.info("creating role %s", role_path)
+        for role_directory in ROLE_DIRECTORIES:
+            role_path.joinpath(role_directory).mkdir(parents=True, exist_ok=True)
+        for role_file, content in render_role(rolename).items():
+            data = content.encode("utf-8")
+            role_path.joinpath(role_file).write_bytes(data)
+            if stats is not None:
+                stats.add_bytes(len(data))
+        return True
+    except Exception:
+        logger.error("failed to create role %s", role_path, exc_info=True)
+        return False
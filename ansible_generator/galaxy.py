@@ -0,0 +1,499 @@
+"""galaxy creates roles with ansible-galaxy, caching the generated skeleton."""
+from functools import lru_cache, partial
+from hashlib import sha256
+from importlib.metadata import PackageNotFoundError, version
+from logging import Logger
+from os import chmod, fsdecode, getenv, rename, stat, walk
+from pathlib import Path
+from shlex import split
+from shutil import rmtree, which
+from stat import S_IMODE
+from subprocess import Popen  # nosec
+from tempfile import TemporaryFile, mkdtemp
+from typing import TYPE_CHECKING, Iterator, List, Tuple, Union
+
+if TYPE_CHECKING:
+    from _typeshed import StrOrBytesPath, StrPath
+
+    from ansible_generator.stats import RunStats
+
+SKELETON_ROLE_NAME = "ansible_generator_skeleton"
+
+
+def get_cache_directory() -> Path:
+    """Get the directory used to cache ansible-galaxy role skeletons.
+
+    Returns:
+        Path: ``$XDG_CACHE_HOME/ansible-generator/skeletons``, falling back to
+            ``~/.cache`` when ``XDG_CACHE_HOME`` is not set.
+    """
+    cache_home = getenv("XDG_CACHE_HOME") or Path.home().joinpath(".cache")
+    return Path(cache_home).joinpath("ansible-generator", "skeletons")
+
+
+def get_skeleton_cache_key(
+    galaxy_executable: str, role_skeleton: Union[str, None] = None
+) -> str:
+    """Build the cache key for an ansible-galaxy role skeleton.
+
+    Args:
+        galaxy_executable: The path to the ansible-galaxy executable.
+        role_skeleton (optional): The custom role skeleton path passed to
+            ansible-galaxy, if any. Defaults to None.
+
+    Returns:
+        str: A key identifying the ansible version and skeleton in use,
+            including the state of a custom skeleton's files.
+    """
+    try:
+        ansible_version = version("ansible-core")
+    except PackageNotFoundError:
+        ansible_version = "unknown"
+    if role_skeleton is None:
+        role_skeleton = getenv("ANSIBLE_ROLE_SKELETON", "default")
+    skeleton_digest = (
+        "" if role_skeleton == "default" else digest_skeleton_tree(role_skeleton)
+    )
+    key = "\0".join(
+        (galaxy_executable, ansible_version, role_skeleton, skeleton_digest)
+    )
+    return sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def digest_skeleton_tree(role_skeleton: str) -> str:
+    """Digest the paths, sizes, modes and modification times in a custom role
+    skeleton, so that editing it invalidates the cache. The tree is walked on
+    every call, so a long-lived process sees edits too.
+
+    Args:
+        role_skeleton: The custom role skeleton path.
+
+    Returns:
+        str: The digest, which is the same for a missing skeleton.
+    """
+    digest = sha256()
+    for root, dirnames, filenames in walk(role_skeleton):
+        dirnames.sort()
+        for name in ("", *sorted(filenames)):
+            path = Path(root).joinpath(name)
+            try:
+                status = stat(path)
+            except OSError:
+                continue
+            entry = (
+                f"{path.relative_to(role_skeleton).as_posix()}\0{status.st_size}"
+                f"\0{status.st_mode}\0{status.st_mtime_ns}\0"
+            )
+            digest.update(entry.encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+
+def run_galaxy_init(
+    galaxy_executable: str,
+    rolename: str,
+    directory: Union["StrOrBytesPath", None],
+    logger: Logger,
+    role_skeleton: Union[str, None] = None,
+) -> bool:
+    """Run ``ansible-galaxy init`` for a single role.
+
+    Args:
+        galaxy_executable: The path to the ansible-galaxy executable.
+        rolename: The name of the role to generate.
+        directory: The directory where the role should be created.
+        logger: A logger.
+        role_skeleton (optional): A custom role skeleton path. Defaults to None.
+
+    Returns:
+        bool: True if the role was created successfully, False if there was an error.
+    """
+    with TemporaryFile() as stdoutf:
+        with TemporaryFile() as stderrf:
+            cmd = split(f"{galaxy_executable} init {rolename}")
+            if role_skeleton is not None:
+                cmd.extend(["--role-skeleton", role_skeleton])
+            logger.debug('msg="running ansible-galaxy" cmd="%s"', cmd)
+            process = Popen(
+                cmd,
+                universal_newlines=True,
+                shell=False,  # nosec
+                cwd=directory,
+                stdout=stdoutf,
+                stderr=stderrf,
+            )
+            process.wait()
+
+            stdoutf.flush()
+            stdoutf.seek(0)
+            stderrf.flush()
+            stderrf.seek(0)
+
+            stdout = stdoutf.read().decode("utf-8")
+            stderr = stderrf.read().decode("utf-8")
+
+            logger.info("ansible-galaxy output for role %s:", rolename)
+            if stdout:
+                logger.info(stdout.strip())
+            if stderr:
+                logger.error(stderr.strip())
+                return False
+    return True
+
+
+async def arun_galaxy_init(
+    galaxy_executable: str,
+    rolename: str,
+    directory: Union["StrOrBytesPath", None],
+    logger: Logger,
+    role_skeleton: Union[str, None] = None,
+) -> bool:
+    """Run ``ansible-galaxy init`` for a single role as an asyncio subprocess.
+
+    The subprocess is killed if the calling task is cancelled.
+
+    Args:
+        galaxy_executable: The path to the ansible-galaxy executable.
+        rolename: The name of the role to generate.
+        directory: The directory where the role should be created.
+        logger: A logger.
+        role_skeleton (optional): A custom role skeleton path. Defaults to None.
+
+    Returns:
+        bool: True if the role was created successfully, False if there was an error.
+    """
+    from asyncio import CancelledError, create_subprocess_exec
+    from asyncio.subprocess import PIPE
+
+    cmd = split(f"{galaxy_executable} init {rolename}")
+    if role_skeleton is not None:
+        cmd.extend(["--role-skeleton", role_skeleton])
+    logger.debug('msg="running ansible-galaxy" cmd="%s"', cmd)
+    process = await create_subprocess_exec(
+        *cmd, cwd=directory, stdout=PIPE, stderr=PIPE
+    )
+    try:
+        stdout_bytes, stderr_bytes = await process.communicate()
+    except CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+
+    stdout = stdout_bytes.decode("utf-8")
+    stderr = stderr_bytes.decode("utf-8")
+    logger.info("ansible-galaxy output for role %s:", rolename)
+    if stdout:
+        logger.info(stdout.strip())
+    if stderr:
+        logger.error(stderr.strip())
+        return False
+    return True
+
+
+def get_galaxy_skeleton(
+    logger: Logger, role_skeleton: Union[str, None] = None
+) -> Union[Path, None]:
+    """Get the cached ansible-galaxy role skeleton, generating it if needed.
+
+    Args:
+        logger: A logger.
+        role_skeleton (optional): A custom role skeleton path. Defaults to None.
+
+    Returns:
+        Union[Path, None]: The path to the cached skeleton role, or None if it
+            could not be generated.
+    """
+    cache = get_skeleton_cache(logger=logger, role_skeleton=role_skeleton)
+    if cache is None:
+        return None
+    galaxy_executable, cached_path = cache
+    skeleton_path = cached_path.joinpath(SKELETON_ROLE_NAME)
+    if skeleton_path.is_dir():
+        logger.debug('msg="role skeleton cache hit" path="%s"', skeleton_path)
+        return skeleton_path
+
+    logger.debug('msg="role skeleton cache miss" path="%s"', skeleton_path)
+    staging_path = create_staging_directory(logger=logger, cached_path=cached_path)
+    if staging_path is None:
+        return None
+    success = run_galaxy_init(
+        galaxy_executable=galaxy_executable,
+        rolename=SKELETON_ROLE_NAME,
+        directory=staging_path,
+        logger=logger,
+        role_skeleton=role_skeleton,
+    )
+    return install_skeleton(
+        staging_path=staging_path, cached_path=cached_path, success=success
+    )
+
+
+async def aget_galaxy_skeleton(
+    logger: Logger, role_skeleton: Union[str, None] = None
+) -> Union[Path, None]:
+    """Get the cached ansible-galaxy role skeleton without blocking the event
+    loop, generating it with an asyncio subprocess if needed.
+
+    Args:
+        logger: A logger.
+        role_skeleton (optional): A custom role skeleton path. Defaults to None.
+
+    Returns:
+        Union[Path, None]: The path to the cached skeleton role, or None if it
+            could not be generated.
+    """
+    from asyncio import CancelledError
+
+    from ansible_generator.aio import offload
+
+    cache = await offload(partial(get_skeleton_cache, logger, role_skeleton))
+    if cache is None:
+        return None
+    galaxy_executable, cached_path = cache
+    skeleton_path = cached_path.joinpath(SKELETON_ROLE_NAME)
+    if await offload(skeleton_path.is_dir):
+        logger.debug('msg="role skeleton cache hit" path="%s"', skeleton_path)
+        return skeleton_path
+
+    logger.debug('msg="role skeleton cache miss" path="%s"', skeleton_path)
+    staging_path = await offload(partial(create_staging_directory, logger, cached_path))
+    if staging_path is None:
+        return None
+    try:
+        success = await arun_galaxy_init(
+            galaxy_executable=galaxy_executable,
+            rolename=SKELETON_ROLE_NAME,
+            directory=staging_path,
+            logger=logger,
+            role_skeleton=role_skeleton,
+        )
+    except CancelledError:
+        rmtree(staging_path, ignore_errors=True)
+        raise
+    return await offload(partial(install_skeleton, staging_path, cached_path, success))
+
+
+@lru_cache(maxsize=None)
+def find_galaxy_executable(search_path: Union[str, None]) -> Union[str, None]:
+    """Find ansible-galaxy, remembering the result for each search path.
+
+    Args:
+        search_path: The ``PATH`` to search, or None for the default path.
+
+    Returns:
+        Union[str, None]: The path to ansible-galaxy, if found.
+    """
+    return which("ansible-galaxy", path=search_path)
+
+
+def get_skeleton_cache(
+    logger: Logger, role_skeleton: Union[str, None] = None
+) -> Union[Tuple[str, Path], None]:
+    """Find ansible-galaxy and the cache path of its role skeleton.
+
+    Args:
+        logger: A logger.
+        role_skeleton (optional): A custom role skeleton path. Defaults to None.
+
+    Returns:
+        Union[Tuple[str, Path], None]: The ansible-galaxy executable and the
+            cache path, or None if ansible-galaxy was not found.
+    """
+    galaxy_executable = find_galaxy_executable(search_path=getenv("PATH"))
+    if galaxy_executable is None:
+        logger.critical(
+            (
+                "ansible-galaxy executable was not found in your path, "
+                "skipping role creation"
+            )
+        )
+        return None
+    cache_key = get_skeleton_cache_key(
+        galaxy_executable=galaxy_executable, role_skeleton=role_skeleton
+    )
+    return galaxy_executable, get_cache_directory().joinpath(cache_key)
+
+
+def create_staging_directory(logger: Logger, cached_path: Path) -> Union[Path, None]:
+    """Create a directory to generate a skeleton in, next to its cache path.
+
+    Args:
+        logger: A logger.
+        cached_path: The cache path of the skeleton.
+
+    Returns:
+        Union[Path, None]: The staging directory, or None if it could not be
+            created.
+    """
+    cache_directory = cached_path.parent
+    try:
+        cache_directory.mkdir(parents=True, exist_ok=True)
+        return Path(mkdtemp(prefix=f".{cached_path.name}-", dir=cache_directory))
+    except Exception:
+        logger.error("failed to create %s", cache_directory, exc_info=True)
+        return None
+
+
+def install_skeleton(
+    staging_path: Path, cached_path: Path, success: bool
+) -> Union[Path, None]:
+    """Move a generated skeleton into the cache, or discard it on failure.
+
+    Args:
+        staging_path: The directory the skeleton was generated in.
+        cached_path: The cache path of the skeleton.
+        success: Whether ansible-galaxy succeeded.
+
+    Returns:
+        Union[Path, None]: The path to the cached skeleton role, or None if
+            ansible-galaxy failed.
+    """
+    if not success:
+        rmtree(staging_path, ignore_errors=True)
+        return None
+    try:
+        rename(staging_path, cached_path)
+    except OSError:
+        # another process populated the cache first, use its copy
+        rmtree(staging_path, ignore_errors=True)
+    return cached_path.joinpath(SKELETON_ROLE_NAME)
+
+
+def materialize_role(
+    rolename: str,
+    skeleton_path: "StrPath",
+    directory: "StrPath",
+    logger: Logger,
+    stats: Union["RunStats", None] = None,
+) -> bool:
+    """Copy a cached role skeleton into place under a new role name.
+
+    Existing roles are left untouched so that repeated runs are idempotent.
+
+    Args:
+        rolename: The name of the role to generate.
+        skeleton_path: The path to the cached skeleton role.
+        directory: The directory where the role should be created.
+        logger: A logger.
+        stats (optional): Run stats to count bytes written in. Defaults to None.
+
+    Returns:
+        bool: True if the role was created successfully, False if there was an error.
+    """
+    role_path = Path(directory).joinpath(rolename)
+    if role_path.exists():
+        logger.info("role %s exists", role_path)
+        return True
+
+    try:
+        logger.info("creating role %s", role_path)
+        for relative_path, content, mode in iter_skeleton_entries(
+            rolename=rolename, skeleton_path=skeleton_path
+        ):
+            target = role_path.joinpath(relative_path)
+            if content is None:
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            target.write_bytes(content)
+            chmod(target, mode)
+            if stats is not None:
+                stats.add_bytes(len(content))
+        return True
+    except Exception:
+        logger.error("failed to create role %s", role_path, exc_info=True)
+        return False
+
+
+def iter_skeleton_entries(
+    rolename: str, skeleton_path: "StrPath"
+) -> Iterator[Tuple[str, Union[bytes, None], int]]:
+    """Read a cached role skeleton under a new role name, parents first.
+
+    Args:
+        rolename: The name of the role to generate.
+        skeleton_path: The path to the cached skeleton role.
+
+    Yields:
+        Tuple[str, Union[bytes, None], int]: The path relative to the role,
+            the file content or None for a directory, and the permission bits.
+    """
+    skeleton_name = SKELETON_ROLE_NAME.encode("utf-8")
+    for relative_path, content, mode in read_skeleton(fsdecode(skeleton_path)):
+        yield (
+            relative_path.replace(SKELETON_ROLE_NAME, rolename),
+            (
+                None
+                if content is None
+                else content.replace(skeleton_name, rolename.encode("utf-8"))
+            ),
+            mode,
+        )
+
+
+@lru_cache(maxsize=None)
+def read_skeleton(
+    skeleton_path: str,
+) -> Tuple[Tuple[str, Union[bytes, None], int], ...]:
+    """Read a cached role skeleton once per process, parents first.
+
+    A cache path is keyed by the ansible version, the custom skeleton path and
+    the paths, sizes, modes and modification times of its files, so a cached
+    skeleton never changes and its contents are kept in memory for every later
+    role.
+
+    Args:
+        skeleton_path: The path to the cached skeleton role.
+
+    Returns:
+        Tuple[Tuple[str, Union[bytes, None], int], ...]: The path relative to
+            the role, the file content or None for a directory, and the
+            permission bits of every entry.
+    """
+    entries: List[Tuple[str, Union[bytes, None], int]] = []
+    for root, dirnames, filenames in walk(skeleton_path):
+        dirnames.sort()
+        relative_root = Path(root).relative_to(skeleton_path)
+        entries.append((relative_root.as_posix(), None, S_IMODE(stat(root).st_mode)))
+        for filename in sorted(filenames):
+            source = Path(root).joinpath(filename)
+            entries.append(
+                (
+                    relative_root.joinpath(filename).as_posix(),
+                    source.read_bytes(),
+                    S_IMODE(source.stat().st_mode),
+                )
+            )
+    return tuple(entries)
+
+
+def create_galaxy_role(
+    rolename: str,
+    directory: Union["StrOrBytesPath", None],
+    logger: Logger,
+    role_skeleton: Union[str, None] = None,
+    stats: Union["RunStats", None] = None,
+) -> bool:
+    """Create a role from the cached ansible-galaxy skeleton.
+
+    ansible-galaxy is only executed when the skeleton for the installed
+    ansible version and role skeleton is not yet cached.
+
+    Args:
+        rolename: The name of the role to generate.
+        directory: The directory where the role should be created.
+        logger: A logger.
+        role_skeleton (optional): A custom role skeleton path. Defaults to None.
+        stats (optional): Run stats to count bytes written in. Defaults to None.
+
+    Returns:
+        bool: True if the role was created successfully, False if there was an error.
+    """
+    skeleton_path = get_galaxy_skeleton(logger=logger, role_skeleton=role_skeleton)
+    if skeleton_path is None:
+        return False
+    return materialize_role(
+        rolename=rolename,
+        skeleton_path=skeleton_path,
+        directory=Path.cwd() if directory is None else fsdecode(directory),
+        logger=logger,
+        stats=stats,
+    )
@@ -1,26 +1,49 @@
 """Create a logger instance """
+from functools import lru_cache
 from logging import ERROR, INFO, Logger, basicConfig, getLogger
 from os import getenv
 from typing import Union
 
-from sentry_sdk import init
-from sentry_sdk.integrations.logging import LoggingIntegration
-
-from ansible_generator.version import __version__
+# Seconds to wait at exit for queued events, which only delays runs that
+# logged an error, as the transport returns at once when its queue is empty.
+SENTRY_SHUTDOWN_TIMEOUT = 1
 
 
+@lru_cache(maxsize=None)
 def configure_sentry() -> None:
-    """Configure the Sentry telemetry, unless disabled."""
+    """Configure the Sentry telemetry, unless disabled.
+
+    Only the first call in a process has any effect. sentry_sdk is imported
+    lazily so that it is never loaded when telemetry is disabled, and events
+    are sent by its background transport, which is only waited on at exit
+    while events are still queued.
+    """
     disabled = getenv(key="DISABLE_ANSIBLE_GENERATE_TELEMETRY", default=False)
     if not disabled:
+        from sentry_sdk import init
+        from sentry_sdk.integrations.logging import LoggingIntegration
+
+        from ansible_generator.version import __version__
+
         sentry_logging = LoggingIntegration(level=INFO, event_level=ERROR)
         init(
             dsn="https://036bd28e074a4a4a99712dc05c9f768e@sentry.io/202195",
             integrations=[sentry_logging],
             release=__version__,
+            shutdown_timeout=SENTRY_SHUTDOWN_TIMEOUT,
         )
 
 
+def flush_sentry() -> None:
+    """Send any queued Sentry events, for processes which exit without running
+    the interpreter's exit handlers.
+    """
+    import sys
+
+    if "sentry_sdk" in sys.modules:
+        sys.modules["sentry_sdk"].flush(timeout=SENTRY_SHUTDOWN_TIMEOUT)
+
+
 def setup_logger(name: Union[str, None] = None, log_level: int = INFO) -> Logger:
     """Setup a new Logger instance.
 
@@ -33,7 +56,6 @@ def setup_logger(name: Union[str, None] = None, log_level: int = INFO) -> Logger
     """
     log_format = "%(message)s"
     basicConfig(format=log_format)
-    configure_sentry()
     logger = getLogger(name)
     logger.setLevel(log_level)
     return logger
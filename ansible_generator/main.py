@@ -1,11 +1,34 @@
 # -*- coding: utf-8 -*-
 """main defines the entrypoint into the application."""
-from logging import INFO, Logger
-from typing import MutableSequence, Union
+from contextlib import ExitStack
+from itertools import chain
+from logging import DEBUG, INFO, Logger
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, MutableSequence, Union
 
-from ansible_generator.directories import create_directory_layout
-from ansible_generator.files import create_file_layout
-from ansible_generator.log import setup_logger
+from ansible_generator.backends import FilesystemBackend
+from ansible_generator.content import FileContents, LayoutTemplates
+from ansible_generator.executor import (
+    DryRunReport,
+    FailureReport,
+    apply_plan,
+    apply_plan_atomically,
+    apply_plan_keep_going,
+    dry_run_plan,
+)
+from ansible_generator.files import NATIVE_ROLE_BACKEND
+from ansible_generator.log import configure_sentry, setup_logger
+from ansible_generator.manifest import (
+    MANIFEST_NAME,
+    Manifest,
+    digest_inputs,
+    load_manifest,
+    write_manifest,
+)
+from ansible_generator.plan import LayoutPlan, build_plan, iter_plans
+from ansible_generator.preflight import PreflightIndex
+from ansible_generator.spec import ProjectSpec, build_spec_plan
+from ansible_generator.stats import RunStats
 
 
 class AnsibleGenerator:
@@ -16,8 +39,24 @@ class AnsibleGenerator:
     projects: MutableSequence[str]
     inventories: MutableSequence[str]
     roles: MutableSequence[str]
+    specs: Union[List[ProjectSpec], None]
+    project_stream: Union[Iterable[str], None]
+    manifest: Union[str, None]
+    create_only: bool
+    atomic: bool
+    archive: Union[str, None]
+    archive_format: Union[str, None]
+    backend: Union[FilesystemBackend, None]
+    keep_going: bool
+    shards: int
+    templates: Union[LayoutTemplates, None]
+    failures: FailureReport
+    stats: RunStats
 
     alternate_layout: bool
+    role_backend: str
+    role_skeleton: Union[str, None]
+    jobs: int
     verbosity: int
     logger: Logger
 
@@ -28,6 +67,20 @@ class AnsibleGenerator:
         roles: Union[MutableSequence[str], None] = None,
         alternate_layout: bool = False,
         verbosity: int = INFO,
+        role_backend: str = NATIVE_ROLE_BACKEND,
+        role_skeleton: Union[str, None] = None,
+        jobs: int = 1,
+        specs: Union[List[ProjectSpec], None] = None,
+        project_stream: Union[Iterable[str], None] = None,
+        manifest: Union[str, None] = MANIFEST_NAME,
+        create_only: bool = True,
+        atomic: bool = False,
+        archive: Union[str, None] = None,
+        archive_format: Union[str, None] = None,
+        backend: Union[FilesystemBackend, None] = None,
+        keep_going: bool = False,
+        shards: int = 1,
+        templates: Union[LayoutTemplates, None] = None,
     ) -> None:
         """Initialize an AnsibleGenerator instance
 
@@ -36,11 +89,59 @@ class AnsibleGenerator:
                 Defaults to None.
             projects (optional): The list of projects to create, if desired.
                 Defaults to None.
-            roles (optional): The list of roles to generate using ansible-galaxy, if
-                desired. Defaults to None.
+            roles (optional): The list of roles to generate, if desired.
+                Defaults to None.
             alternate_layout (optional): Whether the alternative layout should be used.
                 Defaults to False.
             verbosity (optional): The logging level to use. Defaults to INFO.
+            role_backend (optional): How roles are created, either ``native`` or
+                ``galaxy``. Defaults to ``native``.
+            role_skeleton (optional): A custom ansible-galaxy role skeleton path,
+                used by the ``galaxy`` role backend. Defaults to None.
+            jobs (optional): The number of directory groups, file groups or
+                roles to create concurrently. Defaults to 1.
+            specs (optional): Project specs, usually loaded from a spec file, to
+                generate instead of ``projects``, ``inventories``, ``roles`` and
+                ``alternate_layout``. Defaults to None.
+            project_stream (optional): A lazy iterable of additional project
+                names, such as lines read from a file, which is generated in
+                batches to keep memory bounded. Defaults to None.
+            manifest (optional): The path of the manifest recording the applied
+                layout, relative to the current working directory. Runs with the
+                same inputs as the manifest do nothing while every recorded
+                entry exists, and other runs apply the whole layout, skipping
+                existing entries. Defaults to ``.ansible-generator.lock``, and
+                None disables the manifest.
+            create_only (optional): Only create missing files, leaving existing
+                files and their times untouched. False updates the times of
+                every file and checks the whole layout rather than using the
+                manifest. Defaults to True.
+            atomic (optional): Build the missing layout in a staging directory
+                and move it into place only once it is complete, which implies
+                ``create_only``. Defaults to False.
+            archive (optional): A path, or ``-`` for stdout, to write the layout
+                to as an archive instead of creating it on disk. Defaults to None.
+            archive_format (optional): The archive format, either ``tar.gz`` or
+                ``zip``. Defaults to None, which chooses from the archive path.
+            backend (optional): The filesystem backend to create the layout in,
+                such as a ``MemoryBackend``. Defaults to None, which creates it on
+                disk relative to the current working directory. The manifest and
+                atomic mode are only used with the default backend.
+            keep_going (optional): Apply each project independently, running
+                ``jobs`` projects concurrently, and keep going when one fails.
+                ``run`` then returns a report of every failure, and atomic mode
+                is not used. Defaults to False.
+            shards (optional): The number of worker processes to split the
+                projects across. Each process builds and applies the plan for
+                its own projects, ``jobs`` at a time, and keeps going past
+                failures, so ``run`` returns a report of every failure. Sharded
+                runs create the layout on disk without a manifest or atomic
+                mode. Defaults to 1, which applies the layout in this process.
+            templates (optional): Compiled templates for the content of
+                ``site.yml``, the inventories and the group_vars and host_vars
+                files they add, written as each file is created. Existing
+                files are left as they are. Defaults to None, which creates
+                empty files.
         """
         if projects is None:
             projects = []
@@ -51,33 +152,496 @@ class AnsibleGenerator:
 
         self.verbosity = verbosity
         self.logger = setup_logger(name=__name__, log_level=self.verbosity)
-        self.logger.debug(
-            (
-                'msg="initializing generator" inventories="%s" '
-                + 'alternate_layout="%s" projects="%s"'
-            ),
-            ", ".join(inventories),
-            alternate_layout,
-            ", ".join(projects),
-        )
+        self.stats = RunStats()
+        with self.stats.phase("telemetry"):
+            configure_sentry()
+        if self.logger.isEnabledFor(DEBUG):
+            self.logger.debug(
+                (
+                    'msg="initializing generator" inventories="%s" '
+                    + 'alternate_layout="%s" projects="%s"'
+                ),
+                ", ".join(inventories),
+                alternate_layout,
+                ", ".join(projects),
+            )
         self.projects = projects
         self.inventories = inventories
         self.alternate_layout = alternate_layout
         self.roles = roles
+        self.role_backend = role_backend
+        self.role_skeleton = role_skeleton
+        self.jobs = jobs
+        self.specs = specs
+        self.project_stream = project_stream
+        self.manifest = manifest
+        self.create_only = create_only
+        self.atomic = atomic
+        self.archive = archive
+        self.archive_format = archive_format
+        self.backend = backend
+        self.keep_going = keep_going
+        self.shards = shards
+        self.templates = templates
+        self.failures = FailureReport()
 
-    def run(self) -> None:
-        """Run the ansible-generator behavior."""
-        self.logger.debug('msg="beginning create directory"')
-        if create_directory_layout(
-            projects=self.projects,
-            inventories=self.inventories,
-            alternate_layout=self.alternate_layout,
-            verbosity=self.verbosity,
-        ):
-            create_file_layout(
+    def inputs(self) -> Dict[str, Any]:
+        """Describe the inputs which determine the layout.
+
+        Returns:
+            Dict[str, Any]: The inputs as JSON serializable primitives.
+        """
+        from ansible_generator.version import __version__
+
+        inputs = {
+            "version": __version__,
+            "projects": list(self.projects),
+            "inventories": list(self.inventories),
+            "roles": list(self.roles),
+            "alternate_layout": self.alternate_layout,
+            "specs": (
+                None if self.specs is None else [spec.to_dict() for spec in self.specs]
+            ),
+            "role_backend": self.role_backend,
+            "role_skeleton": self.role_skeleton,
+        }
+        # only recorded when used, so earlier manifests stay up to date
+        if self.templates is not None:
+            inputs["templates"] = self.templates.to_dict()
+        return inputs
+
+    def build_plan(self) -> LayoutPlan:
+        """Build the layout plan for this generator's inputs.
+
+        Returns:
+            LayoutPlan: The directories, files and roles which make up the layout.
+        """
+        if self.specs is not None:
+            plan = build_spec_plan(logger=self.logger, specs=self.specs)
+        else:
+            plan = build_plan(
+                logger=self.logger,
                 projects=self.projects,
                 inventories=self.inventories,
-                alternate_layout=self.alternate_layout,
                 roles=self.roles,
-                verbosity=self.verbosity,
+                alternate_layout=self.alternate_layout,
+            )
+        return plan if self.templates is None else self.templates.extend(plan)
+
+    def iter_plans(self) -> Iterator[LayoutPlan]:
+        """Lazily build the layout plans for this generator's inputs.
+
+        A single plan is built unless a project stream was provided, in which
+        case one plan is built per batch of projects.
+
+        Yields:
+            LayoutPlan: The directories, files and roles which make up the layout.
+        """
+        if self.specs is not None or self.project_stream is None:
+            yield self.build_plan()
+            return
+        for plan in iter_plans(
+            logger=self.logger,
+            projects=chain(self.projects, self.project_stream),
+            inventories=self.inventories,
+            roles=self.roles,
+            alternate_layout=self.alternate_layout,
+        ):
+            yield plan if self.templates is None else self.templates.extend(plan)
+
+    def bind_contents(self, plan: LayoutPlan) -> Union[FileContents, None]:
+        """Prepare the templates to render the files of a plan.
+
+        Args:
+            plan: The layout plan to render.
+
+        Returns:
+            Union[FileContents, None]: The renderer, or None without templates.
+        """
+        return None if self.templates is None else self.templates.bind(plan)
+
+    def run(self, dry_run: bool = False) -> Union[DryRunReport, FailureReport, None]:
+        """Run the ansible-generator behavior.
+
+        Args:
+            dry_run (optional): Report what would be created instead of creating
+                it. Defaults to False.
+
+        Phase times and counts of the run are recorded in ``stats``, which
+        keeps the time spent configuring telemetry when the generator was
+        created.
+
+        Returns:
+            Union[DryRunReport, FailureReport, None]: The report when ``dry_run``
+                is set, the failures when ``keep_going`` is set, the run is
+                sharded or the archive could not be written, else None.
+        """
+        self.logger.debug('msg="building layout plan"')
+        self.reset()
+        if dry_run:
+            if self.uses_manifest():
+                manifest_path = Path(self.manifest or MANIFEST_NAME)
+                with self.stats.phase("manifest"):
+                    inputs = self.inputs()
+                    previous = load_manifest(path=manifest_path, logger=self.logger)
+                if previous is not None and self.is_up_to_date(
+                    path=manifest_path, inputs=inputs, previous=previous
+                ):
+                    # a real run would stop here, as every recorded entry exists
+                    plan = previous.plan
+                    return DryRunReport(
+                        plan=plan,
+                        existing_directories=list(plan.directories),
+                        existing_files=list(plan.files),
+                        existing_roles=list(plan.roles),
+                    )
+            with self.stats.phase("dry_run"):
+                reports = [
+                    dry_run_plan(plan=plan, logger=self.logger, backend=self.backend)
+                    for plan in self.stats.time_iter("plan", self.iter_plans())
+                ]
+            return DryRunReport(
+                plan=LayoutPlan(),
+                existing_directories=[],
+                existing_files=[],
+                existing_roles=[],
+            ).merge(*reports)
+        if self.archive is not None:
+            with self.stats.phase("archive"):
+                if not self.write_archive(path=self.archive):
+                    self.failures = FailureReport(
+                        attempted=1,
+                        failures={self.archive: ["failed to write the archive"]},
+                    )
+                    return self.failures
+            return None
+        if (
+            self.shards > 1
+            and self.backend is None
+            and (self.projects or self.specs or self.project_stream is not None)
+        ):
+            self.failures = self.run_sharded()
+            return self.failures
+        if not self.uses_manifest():
+            for plan in self.stats.time_iter("plan", self.iter_plans()):
+                if not self.apply(plan=plan) and not self.keep_going:
+                    break
+            return self.failures if self.keep_going else None
+
+        manifest_path = Path(self.manifest or MANIFEST_NAME)
+        with self.stats.phase("manifest"):
+            inputs = self.inputs()
+            previous = load_manifest(path=manifest_path, logger=self.logger)
+        if self.is_up_to_date(path=manifest_path, inputs=inputs, previous=previous):
+            return None
+
+        with self.stats.phase("plan"):
+            plan = self.build_plan()
+        if self.apply(plan=plan):
+            with self.stats.phase("manifest"):
+                self.save_manifest(path=manifest_path, inputs=inputs, plan=plan)
+        return self.failures if self.keep_going else None
+
+    async def arun(
+        self, dry_run: bool = False
+    ) -> Union[DryRunReport, FailureReport, None]:
+        """Run the ansible-generator behavior without blocking the event loop.
+
+        Filesystem work is offloaded to the event loop's default executor in
+        batches, and the galaxy role skeleton is generated with an asyncio
+        subprocess. Cancelling the task stops the run once the batch in
+        progress has finished, without recording a manifest, so a later run
+        picks up where it stopped. Dry runs, archives, atomic and sharded runs
+        are offloaded whole, and finish before a cancellation takes effect.
+
+        Args:
+            dry_run (optional): Report what would be created instead of creating
+                it. Defaults to False.
+
+        Returns:
+            Union[DryRunReport, FailureReport, None]: The same as ``run``.
+        """
+        from functools import partial
+
+        from ansible_generator.aio import offload
+
+        if dry_run or self.archive is not None or self.atomic or self.shards > 1:
+            return await offload(partial(self.run, dry_run=dry_run))
+
+        self.logger.debug('msg="building layout plan"')
+        self.reset()
+        if not self.uses_manifest():
+            plans = self.iter_plans()
+            while True:
+                with self.stats.phase("plan"):
+                    plan = await offload(partial(next, plans, None))
+                if plan is None:
+                    break
+                if not await self.aapply(plan=plan) and not self.keep_going:
+                    break
+            return self.failures if self.keep_going else None
+
+        manifest_path = Path(self.manifest or MANIFEST_NAME)
+        with self.stats.phase("manifest"):
+            inputs = self.inputs()
+            previous = await offload(
+                partial(load_manifest, path=manifest_path, logger=self.logger)
+            )
+        if await offload(
+            partial(
+                self.is_up_to_date,
+                path=manifest_path,
+                inputs=inputs,
+                previous=previous,
             )
+        ):
+            return None
+
+        with self.stats.phase("plan"):
+            plan = await offload(self.build_plan)
+        if await self.aapply(plan=plan):
+            with self.stats.phase("manifest"):
+                await offload(
+                    partial(
+                        self.save_manifest,
+                        path=manifest_path,
+                        inputs=inputs,
+                        plan=plan,
+                    )
+                )
+        return self.failures if self.keep_going else None
+
+    def reset(self) -> None:
+        """Clear the failures and stats of a previous run, keeping the time
+        spent configuring telemetry.
+        """
+        self.failures = FailureReport()
+        telemetry = self.stats.phases.get("telemetry")
+        self.stats = RunStats()
+        if telemetry is not None:
+            self.stats.add_time(name="telemetry", seconds=telemetry)
+
+    def uses_manifest(self) -> bool:
+        """Check whether runs record and compare against the manifest.
+
+        Returns:
+            bool: True unless the manifest is disabled, a backend or project
+                stream is used, or files have their times updated.
+        """
+        return (
+            self.manifest is not None
+            and self.backend is None
+            and self.project_stream is None
+            and self.create_only
+        )
+
+    def is_up_to_date(
+        self, path: Path, inputs: Dict[str, Any], previous: Union[Manifest, None]
+    ) -> bool:
+        """Check whether the manifest records a run with the same inputs, and
+        every entry it recorded still exists.
+
+        Args:
+            path: The manifest path.
+            inputs: The inputs of this run.
+            previous: The previous manifest, if any.
+
+        Returns:
+            bool: True if the layout is up to date.
+        """
+        if previous is None or previous.digest != digest_inputs(inputs):
+            return False
+        with self.stats.phase("preflight"):
+            plan = previous.plan
+            directories, files, roles = PreflightIndex().existing(plan)
+        if (len(directories), len(files), len(roles)) != (
+            len(plan.directories),
+            len(plan.files),
+            len(plan.roles),
+        ):
+            self.logger.info("layout has changed since %s was recorded", path)
+            return False
+        self.logger.info("layout is up to date with %s", path)
+        return True
+
+    def save_manifest(
+        self, path: Path, inputs: Dict[str, Any], plan: LayoutPlan
+    ) -> None:
+        """Record the applied layout in the manifest.
+
+        Args:
+            path: The manifest path.
+            inputs: The inputs of this run.
+            plan: The whole plan.
+        """
+        write_manifest(path=path, manifest=Manifest(inputs=inputs, plan=plan))
+
+    def run_sharded(self) -> FailureReport:
+        """Apply the layout across ``shards`` worker processes.
+
+        Returns:
+            FailureReport: The errors of every project which failed.
+        """
+        from ansible_generator.shard import apply_shards
+
+        if self.specs is not None:
+            projects: Iterable[str] = ()
+            count: Union[int, None] = len(self.specs)
+        elif self.project_stream is not None:
+            projects = chain(self.projects, self.project_stream)
+            count = None
+        else:
+            projects = self.projects
+            count = len(self.projects)
+        return apply_shards(
+            logger=self.logger,
+            projects=projects,
+            specs=self.specs,
+            count=count,
+            processes=self.shards,
+            inventories=self.inventories,
+            roles=self.roles,
+            alternate_layout=self.alternate_layout,
+            role_backend=self.role_backend,
+            role_skeleton=self.role_skeleton,
+            jobs=self.jobs,
+            create_only=self.create_only,
+            stats=self.stats,
+            templates=self.templates,
+        )
+
+    def write_archive(self, path: str) -> bool:
+        """Write the layout to an archive without creating it on disk.
+
+        Args:
+            path: The archive path, or ``-`` for stdout.
+
+        Returns:
+            bool: True if the archive was written successfully, False otherwise,
+                in which case an incomplete archive file is removed.
+        """
+        # stdout is looked up at call time so that redirected output is used
+        from sys import stdout
+
+        from ansible_generator.archive import (
+            ArchiveWriter,
+            get_archive_format,
+            write_plan,
+        )
+
+        archive_format = self.archive_format or get_archive_format(path)
+        opened = written = False
+        try:
+            with ExitStack() as stack:
+                if path == "-":
+                    output = stdout.buffer
+                else:
+                    try:
+                        output = stack.enter_context(open(path, "wb"))
+                    except OSError:
+                        self.logger.error("failed to open %s", path, exc_info=True)
+                        return False
+                    opened = True
+                with ArchiveWriter(
+                    output=output, archive_format=archive_format
+                ) as writer:
+                    for plan in self.iter_plans():
+                        if not write_plan(
+                            plan=plan,
+                            writer=writer,
+                            logger=self.logger,
+                            role_backend=self.role_backend,
+                            role_skeleton=self.role_skeleton,
+                            contents=self.bind_contents(plan),
+                        ):
+                            writer.abort()
+                            return False
+                output.flush()
+            written = True
+        finally:
+            if opened and not written:
+                # an incomplete archive must not be mistaken for a whole one
+                Path(path).unlink(missing_ok=True)
+        return True
+
+    async def aapply(self, plan: LayoutPlan) -> bool:
+        """Apply a layout plan without blocking the event loop.
+
+        Args:
+            plan: The layout plan to apply.
+
+        Returns:
+            bool: True if the plan was applied successfully, False otherwise.
+        """
+        from ansible_generator.aio import apply_plan_async, apply_plan_keep_going_async
+
+        if self.keep_going:
+            failures = await apply_plan_keep_going_async(
+                plan=plan,
+                logger=self.logger,
+                role_backend=self.role_backend,
+                role_skeleton=self.role_skeleton,
+                jobs=self.jobs,
+                create_only=self.create_only,
+                backend=self.backend,
+                stats=self.stats,
+                contents=self.bind_contents(plan),
+            )
+            self.failures = self.failures.merge(failures)
+            return not failures
+        return await apply_plan_async(
+            plan=plan,
+            logger=self.logger,
+            role_backend=self.role_backend,
+            role_skeleton=self.role_skeleton,
+            jobs=self.jobs,
+            create_only=self.create_only,
+            backend=self.backend,
+            stats=self.stats,
+            contents=self.bind_contents(plan),
+        )
+
+    def apply(self, plan: LayoutPlan) -> bool:
+        """Apply a layout plan with this generator's role settings.
+
+        Args:
+            plan: The layout plan to apply.
+
+        Returns:
+            bool: True if the plan was applied successfully, False otherwise.
+        """
+        if self.keep_going:
+            failures = apply_plan_keep_going(
+                plan=plan,
+                logger=self.logger,
+                role_backend=self.role_backend,
+                role_skeleton=self.role_skeleton,
+                jobs=self.jobs,
+                create_only=self.create_only,
+                backend=self.backend,
+                stats=self.stats,
+                contents=self.bind_contents(plan),
+            )
+            self.failures = self.failures.merge(failures)
+            return not failures
+        if self.atomic and self.backend is None:
+            return apply_plan_atomically(
+                plan=plan,
+                logger=self.logger,
+                role_backend=self.role_backend,
+                role_skeleton=self.role_skeleton,
+                jobs=self.jobs,
+                stats=self.stats,
+                contents=self.bind_contents(plan),
+            )
+        return apply_plan(
+            plan=plan,
+            logger=self.logger,
+            role_backend=self.role_backend,
+            role_skeleton=self.role_skeleton,
+            jobs=self.jobs,
+            create_only=self.create_only,
+            backend=self.backend,
+            stats=self.stats,
+            contents=self.bind_contents(plan),
+        )
@@ -0,0 +1,127 @@
+"""manifest persists the layout a run produced so later runs only apply the delta.
+
+The manifest records the generator's inputs and the resulting layout plan.
+When a later run has the same inputs and every recorded entry still exists,
+nothing is done at all; otherwise the whole plan is applied, skipping the
+entries which exist.
+"""
+import os
+from hashlib import sha256
+from json import dumps, loads
+from logging import Logger
+from pathlib import Path
+from typing import Any, Dict, Union
+
+from ansible_generator.plan import LayoutPlan
+
+MANIFEST_NAME = ".ansible-generator.lock"
+MANIFEST_VERSION = 1
+
+
+class Manifest:
+    """A Manifest describes the inputs and layout of a previous run."""
+
+    inputs: Dict[str, Any]
+    plan: LayoutPlan
+
+    def __init__(self, inputs: Dict[str, Any], plan: LayoutPlan) -> None:
+        """Initialize a Manifest instance
+
+        Args:
+            inputs: The JSON serializable generator inputs.
+            plan: The layout plan which was applied.
+        """
+        self.inputs = inputs
+        self.plan = plan
+
+    @property
+    def digest(self) -> str:
+        """Hash the manifest's inputs.
+
+        Returns:
+            str: The sha256 of the canonical JSON form of the inputs.
+        """
+        return digest_inputs(self.inputs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the manifest.
+
+        Returns:
+            Dict[str, Any]: The manifest as JSON serializable primitives.
+        """
+        return {
+            "version": MANIFEST_VERSION,
+            "digest": self.digest,
+            "inputs": self.inputs,
+            "plan": self.plan.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Manifest":
+        """Deserialize a manifest produced by ``to_dict``.
+
+        Args:
+            data: The serialized manifest.
+
+        Raises:
+            ValueError: The manifest was written by an incompatible version.
+
+        Returns:
+            Manifest: The deserialized manifest.
+        """
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"unsupported manifest version {data.get('version')}")
+        return cls(inputs=data["inputs"], plan=LayoutPlan.from_dict(data["plan"]))
+
+
+def digest_inputs(inputs: Dict[str, Any]) -> str:
+    """Hash generator inputs independently of key order.
+
+    Args:
+        inputs: The JSON serializable generator inputs.
+
+    Returns:
+        str: The sha256 hex digest.
+    """
+    return sha256(dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: Path, logger: Logger) -> Union[Manifest, None]:
+    """Load a manifest, ignoring one which is missing or unreadable.
+
+    Args:
+        path: The manifest path.
+        logger: A logger.
+
+    Returns:
+        Union[Manifest, None]: The manifest, or None if there is no usable one.
+    """
+    try:
+        return Manifest.from_dict(loads(path.read_text(encoding="utf-8")))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("ignoring unreadable manifest %s: %s", path, e)
+        return None
+
+
+def write_manifest(path: Path, manifest: Manifest) -> None:
+    """Atomically replace the manifest at ``path``.
+
+    The manifest gets the permissions of any other new file rather than the
+    owner-only permissions of a temporary file.
+
+    Args:
+        path: The manifest path.
+        manifest: The manifest to write.
+    """
+    from tempfile import NamedTemporaryFile
+
+    mask = os.umask(0)
+    os.umask(mask)
+    with NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f"{path.name}.", delete=False
+    ) as temporary:
+        temporary.write(dumps(manifest.to_dict(), indent=2) + "\n")
+    os.chmod(temporary.name, 0o666 & ~mask)
+    os.replace(temporary.name, path)
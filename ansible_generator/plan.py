@@ -0,0 +1,246 @@
+"""plan computes the layout that should exist before anything touches disk."""
+from logging import Logger
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Tuple
+
+from ansible_generator.directories import get_directory_paths
+from ansible_generator.files import get_file_paths, get_role_targets
+from ansible_generator.utilities import iter_batches, normalize_inventories
+
+STREAM_BATCH_SIZE = 1000
+
+
+class LayoutPlan:
+    """A LayoutPlan is the deduplicated, sorted set of directories, files and
+    roles that make up a layout. All paths are relative to the base directory
+    the plan is applied to.
+    """
+
+    directories: List[str]
+    files: List[str]
+    roles: List[Tuple[str, str]]
+
+    def __init__(
+        self,
+        directories: Iterable[str] = (),
+        files: Iterable[str] = (),
+        roles: Iterable[Tuple[str, str]] = (),
+    ) -> None:
+        """Initialize a LayoutPlan instance
+
+        Args:
+            directories (optional): The directory paths. Defaults to ().
+            files (optional): The file paths. Defaults to ().
+            roles (optional): The ``(directory, rolename)`` pairs. Defaults to ().
+        """
+        self.directories = sorted(set(directories))
+        self.files = sorted(set(files))
+        self.roles = sorted(set(roles))
+
+    def __len__(self) -> int:
+        """Count the entries in the plan.
+
+        Returns:
+            int: The number of directories, files and roles in the plan.
+        """
+        return len(self.directories) + len(self.files) + len(self.roles)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare two plans.
+
+        Args:
+            other: The object to compare against.
+
+        Returns:
+            bool: True if both plans contain the same entries.
+        """
+        if not isinstance(other, LayoutPlan):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        """Represent the plan.
+
+        Returns:
+            str: A short description of the plan's size.
+        """
+        return (
+            f"LayoutPlan(directories={len(self.directories)}, "
+            f"files={len(self.files)}, roles={len(self.roles)})"
+        )
+
+    def merge(self, *others: "LayoutPlan") -> "LayoutPlan":
+        """Combine plans into a new plan.
+
+        Args:
+            others: The plans to merge with this one.
+
+        Returns:
+            LayoutPlan: A plan containing the entries of every plan.
+        """
+        plans = (self, *others)
+        return LayoutPlan(
+            directories=[path for plan in plans for path in plan.directories],
+            files=[path for plan in plans for path in plan.files],
+            roles=[role for plan in plans for role in plan.roles],
+        )
+
+    def difference(self, *others: "LayoutPlan") -> "LayoutPlan":
+        """Remove the entries of other plans from this plan.
+
+        Args:
+            others: The plans whose entries should be removed.
+
+        Returns:
+            LayoutPlan: A plan containing the entries only this plan has.
+        """
+        return LayoutPlan(
+            directories=set(self.directories).difference(
+                *(plan.directories for plan in others)
+            ),
+            files=set(self.files).difference(*(plan.files for plan in others)),
+            roles=set(self.roles).difference(*(plan.roles for plan in others)),
+        )
+
+    def partition(self) -> Dict[str, "LayoutPlan"]:
+        """Split the plan into independent plans, one per top level path.
+
+        With projects, each project becomes its own plan.
+
+        Returns:
+            Dict[str, LayoutPlan]: The plans keyed by their top level path.
+        """
+        directories: Dict[str, List[str]] = {}
+        files: Dict[str, List[str]] = {}
+        roles: Dict[str, List[Tuple[str, str]]] = {}
+        for path in self.directories:
+            directories.setdefault(get_top_level(path), []).append(path)
+        for path in self.files:
+            files.setdefault(get_top_level(path), []).append(path)
+        for role in self.roles:
+            roles.setdefault(get_top_level(role[0]), []).append(role)
+        return {
+            name: LayoutPlan(
+                directories=directories.get(name, ()),
+                files=files.get(name, ()),
+                roles=roles.get(name, ()),
+            )
+            for name in sorted({*directories, *files, *roles})
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the plan.
+
+        Returns:
+            Dict[str, Any]: The plan as JSON serializable primitives.
+        """
+        return {
+            "directories": list(self.directories),
+            "files": list(self.files),
+            "roles": [list(role) for role in self.roles],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LayoutPlan":
+        """Deserialize a plan produced by ``to_dict``.
+
+        Args:
+            data: The serialized plan.
+
+        Returns:
+            LayoutPlan: The deserialized plan.
+        """
+        return cls(
+            directories=data.get("directories", ()),
+            files=data.get("files", ()),
+            roles=[
+                (directory, rolename) for directory, rolename in data.get("roles", ())
+            ],
+        )
+
+
+def get_top_level(path: str) -> str:
+    """Get the top level component of a path.
+
+    Args:
+        path: A relative or absolute path.
+
+    Returns:
+        str: The first component, including the leading ``/`` of absolute paths.
+    """
+    root = "/" if path.startswith("/") else ""
+    components = [part for part in path.split("/") if part not in ("", ".")]
+    return root + (components[0] if components else "")
+
+
+def build_plan(
+    logger: Logger,
+    projects: Collection[str],
+    inventories: Iterable[str],
+    roles: Iterable[str],
+    alternate_layout: bool = False,
+) -> LayoutPlan:
+    """Build the layout plan for the inputs.
+
+    Args:
+        logger: A logger.
+        projects: The project names, if any.
+        inventories: The inventory names provided by the user.
+        roles: The role names.
+        alternate_layout (optional): Use the alternate layout. Defaults to False.
+
+    Returns:
+        LayoutPlan: The plan describing the layout.
+    """
+    normalized_inventories = normalize_inventories(inventories)
+    return LayoutPlan(
+        directories=get_directory_paths(
+            logger=logger,
+            projects=projects,
+            inventories=normalized_inventories,
+            alternate_layout=alternate_layout,
+        ),
+        files=get_file_paths(
+            logger=logger,
+            projects=projects,
+            inventories=normalized_inventories,
+            alternate_layout=alternate_layout,
+        ),
+        roles=get_role_targets(projects=projects, roles=roles),
+    )
+
+
+def iter_plans(
+    logger: Logger,
+    projects: Iterable[str],
+    inventories: Iterable[str],
+    roles: Iterable[str],
+    alternate_layout: bool = False,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Iterator[LayoutPlan]:
+    """Lazily build layout plans for a stream of projects, one batch at a time.
+
+    Only a single batch of projects is held in memory, so arbitrarily large
+    project streams can be generated with bounded memory.
+
+    Args:
+        logger: A logger.
+        projects: The project names, which may be a lazy iterator.
+        inventories: The inventory names provided by the user.
+        roles: The role names.
+        alternate_layout (optional): Use the alternate layout. Defaults to False.
+        batch_size (optional): The number of projects per plan.
+            Defaults to STREAM_BATCH_SIZE.
+
+    Yields:
+        LayoutPlan: The plan for each batch of projects.
+    """
+    normalized_inventories = normalize_inventories(inventories)
+    roles = list(roles)
+    for batch in iter_batches(projects, batch_size):
+        yield build_plan(
+            logger=logger,
+            projects=batch,
+            inventories=normalized_inventories,
+            roles=roles,
+            alternate_layout=alternate_layout,
+        )
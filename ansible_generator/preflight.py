@@ -0,0 +1,154 @@
+"""preflight indexes which entries of a layout plan already exist.
+
+Rather than checking every planned path with its own ``stat``, each directory
+containing planned entries is read once with ``os.scandir`` and the results are
+kept in memory. Directories whose parent does not exist are never read.
+"""
+import os
+from logging import Logger
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from ansible_generator.plan import LayoutPlan
+
+# The names in a directory, mapped to whether each is a directory, or None
+# when the directory itself does not exist.
+Listing = Union[Dict[str, bool], None]
+
+
+class PreflightIndex:
+    """A PreflightIndex caches the listing of every directory it is asked about,
+    so that checking whether a path exists costs at most one directory read
+    per parent directory.
+    """
+
+    base: Path
+    listings: Dict[str, Listing]
+
+    def __init__(self, base: Union[Path, None] = None) -> None:
+        """Initialize a PreflightIndex instance
+
+        Args:
+            base (optional): The directory relative paths are checked in.
+                Defaults to None, which uses the current working directory.
+        """
+        self.base = Path.cwd() if base is None else base
+        self.listings = {}
+
+    def listing(self, directory: str) -> Listing:
+        """Read a directory once, memoizing its listing.
+
+        Args:
+            directory: A normalized directory, relative to the base or absolute.
+
+        Returns:
+            Listing: The directory's entries, or None if it does not exist.
+        """
+        if directory in self.listings:
+            return self.listings[directory]
+
+        name = os.path.basename(directory)
+        listing: Listing = None
+        if name in ("", ".", "..") or self.is_dir(directory):
+            try:
+                with os.scandir(self.base.joinpath(directory)) as entries:
+                    listing = {entry.name: entry.is_dir() for entry in entries}
+            except (FileNotFoundError, NotADirectoryError):
+                listing = None
+        self.listings[directory] = listing
+        return listing
+
+    def lookup(self, path: str) -> Union[bool, None]:
+        """Look a path up in its parent's listing.
+
+        Args:
+            path: A path, relative to the base or absolute.
+
+        Returns:
+            Union[bool, None]: Whether the path is a directory, or None if it
+                does not exist.
+        """
+        head, name = os.path.split(os.path.normpath(path))
+        if name in ("", ".", ".."):
+            return self.listing(os.path.normpath(path)) is not None
+        listing = self.listing(head or ".")
+        return None if listing is None else listing.get(name)
+
+    def is_dir(self, path: str) -> bool:
+        """Check whether a path is an existing directory.
+
+        Args:
+            path: A path, relative to the base or absolute.
+
+        Returns:
+            bool: True if the path exists and is a directory.
+        """
+        return bool(self.lookup(path))
+
+    def exists(self, path: str) -> bool:
+        """Check whether a path exists.
+
+        Args:
+            path: A path, relative to the base or absolute.
+
+        Returns:
+            bool: True if the path exists.
+        """
+        return self.lookup(path) is not None
+
+    def existing(
+        self, plan: LayoutPlan
+    ) -> Tuple[List[str], List[str], List[Tuple[str, str]]]:
+        """Find the entries of a plan which already exist.
+
+        Args:
+            plan: The layout plan to check.
+
+        Returns:
+            Tuple[List[str], List[str], List[Tuple[str, str]]]: The existing
+                directories, files and roles.
+        """
+        return (
+            [path for path in plan.directories if self.is_dir(path)],
+            [path for path in plan.files if self.exists(path)],
+            [
+                (directory, rolename)
+                for directory, rolename in plan.roles
+                if self.exists(os.path.join(directory, rolename))
+            ],
+        )
+
+
+def remove_existing(
+    plan: LayoutPlan,
+    logger: Logger,
+    index: Union[PreflightIndex, None] = None,
+    skip_files: bool = True,
+) -> LayoutPlan:
+    """Scan the filesystem once and drop every planned entry which exists.
+
+    Args:
+        plan: The layout plan to check.
+        logger: A logger.
+        index (optional): The preflight index to use. Defaults to None, which
+            creates one for the current working directory.
+        skip_files (optional): Drop existing files too. Defaults to True, and
+            False keeps every file so that existing ones can be touched.
+
+    Returns:
+        LayoutPlan: A plan containing only the missing entries.
+    """
+    if index is None:
+        index = PreflightIndex()
+    directories, files, roles = index.existing(plan)
+    if not skip_files:
+        files = []
+    for path in directories:
+        logger.info("directory %s exists", os.path.normpath(index.base / path))
+    for path in files:
+        logger.info("file %s exists", os.path.normpath(index.base / path))
+    return LayoutPlan(
+        directories=sorted(set(plan.directories).difference(directories)),
+        files=sorted(set(plan.files).difference(files)),
+        roles=sorted(set(plan.roles).difference(roles)),
+    )
@@ -0,0 +1,463 @@
+"""server runs ansible-generate as a long-lived generation server.
+
+The server imports the generator, resolves ``ansible-galaxy`` and reads the
+role skeletons once, then applies each request with those warm caches rather
+than paying the interpreter and import start-up for every layout. Requests are
+CLI arguments, sent by ``ansible-generate --server`` or any HTTP client over a
+Unix socket only its owner can connect to, and each one is applied in a forked
+child in the working directory it was sent from.
+
+``POST /generate`` takes an ``application/json`` object with ``argv``, ``cwd``,
+an optional ``stdin`` text and an optional ``env`` of the client's
+``FORWARDED_ENVIRONMENT``, and returns ``exit_code``, ``stdout`` (base64,
+as archives are binary) and ``stderr``. ``GET /health`` returns
+``{"status": "ok"}``.
+"""
+import sys
+from argparse import ArgumentParser, Namespace
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from logging import Logger, getLogger
+from socketserver import UnixStreamServer
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+# The largest request body accepted, which bounds inline specs and project lists.
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+# Socket permissions, so that only the server's user can send requests.
+SOCKET_UMASK = 0o177
+
+logger = getLogger(__name__)
+
+
+def warm_caches(role_skeleton: Union[str, None] = None) -> None:
+    """Load everything a generation needs before the first request arrives.
+
+    Forked requests inherit what is loaded here, so the galaxy role skeleton
+    is generated and read into memory once rather than once per request.
+    Telemetry is only imported, as each request configures it with the
+    client's environment.
+
+    Args:
+        role_skeleton (optional): The custom role skeleton requests use by
+            default. Defaults to None.
+    """
+    from os import getenv
+
+    import ansible_generator.main  # noqa: F401
+    from ansible_generator.galaxy import (
+        find_galaxy_executable,
+        get_galaxy_skeleton,
+        read_skeleton,
+    )
+
+    if not getenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY"):
+        import sentry_sdk  # noqa: F401
+        import sentry_sdk.integrations.logging  # noqa: F401
+    if find_galaxy_executable(getenv("PATH")) is None:
+        return
+    skeleton_path = get_galaxy_skeleton(logger=logger, role_skeleton=role_skeleton)
+    if skeleton_path is not None:
+        logger.debug('msg="read role skeleton" path="%s"', skeleton_path)
+        read_skeleton(str(skeleton_path))
+
+
+def check_forwarded_paths(args: Namespace) -> Union[str, None]:
+    """Check that forwarded arguments only use stdin and stdout for files.
+
+    The server writes and reads files as its own user, so paths which the
+    client could open itself are refused rather than trusted.
+
+    Args:
+        args: The parsed arguments of a request.
+
+    Returns:
+        Union[str, None]: The error for the first refused option, if any.
+    """
+    options = (
+        ("--stats", args.stats),
+        ("--archive", args.archive),
+        ("--projects-from", args.projects_from),
+        ("--spec", args.spec),
+    )
+    for option, value in options:
+        if value not in (None, "-"):
+            return f"{option} only accepts - when forwarded to a server"
+    if args.templates is not None:
+        return "--templates cannot be forwarded to a server"
+    return None
+
+
+def run_request(
+    argv: Sequence[str],
+    cwd: str,
+    stdin: Union[str, None] = None,
+    role_skeleton: Union[str, None] = None,
+    env: Union[Dict[str, str], None] = None,
+) -> Tuple[int, bytes, str]:
+    """Run ansible-generate with the given arguments, capturing its output.
+
+    This changes the process's working directory and environment, so
+    ``run_forked`` runs it in a child process.
+
+    Args:
+        argv: The command line arguments.
+        cwd: The directory to generate the layout in.
+        stdin (optional): The text read for ``--spec -`` and
+            ``--projects-from -``. Defaults to None, which reads nothing.
+        role_skeleton (optional): The custom role skeleton used unless the
+            request names one. Defaults to None.
+        env (optional): The client's values of FORWARDED_ENVIRONMENT, where a
+            missing variable is unset. Defaults to None, which keeps the
+            server's environment.
+
+    Returns:
+        Tuple[int, bytes, str]: The exit code, standard output and standard
+            error of the run.
+    """
+    from contextlib import redirect_stderr, redirect_stdout
+    from io import BytesIO, StringIO, TextIOWrapper
+    from logging import StreamHandler
+    from os import chdir, environ, getenv
+
+    from ansible_generator import build_parser, execute
+    from ansible_generator.client import FORWARDED_ENVIRONMENT
+
+    output = BytesIO()
+    stdout = TextIOWrapper(output, encoding="utf-8", write_through=True)
+    stderr = StringIO()
+    generator_logger = getLogger("ansible_generator.main")
+    generator_logger.addHandler(StreamHandler(stderr))
+    generator_logger.propagate = False
+    exit_code = 0
+    if env is not None:
+        for name in FORWARDED_ENVIRONMENT:
+            if name in env:
+                environ[name] = env[name]
+            else:
+                environ.pop(name, None)
+    try:
+        chdir(cwd)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            parser = build_parser()
+            try:
+                args = parser.parse_args(list(argv))
+                error = check_forwarded_paths(args)
+                if error is not None:
+                    parser.error(error)
+                args.server = None
+                if args.role_skeleton is None and not getenv("ANSIBLE_ROLE_SKELETON"):
+                    args.role_skeleton = role_skeleton
+                execute(
+                    parser=parser,
+                    args=args,
+                    stdin=StringIO(stdin or ""),
+                    stdout=stdout,
+                    stderr=stderr,
+                )
+            except SystemExit as e:
+                exit_code = (
+                    e.code if isinstance(e.code, int) else int(e.code is not None)
+                )
+    except Exception:
+        logger.exception("failed to run request")
+        print("ansible-generate server: request failed", file=stderr)
+        exit_code = 1
+    stdout.flush()
+    return exit_code, output.getvalue(), stderr.getvalue()
+
+
+def run_forked(
+    argv: Sequence[str],
+    cwd: str,
+    stdin: Union[str, None] = None,
+    role_skeleton: Union[str, None] = None,
+    env: Union[Dict[str, str], None] = None,
+) -> Tuple[int, bytes, str]:
+    """Run a request in a forked child, which inherits the warm caches while
+    keeping its working directory, logging and crashes away from the server.
+
+    Args:
+        argv: The command line arguments.
+        cwd: The directory to generate the layout in.
+        stdin (optional): The text read for ``--spec -`` and
+            ``--projects-from -``. Defaults to None, which reads nothing.
+        role_skeleton (optional): The custom role skeleton used unless the
+            request names one. Defaults to None.
+        env (optional): The client's values of FORWARDED_ENVIRONMENT.
+            Defaults to None, which keeps the server's environment.
+
+    Returns:
+        Tuple[int, bytes, str]: The exit code, standard output and standard
+            error of the run.
+    """
+    from os import _exit, close, fdopen, fork, pipe, waitpid
+    from pickle import dumps, loads  # nosec
+
+    from ansible_generator.log import flush_sentry
+
+    read_fd, write_fd = pipe()
+    pid = fork()
+    if pid == 0:
+        close(read_fd)
+        try:
+            result = run_request(
+                argv=argv, cwd=cwd, stdin=stdin, role_skeleton=role_skeleton, env=env
+            )
+            with fdopen(write_fd, "wb") as result_pipe:
+                result_pipe.write(dumps(result))
+            # the exit below skips the handlers which would send queued events
+            flush_sentry()
+        finally:
+            _exit(0)
+
+    close(write_fd)
+    with fdopen(read_fd, "rb") as result_pipe:
+        data = result_pipe.read()
+    waitpid(pid, 0)
+    if not data:
+        return 1, b"", "ansible-generate server: request failed\n"
+    exit_code, stdout, stderr = loads(data)  # nosec
+    return exit_code, stdout, stderr
+
+
+class GenerateHandler(BaseHTTPRequestHandler):
+    """Handle generation requests for a GenerateServer."""
+
+    def do_GET(self) -> None:
+        """Report the server's health."""
+        if self.path != "/health":
+            self.send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        self.send_json(200, {"status": "ok"})
+
+    def do_POST(self) -> None:
+        """Apply a generation request."""
+        from base64 import b64encode
+        from json import JSONDecodeError, loads
+
+        from ansible_generator.client import FORWARDED_ENVIRONMENT
+
+        if self.path != "/generate":
+            self.send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # the body cannot be read, so the connection cannot be reused
+            self.close_connection = True
+            self.send_json(400, {"error": "invalid Content-Length"})
+            return
+        if length > MAX_REQUEST_SIZE:
+            self.close_connection = True
+            self.send_json(413, {"error": "request too large"})
+            return
+        # the body is read either way, so the client sees the response
+        body = self.rfile.read(length)
+        # browsers cannot send JSON across origins without a preflight
+        if self.headers.get_content_type() != "application/json":
+            self.send_json(415, {"error": "requests must be application/json"})
+            return
+        try:
+            request = loads(body)
+            argv = request["argv"]
+            cwd = request["cwd"]
+            stdin = request.get("stdin")
+            env = request.get("env")
+            if not isinstance(argv, list) or not all(
+                isinstance(argument, str) for argument in argv
+            ):
+                raise TypeError("argv must be a list of strings")
+            if not isinstance(cwd, str):
+                raise TypeError("cwd must be a string")
+            if stdin is not None and not isinstance(stdin, str):
+                raise TypeError("stdin must be a string")
+            if env is not None and not (
+                isinstance(env, dict)
+                and all(
+                    name in FORWARDED_ENVIRONMENT and isinstance(value, str)
+                    for name, value in env.items()
+                )
+            ):
+                raise TypeError(
+                    f"env must map {', '.join(FORWARDED_ENVIRONMENT)} to strings"
+                )
+        except (JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+            self.send_json(400, {"error": f"invalid request: {e}"})
+            return
+
+        exit_code, stdout, stderr = run_forked(
+            argv=argv,
+            cwd=cwd,
+            stdin=stdin,
+            role_skeleton=getattr(self.server, "role_skeleton", None),
+            env=env,
+        )
+        self.send_json(
+            200,
+            {
+                "exit_code": exit_code,
+                "stdout": b64encode(stdout).decode("ascii"),
+                "stderr": stderr,
+            },
+        )
+
+    def send_json(self, status: int, body: Dict[str, Any]) -> None:
+        """Send a JSON response.
+
+        Args:
+            status: The HTTP status code.
+            body: The response body.
+        """
+        from json import dumps
+
+        data = dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Log requests at debug level rather than writing them to stderr.
+
+        Args:
+            format: The message format.
+            *args: The format arguments.
+        """
+        logger.debug(format, *args)
+
+    def address_string(self) -> str:
+        """Describe the client, which has no address on a Unix socket.
+
+        Returns:
+            str: The client address.
+        """
+        return "unix"
+
+
+class GenerateServer(UnixStreamServer, HTTPServer):
+    """A generation server listening on a Unix socket."""
+
+    role_skeleton: Union[str, None]
+
+    def __init__(self, address: str, role_skeleton: Union[str, None] = None) -> None:
+        """Initialize a GenerateServer instance
+
+        Args:
+            address: The socket path to listen on.
+            role_skeleton (optional): The custom role skeleton used by requests
+                which do not name one. Defaults to None.
+        """
+        UnixStreamServer.__init__(self, address, GenerateHandler)
+        self.role_skeleton = role_skeleton
+
+    def server_bind(self) -> None:
+        """Bind the socket so that only its owner can connect, skipping
+        HTTPServer's host name lookup.
+        """
+        from os import umask
+
+        previous = umask(SOCKET_UMASK)
+        try:
+            UnixStreamServer.server_bind(self)
+        finally:
+            umask(previous)
+        self.server_name = str(self.server_address)
+        self.server_port = 0
+
+
+def create_server(
+    socket_path: Union[str, None] = None, role_skeleton: Union[str, None] = None
+) -> GenerateServer:
+    """Create a generation server.
+
+    Args:
+        socket_path (optional): The Unix socket path to listen on. Defaults to
+            None, which uses ``get_default_socket``.
+        role_skeleton (optional): The custom role skeleton used by requests
+            which do not name one. Defaults to None.
+
+    Raises:
+        OSError: Another server is listening on the socket, or it could not be
+            bound.
+
+    Returns:
+        GenerateServer: The server, bound and ready to serve.
+    """
+    from errno import EADDRINUSE
+    from os import stat, unlink
+    from pathlib import Path
+    from socket import AF_UNIX, SOCK_STREAM, socket
+    from stat import S_ISSOCK
+
+    from ansible_generator.client import get_default_socket
+
+    if socket_path is None:
+        socket_path = get_default_socket()
+    Path(socket_path).parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    try:
+        is_socket = S_ISSOCK(stat(socket_path).st_mode)
+    except FileNotFoundError:
+        is_socket = False
+    if is_socket:
+        with socket(AF_UNIX, SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except ConnectionRefusedError:
+                # a stale socket left behind by a server which did not shut down
+                unlink(socket_path)
+            else:
+                raise OSError(
+                    EADDRINUSE, f"a server is already listening on {socket_path}"
+                )
+    return GenerateServer(socket_path, role_skeleton=role_skeleton)
+
+
+def serve_cli(argv: Union[List[str], None] = None) -> None:
+    """Run the ``ansible-generate serve`` command.
+
+    Args:
+        argv (optional): The arguments after ``serve``. Defaults to None, which
+            uses ``sys.argv``.
+    """
+    from logging import DEBUG, INFO
+    from os import unlink
+    from signal import SIGTERM, signal
+
+    from ansible_generator.client import get_default_socket
+    from ansible_generator.log import setup_logger
+
+    parser = ArgumentParser(
+        prog="ansible-generate serve",
+        description="Serve ansible playbook layout generation requests",
+    )
+    parser.add_argument("--socket", default=None, dest="socket", type=str)
+    parser.add_argument("--role-skeleton", default=None, dest="role_skeleton", type=str)
+    parser.add_argument("-v", "--verbose", action="store_true", dest="verbosity")
+    args = parser.parse_args(sys.argv[2:] if argv is None else argv)
+
+    server_logger: Logger = setup_logger(
+        name=__name__, log_level=DEBUG if args.verbosity else INFO
+    )
+    warm_caches(role_skeleton=args.role_skeleton)
+    socket_path = args.socket or get_default_socket()
+    try:
+        server = create_server(
+            socket_path=socket_path, role_skeleton=args.role_skeleton
+        )
+    except OSError as e:
+        parser.exit(1, f"{parser.prog}: error: {e.strerror or e}\n")
+    server_logger.info("serving on %s", socket_path)
+
+    def stop(signum: int, frame: Any) -> None:
+        raise SystemExit(0)
+
+    # exit through the finally block below, so the socket is removed
+    signal(SIGTERM, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        unlink(socket_path)
@@ -0,0 +1,281 @@
+"""shard applies a layout across several processes.
+
+Projects are split into shards, and each worker process builds and applies the
+plan for its own shard, continuing past failed projects. The output, failures
+and stats of every shard are sent back and merged in order, so a sharded run
+reports like a single ``--keep-going`` run.
+"""
+from collections import deque
+from logging import Formatter, Logger, LogRecord
+from math import ceil
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from ansible_generator.backends import DiskBackend
+from ansible_generator.executor import FailureReport, apply_plan_keep_going
+from ansible_generator.files import GALAXY_ROLE_BACKEND, NATIVE_ROLE_BACKEND
+from ansible_generator.plan import STREAM_BATCH_SIZE, build_plan
+from ansible_generator.spec import ProjectSpec, build_spec_plan
+from ansible_generator.stats import RunStats
+from ansible_generator.utilities import iter_batches
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from ansible_generator.content import LayoutTemplates
+
+# The projects or project specs of a shard.
+Shard = Tuple[List[str], Union[List[ProjectSpec], None]]
+
+# The failures, stats and log records of a shard.
+ShardResult = Tuple[FailureReport, RunStats, List[LogRecord]]
+
+
+def get_shard_size(count: Union[int, None], processes: int) -> int:
+    """Choose how many projects each shard holds.
+
+    Args:
+        count: The number of projects, or None when they are streamed.
+        processes: The number of worker processes.
+
+    Returns:
+        int: An even split of the projects across the processes, at most
+            STREAM_BATCH_SIZE so that streams and huge lists stay bounded.
+    """
+    if count is None:
+        return STREAM_BATCH_SIZE
+    return max(1, min(STREAM_BATCH_SIZE, ceil(count / processes)))
+
+
+def apply_shard(
+    projects: Sequence[str],
+    specs: Union[List[ProjectSpec], None],
+    inventories: Sequence[str],
+    roles: Sequence[str],
+    alternate_layout: bool,
+    role_backend: str,
+    role_skeleton: Union[str, None],
+    jobs: int,
+    create_only: bool,
+    base: Path,
+    level: int,
+    templates: Union["LayoutTemplates", None] = None,
+) -> ShardResult:
+    """Build and apply the plan for one shard, in a worker process.
+
+    Args:
+        projects: The projects of the shard, unused when ``specs`` is set.
+        specs: The project specs of the shard, or None.
+        inventories: The inventories to create in each project.
+        roles: The roles to create in each project.
+        alternate_layout: Whether the alternative layout should be used.
+        role_backend: The role creation backend, either ``native`` or
+            ``galaxy``.
+        role_skeleton: A custom role skeleton path for the ``galaxy`` role
+            backend.
+        jobs: The number of projects to apply concurrently within the shard.
+        create_only: Leave existing files and their times untouched rather
+            than updating their times.
+        base: The directory the layout is created in.
+        level: The logging level.
+        templates (optional): The content templates of the layout's files.
+            Defaults to None, which leaves them empty.
+
+    Returns:
+        ShardResult: The failures, stats and picklable log records of the shard.
+    """
+    from logging.handlers import BufferingHandler
+    from sys import maxsize
+
+    output = BufferingHandler(capacity=maxsize)
+    logger = Logger(name=__name__, level=level)
+    logger.addHandler(output)
+    stats = RunStats()
+    with stats.phase("plan"):
+        if specs is not None:
+            plan = build_spec_plan(logger=logger, specs=specs)
+        else:
+            plan = build_plan(
+                logger=logger,
+                projects=projects,
+                inventories=inventories,
+                roles=roles,
+                alternate_layout=alternate_layout,
+            )
+        if templates is not None:
+            plan = templates.extend(plan)
+    failures = apply_plan_keep_going(
+        plan=plan,
+        logger=logger,
+        role_backend=role_backend,
+        role_skeleton=role_skeleton,
+        jobs=jobs,
+        create_only=create_only,
+        backend=DiskBackend(base=base),
+        stats=stats,
+        contents=None if templates is None else templates.bind(plan),
+    )
+    return failures, stats, [prepare_record(record) for record in output.buffer]
+
+
+def prepare_record(record: LogRecord) -> LogRecord:
+    """Make a log record picklable by formatting its message and exception.
+
+    Args:
+        record: The record to prepare, which is modified in place.
+
+    Returns:
+        LogRecord: The record.
+    """
+    record.msg = record.getMessage()
+    record.args = None
+    if record.exc_info:
+        record.exc_text = Formatter().formatException(record.exc_info)
+        record.exc_info = None
+    return record
+
+
+def apply_shards(
+    logger: Logger,
+    projects: Iterable[str],
+    specs: Union[List[ProjectSpec], None] = None,
+    count: Union[int, None] = None,
+    processes: int = 2,
+    inventories: Sequence[str] = ("production", "staging"),
+    roles: Sequence[str] = (),
+    alternate_layout: bool = False,
+    role_backend: str = NATIVE_ROLE_BACKEND,
+    role_skeleton: Union[str, None] = None,
+    jobs: int = 1,
+    create_only: bool = True,
+    base: Union[Path, None] = None,
+    stats: Union[RunStats, None] = None,
+    templates: Union["LayoutTemplates", None] = None,
+) -> FailureReport:
+    """Apply a layout across a pool of worker processes.
+
+    Only a few shards per process are in flight at once, and another is
+    submitted as each one finishes, so streamed projects are read as the
+    workers need them and no worker waits on a slower shard.
+
+    Args:
+        logger: The logger to replay each shard's output to.
+        projects: The projects to create, which may be a lazy iterable. Unused
+            when ``specs`` is set.
+        specs (optional): Project specs to create instead of ``projects``.
+            Defaults to None.
+        count (optional): The number of projects, or None when they are
+            streamed. Defaults to None.
+        processes (optional): The number of worker processes. Defaults to 2.
+        inventories (optional): The inventories to create in each project.
+            Defaults to production and staging.
+        roles (optional): The roles to create in each project. Defaults to none.
+        alternate_layout (optional): Whether the alternative layout should be
+            used. Defaults to False.
+        role_backend (optional): The role creation backend, either ``native``
+            or ``galaxy``. Defaults to ``native``.
+        role_skeleton (optional): A custom role skeleton path for the ``galaxy``
+            role backend. Defaults to None.
+        jobs (optional): The number of projects each worker applies
+            concurrently. Defaults to 1.
+        create_only (optional): Leave existing files and their times untouched
+            rather than updating their times. Defaults to True.
+        base (optional): The directory the layout is created in. Defaults to
+            None, which uses the current working directory.
+        stats (optional): Run stats to add each shard's stats to. Defaults to
+            None.
+        templates (optional): The content templates of the layout's files,
+            which each worker renders for its own projects. Defaults to None,
+            which leaves them empty.
+
+    Returns:
+        FailureReport: The errors of every project which failed, across shards.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    base = Path.cwd() if base is None else base
+    if role_backend == GALAXY_ROLE_BACKEND:
+        from ansible_generator.galaxy import get_galaxy_skeleton
+
+        # populate the skeleton cache once rather than once per worker
+        get_galaxy_skeleton(logger=logger, role_skeleton=role_skeleton)
+
+    size = get_shard_size(count=count, processes=processes)
+    shards: Iterator[Shard]
+    if specs is None:
+        shards = ((shard, None) for shard in iter_batches(projects, size))
+    else:
+        shards = (([], shard) for shard in iter_batches(specs, size))
+    report = FailureReport()
+    logger.debug('msg="sharding projects" processes="%s" size="%s"', processes, size)
+    # shards in submission order, so that their output is replayed in order
+    pending: Deque[Tuple[Shard, "Future[ShardResult]"]] = deque()
+    running: Set["Future[ShardResult]"] = set()
+    limit = processes * 2
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        while True:
+            # finished shards behind a slow one are held, so bound them too
+            while len(running) < limit and len(pending) < limit * 2:
+                shard = next(shards, None)
+                if shard is None:
+                    break
+                future = executor.submit(
+                    apply_shard,
+                    projects=shard[0],
+                    specs=shard[1],
+                    inventories=list(inventories),
+                    roles=list(roles),
+                    alternate_layout=alternate_layout,
+                    role_backend=role_backend,
+                    role_skeleton=role_skeleton,
+                    jobs=jobs,
+                    create_only=create_only,
+                    base=base,
+                    level=logger.getEffectiveLevel(),
+                    templates=templates,
+                )
+                pending.append((shard, future))
+                running.add(future)
+            if not pending:
+                return report
+            (shard_projects, shard_specs), future = pending[0]
+            if not future.done():
+                running -= wait(running, return_when=FIRST_COMPLETED).done
+                continue
+            pending.popleft()
+            running.discard(future)
+            try:
+                failures, shard_stats, records = future.result()
+            except Exception as e:
+                names = (
+                    shard_projects
+                    if shard_specs is None
+                    else [spec.name for spec in shard_specs]
+                )
+                logger.error(
+                    "failed to apply shard %s to %s",
+                    names[0],
+                    names[-1],
+                    exc_info=True,
+                )
+                error = f"shard failed ({type(e).__name__}: {e})"
+                failures = FailureReport(
+                    attempted=len(names),
+                    failures={name: [error] for name in names},
+                )
+                shard_stats, records = RunStats(), []
+            for record in records:
+                logger.handle(record)
+            report = report.merge(failures)
+            if stats is not None:
+                stats.merge(shard_stats)
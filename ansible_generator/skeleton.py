@@ -0,0 +1,120 @@
+"""skeleton renders the standard ansible-galaxy role layout without a subprocess."""
+from string import Template
+from typing import Dict, Tuple
+
+ROLE_DIRECTORIES: Tuple[str, ...] = (
+    "defaults",
+    "files",
+    "handlers",
+    "meta",
+    "tasks",
+    "templates",
+    "tests",
+    "vars",
+)
+
+_README = """Role Name
+=========
+
+A brief description of the role goes here.
+
+Requirements
+------------
+
+Any pre-requisites that may not be covered by Ansible itself or the role should be mentioned here. For instance, if the role uses the EC2 module, it may be a good idea to mention in this section that the boto package is required.
+
+Role Variables
+--------------
+
+A description of the settable variables for this role should go here, including any variables that are in defaults/main.yml, vars/main.yml, and any variables that can/should be set via parameters to the role. Any variables that are read from other roles and/or the global scope (ie. hostvars, group vars, etc.) should be mentioned here as well.
+
+Dependencies
+------------
+
+A list of other roles hosted on Galaxy should go here, plus any details in regards to parameters that may need to be set for other roles, or variables that are used from other roles.
+
+Example Playbook
+----------------
+
+Including an example of how to use your role (for instance, with variables passed in as parameters) is always nice for users too:
+
+    - hosts: servers
+      roles:
+         - { role: username.rolename, x: 42 }
+
+License
+-------
+
+BSD
+
+Author Information
+------------------
+
+An optional section for the role authors to include contact information, or a website (HTML is not allowed).
+"""  # noqa: E501
+
+_META = """galaxy_info:
+  author: your name
+  description: your role description
+  company: your company (optional)
+
+  # If the issue tracker for your role is not on github, uncomment the
+  # next line and provide a value
+  # issue_tracker_url: http://example.com/issue/tracker
+
+  # Choose a valid license ID from https://spdx.org - some suggested licenses:
+  # - BSD-3-Clause (default)
+  # - MIT
+  # - GPL-2.0-or-later
+  # - GPL-3.0-only
+  # - Apache-2.0
+  # - CC-BY-4.0
+  license: license (GPL-2.0-or-later, MIT, etc)
+
+  min_ansible_version: 2.1
+
+  galaxy_tags: []
+    # List tags for your role here, one per line. A tag is a keyword that describes
+    # and categorizes the role. Users find roles by searching for tags. Be sure to
+    # remove the '[]' above, if you add tags to this list.
+    #
+    # NOTE: A tag is limited to a single word comprised of alphanumeric characters.
+    #       Maximum 20 tags per role.
+
+dependencies: []
+  # List your role dependencies here, one per line. Be sure to remove the '[]' above,
+  # if you add dependencies to this list.
+"""
+
+_TEST_PLAYBOOK = """---
+- hosts: localhost
+  remote_user: root
+  roles:
+    - ${role_name}
+"""
+
+ROLE_FILES: Dict[str, Template] = {
+    "README.md": Template(_README),
+    "defaults/main.yml": Template("---\n# defaults file for ${role_name}\n"),
+    "handlers/main.yml": Template("---\n# handlers file for ${role_name}\n"),
+    "meta/main.yml": Template(_META),
+    "tasks/main.yml": Template("---\n# tasks file for ${role_name}\n"),
+    "tests/inventory": Template("localhost\n\n"),
+    "tests/test.yml": Template(_TEST_PLAYBOOK),
+    "vars/main.yml": Template("---\n# vars file for ${role_name}\n"),
+}
+
+
+def render_role(rolename: str) -> Dict[str, str]:
+    """Render the contents of every file in the role skeleton.
+
+    Args:
+        rolename: The name of the role being rendered.
+
+    Returns:
+        Dict[str, str]: A mapping of role-relative file paths to their contents.
+    """
+    return {
+        path: template.substitute(role_name=rolename)
+        for path, template in ROLE_FILES.items()
+    }
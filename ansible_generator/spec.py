@@ -0,0 +1,212 @@
+"""spec loads declarative descriptions of many projects to generate at once."""
+import sys
+from json import loads
+from logging import Logger
+from pathlib import Path
+from typing import Any, Dict, List, MutableSequence, TextIO, Union
+
+from ansible_generator.plan import LayoutPlan, build_plan
+
+DEFAULT_INVENTORIES = ["production", "staging"]
+
+
+class SpecError(Exception):
+    """SpecError is raised when a spec cannot be read or is invalid."""
+
+
+class ProjectSpec:
+    """A ProjectSpec describes the layout of a single project."""
+
+    name: str
+    inventories: MutableSequence[str]
+    roles: MutableSequence[str]
+    alternate_layout: bool
+
+    def __init__(
+        self,
+        name: str,
+        inventories: Union[MutableSequence[str], None] = None,
+        roles: Union[MutableSequence[str], None] = None,
+        alternate_layout: bool = False,
+    ) -> None:
+        """Initialize a ProjectSpec instance
+
+        Args:
+            name: The name of the project directory.
+            inventories (optional): The inventories to create. Defaults to None,
+                which creates production and staging.
+            roles (optional): The roles to create. Defaults to None.
+            alternate_layout (optional): Whether the alternative layout should be
+                used. Defaults to False.
+        """
+        self.name = name
+        self.inventories = (
+            list(DEFAULT_INVENTORIES) if inventories is None else inventories
+        )
+        self.roles = [] if roles is None else roles
+        self.alternate_layout = alternate_layout
+
+    def __repr__(self) -> str:
+        """Represent the project spec.
+
+        Returns:
+            str: The project spec's name and layout.
+        """
+        return (
+            f"ProjectSpec(name={self.name!r}, inventories={self.inventories!r}, "
+            f"roles={self.roles!r}, alternate_layout={self.alternate_layout!r})"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the project spec.
+
+        Returns:
+            Dict[str, Any]: The project spec as JSON serializable primitives.
+        """
+        return {
+            "name": self.name,
+            "inventories": list(self.inventories),
+            "roles": list(self.roles),
+            "alternate_layout": self.alternate_layout,
+        }
+
+
+def parse_spec(text: str, spec_format: str) -> List[ProjectSpec]:
+    """Parse the text of a spec.
+
+    A spec is a mapping with a ``projects`` list and optional ``defaults``
+    mapping, each holding ``inventories``, ``roles`` and ``alternate_layout``.
+    Every project also requires a ``name``.
+
+    Args:
+        text: The contents of the spec.
+        spec_format: One of ``json``, ``toml`` or ``yaml``.
+
+    Raises:
+        SpecError: The spec could not be parsed or is invalid.
+
+    Returns:
+        List[ProjectSpec]: The projects described by the spec.
+    """
+    data: Any
+    try:
+        if spec_format == "json":
+            data = loads(text)
+        elif spec_format == "toml":
+            if sys.version_info >= (3, 11):
+                from tomllib import loads as toml_loads
+            else:
+                from tomli import loads as toml_loads
+            data = toml_loads(text)
+        elif spec_format == "yaml":
+            from yaml import safe_load
+
+            data = safe_load(text)
+        else:
+            raise SpecError(f"unsupported spec format {spec_format}")
+    except ImportError as e:
+        raise SpecError(f"{spec_format} specs require the {e.name} package") from e
+    except SpecError:
+        raise
+    except Exception as e:
+        raise SpecError(f"failed to parse {spec_format} spec: {e}") from e
+
+    if not isinstance(data, dict) or not isinstance(data.get("projects"), list):
+        raise SpecError("spec must be a mapping containing a projects list")
+    defaults = data.get("defaults", {})
+    if not isinstance(defaults, dict):
+        raise SpecError("spec defaults must be a mapping")
+    return [
+        parse_project_spec(project=project, defaults=defaults)
+        for project in data["projects"]
+    ]
+
+
+def parse_project_spec(project: Any, defaults: Dict[str, Any]) -> ProjectSpec:
+    """Validate a single project entry of a spec.
+
+    Args:
+        project: The project entry.
+        defaults: The spec defaults used for any missing keys.
+
+    Raises:
+        SpecError: The project entry is invalid.
+
+    Returns:
+        ProjectSpec: The project described by the entry.
+    """
+    if not isinstance(project, dict) or not isinstance(project.get("name"), str):
+        raise SpecError(f"project {project!r} must be a mapping with a name")
+    merged = {**defaults, **project}
+    unknown = set(merged) - {"name", "inventories", "roles", "alternate_layout"}
+    if unknown:
+        raise SpecError(
+            f"project {project['name']} has unknown keys {', '.join(sorted(unknown))}"
+        )
+    for key in ("inventories", "roles"):
+        value = merged.get(key, [])
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            raise SpecError(f"project {project['name']} {key} must be a list of names")
+    alternate_layout = merged.get("alternate_layout", False)
+    if not isinstance(alternate_layout, bool):
+        raise SpecError(f"project {project['name']} alternate_layout must be a bool")
+    return ProjectSpec(
+        name=merged["name"],
+        inventories=merged.get("inventories"),
+        roles=merged.get("roles"),
+        alternate_layout=alternate_layout,
+    )
+
+
+def load_spec(path: str, stdin: Union[TextIO, None] = None) -> List[ProjectSpec]:
+    """Load a spec file, choosing the format from its extension.
+
+    ``.json`` and ``.toml`` files are parsed as JSON and TOML, anything else
+    as YAML. A path of ``-`` reads a YAML (or JSON) spec from stdin.
+
+    Args:
+        path: The path to the spec file, or ``-`` for stdin.
+        stdin (optional): The stream to read for ``-``. Defaults to None, which
+            uses ``sys.stdin``.
+
+    Raises:
+        SpecError: The spec could not be read or is invalid.
+
+    Returns:
+        List[ProjectSpec]: The projects described by the spec.
+    """
+    if path == "-":
+        stream = sys.stdin if stdin is None else stdin
+        return parse_spec(text=stream.read(), spec_format="yaml")
+
+    suffix = Path(path).suffix.lower()
+    spec_format = {".json": "json", ".toml": "toml"}.get(suffix, "yaml")
+    try:
+        text = Path(path).read_text(encoding="utf-8")
+    except OSError as e:
+        raise SpecError(f"failed to read spec {path}: {e}") from e
+    return parse_spec(text=text, spec_format=spec_format)
+
+
+def build_spec_plan(logger: Logger, specs: List[ProjectSpec]) -> LayoutPlan:
+    """Build a single layout plan covering every project in a spec.
+
+    Args:
+        logger: A logger.
+        specs: The project specs.
+
+    Returns:
+        LayoutPlan: The merged plan for every project.
+    """
+    return LayoutPlan().merge(
+        *(
+            build_plan(
+                logger=logger,
+                projects=[spec.name],
+                inventories=spec.inventories,
+                roles=spec.roles,
+                alternate_layout=spec.alternate_layout,
+            )
+            for spec in specs
+        )
+    )
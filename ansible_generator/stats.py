@@ -0,0 +1,189 @@
+"""stats collects timings and counts describing a generator run."""
+from contextlib import contextmanager
+from math import ceil
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, TypeVar, Union
+
+T = TypeVar("T")
+
+
+class RunStats:
+    """RunStats accumulates the wall time of each phase of a run, how many
+    entries were created or skipped, role creation latencies and the number of
+    bytes written. It is safe to update from several threads, in which case
+    phase times are summed across threads.
+    """
+
+    phases: Dict[str, float]
+    created: Dict[str, int]
+    skipped: Dict[str, int]
+    role_latencies: List[float]
+    bytes_written: int
+    lock: Lock
+
+    def __init__(self) -> None:
+        """Initialize an empty RunStats instance"""
+        self.phases = {}
+        self.created = {"directories": 0, "files": 0, "roles": 0}
+        self.skipped = {"directories": 0, "files": 0, "roles": 0}
+        self.role_latencies = []
+        self.bytes_written = 0
+        self.lock = Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase, adding to any time already spent in it.
+
+        Args:
+            name: The name of the phase.
+
+        Yields:
+            None: Control while the phase runs.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name=name, seconds=perf_counter() - start)
+
+    def time_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Time how long an iterable takes to produce each item.
+
+        Args:
+            name: The name of the phase.
+            iterable: The iterable to time.
+
+        Yields:
+            T: Each item of the iterable.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Add time to a phase.
+
+        Args:
+            name: The name of the phase.
+            seconds: The time spent.
+        """
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, kind: str, created: int = 0, skipped: int = 0) -> None:
+        """Count created and skipped entries.
+
+        Args:
+            kind: One of ``directories``, ``files`` or ``roles``.
+            created (optional): The number of entries created. Defaults to 0.
+            skipped (optional): The number of entries skipped. Defaults to 0.
+        """
+        with self.lock:
+            self.created[kind] += created
+            self.skipped[kind] += skipped
+
+    def record_role(self, seconds: float) -> None:
+        """Record the creation of a role.
+
+        Args:
+            seconds: How long the role took to create.
+        """
+        with self.lock:
+            self.created["roles"] += 1
+            self.role_latencies.append(seconds)
+
+    def add_bytes(self, size: int) -> None:
+        """Count bytes written.
+
+        Args:
+            size: The number of bytes.
+        """
+        with self.lock:
+            self.bytes_written += size
+
+    def merge(self, *others: "RunStats") -> None:
+        """Add the times, counts and latencies of other stats to these, such as
+        those of worker processes.
+
+        Args:
+            others: The stats to add.
+        """
+        with self.lock:
+            for other in others:
+                for name, seconds in other.phases.items():
+                    self.phases[name] = self.phases.get(name, 0.0) + seconds
+                for kind, created in other.created.items():
+                    self.created[kind] += created
+                for kind, skipped in other.skipped.items():
+                    self.skipped[kind] += skipped
+                self.role_latencies.extend(other.role_latencies)
+                self.bytes_written += other.bytes_written
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Get the state to pickle, without the lock.
+
+        Returns:
+            Dict[str, Any]: The stats.
+        """
+        with self.lock:
+            return {name: value for name, value in vars(self).items() if name != "lock"}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restore pickled stats with a new lock.
+
+        Args:
+            state: The stats.
+        """
+        vars(self).update(state)
+        self.lock = Lock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the stats.
+
+        Returns:
+            Dict[str, Any]: The stats as JSON serializable primitives, with
+                times in seconds.
+        """
+        latencies = sorted(self.role_latencies)
+        return {
+            "phases": dict(self.phases),
+            "directories": {
+                "created": self.created["directories"],
+                "skipped": self.skipped["directories"],
+            },
+            "files": {
+                "created": self.created["files"],
+                "skipped": self.skipped["files"],
+            },
+            "roles": {
+                "created": self.created["roles"],
+                "skipped": self.skipped["roles"],
+                "latency": {
+                    "p50": percentile(latencies, 0.5),
+                    "p95": percentile(latencies, 0.95),
+                    "max": latencies[-1] if latencies else None,
+                },
+            },
+            "bytes_written": self.bytes_written,
+        }
+
+
+def percentile(values: List[float], fraction: float) -> Union[float, None]:
+    """Find a nearest-rank percentile.
+
+    Args:
+        values: The sorted values.
+        fraction: The percentile as a fraction, e.g. ``0.95``.
+
+    Returns:
+        Union[float, None]: The percentile, or None when there are no values.
+    """
+    if not values:
+        return None
+    return values[max(ceil(fraction * len(values)), 1) - 1]
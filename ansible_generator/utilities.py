@@ -1,13 +1,24 @@
 """utilities are functions that need to be used by multiple files."""
+from itertools import islice
+from os import fspath
 from pathlib import Path
-from typing import TYPE_CHECKING
-
-from ansible_generator.log import setup_logger
+from typing import (
+    TYPE_CHECKING,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 if TYPE_CHECKING:
     from _typeshed import StrPath
 
-logger = setup_logger(name=__name__)
+T = TypeVar("T")
 
 
 def join_cwd_and_directory_path(dir_path: "StrPath") -> Path:
@@ -19,6 +30,166 @@ def join_cwd_and_directory_path(dir_path: "StrPath") -> Path:
     Returns:
         Path: The finalized path.
     """
-    logger.debug("joining paths")
     joined_path = Path.cwd().joinpath(dir_path).resolve()
     return joined_path
+
+
+class PathResolver:
+    """A PathResolver resolves paths against a base directory which is captured
+    and resolved once. Every directory prefix is resolved a single time by
+    extending its already resolved parent, only following a component when it
+    is a symlink, so symlinked projects stay correct while sibling paths share
+    all of the work.
+    """
+
+    base: Path
+    directories: Dict[str, Path]
+
+    def __init__(self, base: Union["StrPath", None] = None) -> None:
+        """Initialize a PathResolver instance
+
+        Args:
+            base (optional): The base directory. Defaults to None, which uses the
+                current working directory.
+        """
+        self.base = (Path.cwd() if base is None else Path(base)).resolve()
+        self.directories = {}
+
+    def resolve(self, path: "StrPath") -> Path:
+        """Resolve a path against the base directory.
+
+        Args:
+            path: The path, either relative to the base directory or absolute.
+
+        Returns:
+            Path: The resolved path.
+        """
+        head, name = split_last_component(fspath(path))
+        return follow_component(self.resolve_directory(head), name)
+
+    def resolve_directory(self, directory: str) -> Path:
+        """Resolve a directory prefix, memoizing the result.
+
+        Args:
+            directory: The directory, either relative to the base directory or
+                absolute.
+
+        Returns:
+            Path: The resolved directory.
+        """
+        resolved = self.directories.get(directory)
+        if resolved is None:
+            if directory in ("", "/"):
+                resolved = self.base if directory == "" else Path("/")
+            else:
+                head, name = split_last_component(directory)
+                resolved = follow_component(self.resolve_directory(head), name)
+            self.directories[directory] = resolved
+        return resolved
+
+
+def split_last_component(path: str) -> Tuple[str, str]:
+    """Split the final component from a path.
+
+    Args:
+        path: The path to split.
+
+    Returns:
+        Tuple[str, str]: The parent, ``""`` for a relative single component or
+            ``"/"`` for a top level absolute path, and the final component.
+    """
+    head, separator, name = path.rpartition("/")
+    if separator and not head:
+        head = "/"
+    return head, name
+
+
+def follow_component(parent: Path, name: str) -> Path:
+    """Join a component to an already resolved parent, resolving it if needed.
+
+    Args:
+        parent: The resolved parent directory.
+        name: The component to join.
+
+    Returns:
+        Path: The resolved path of the component.
+    """
+    if name in ("", "."):
+        return parent
+    if name == "..":
+        return parent.parent
+    joined = parent.joinpath(name)
+    return joined.resolve() if joined.is_symlink() else joined
+
+
+def normalize_inventories(inventories: Iterable[str]) -> List[str]:
+    """Normalize inventory names into safe single path components.
+
+    Args:
+        inventories: The inventory names provided by the user.
+
+    Returns:
+        List[str]: The normalized inventory names, in the order provided.
+    """
+    normalized: List[str] = []
+    for inventory in inventories:
+        if inventory == ".":
+            normalized.append("dot")
+        elif inventory == "..":
+            normalized.append("dotdot")
+        elif inventory == "*":
+            normalized.append("star")
+        else:
+            normalized.append(inventory.split("/")[-1])
+    return normalized
+
+
+def join_project_paths(projects: Collection[str], paths: Set[str]) -> Set[str]:
+    """Prefix every path with every project, if any projects were provided.
+
+    Args:
+        projects: The project names.
+        paths: The project relative paths.
+
+    Returns:
+        Set[str]: The paths joined with each project, or the paths unchanged
+            when no projects were provided.
+    """
+    if not projects:
+        return paths
+    return {f"{project}/{path}" for project in projects for path in paths}
+
+
+def read_names(lines: Iterable[str]) -> Iterator[str]:
+    """Lazily read one name per line, such as from a file or stdin.
+
+    Blank lines and lines starting with ``#`` are skipped.
+
+    Args:
+        lines: The lines to read names from.
+
+    Yields:
+        str: Each name, stripped of surrounding whitespace.
+    """
+    for line in lines:
+        name = line.strip()
+        if name and not name.startswith("#"):
+            yield name
+
+
+def iter_batches(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Split items into consecutive batches.
+
+    Args:
+        items: The items to split, which may be a lazy iterable.
+        size: The maximum number of items in each batch.
+
+    Yields:
+        List[T]: Each batch, in order.
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
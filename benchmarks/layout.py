@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+""" Layout Benchmarks
+
+Measure how long generating layouts of increasing size takes, varying the
+number of projects, inventories and roles and the layout mode, and compare the
+results to a stored baseline. Every measurement runs in a fresh interpreter
+inside a scratch directory, so pass ``--directory`` to compare tmpfs (for
+example ``/dev/shm``) against a regular disk.
+
+Each scenario reports the median wall time, the number of filesystem calls
+seen by an audit hook, the total syscalls when ``--strace`` is given and strace
+is installed, and the peak RSS. The script exits with a non-zero status when
+any scenario regresses by more than the allowed tolerance.
+
+    python benchmarks/layout.py
+    python benchmarks/layout.py --max-projects 10000 --directory /dev/shm
+    python benchmarks/layout.py --update-baseline
+"""
+
+from argparse import ArgumentParser
+from json import dumps, loads
+from os import environ
+from pathlib import Path
+from shutil import which
+from statistics import median
+from subprocess import DEVNULL, PIPE, run  # nosec
+from sys import executable
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List, NamedTuple, Union
+
+BASELINE_PATH = Path(__file__).with_name("layout_baseline.json")
+TARGETS = ("directories", "files", "run", "rerun")
+# audit events raised by the filesystem calls the generator makes
+FILESYSTEM_EVENTS = (
+    "open",
+    "os.chmod",
+    "os.listdir",
+    "os.mkdir",
+    "os.remove",
+    "os.rename",
+    "os.rmdir",
+    "os.scandir",
+    "os.utime",
+)
+CHILD = """
+import sys
+from json import dumps
+from logging import INFO
+from resource import RUSAGE_SELF, getrusage
+from time import perf_counter
+
+target, projects, inventories, layout, roles = sys.argv[1:]
+projects = [f"project{number}" for number in range(int(projects))]
+inventories = [f"inventory{number}" for number in range(int(inventories))]
+roles = [f"role{number}" for number in range(int(roles))]
+alternate_layout = layout == "alternate"
+
+from ansible_generator.directories import create_directory_layout
+from ansible_generator.files import create_file_layout
+from ansible_generator.main import AnsibleGenerator
+
+def generate():
+    AnsibleGenerator(
+        projects=projects,
+        inventories=inventories,
+        roles=roles,
+        alternate_layout=alternate_layout,
+    ).run()
+
+if target == "files":
+    create_directory_layout(projects, inventories, alternate_layout, INFO)
+elif target == "rerun":
+    generate()
+
+calls = 0
+events = frozenset(%r)
+
+def count(event, args):
+    global calls
+    if event in events:
+        calls += 1
+
+sys.addaudithook(count)
+start = perf_counter()
+if target == "directories":
+    create_directory_layout(projects, inventories, alternate_layout, INFO)
+elif target == "files":
+    create_file_layout(projects, inventories, roles, alternate_layout, INFO)
+else:
+    generate()
+wall = perf_counter() - start
+print(dumps({
+    "wall": wall,
+    "filesystem_calls": calls,
+    "peak_rss_kb": getrusage(RUSAGE_SELF).ru_maxrss,
+}))
+""" % (
+    FILESYSTEM_EVENTS,
+)
+
+
+class Scenario(NamedTuple):
+    """A Scenario is a single layout to benchmark."""
+
+    target: str
+    projects: int
+    inventories: int = 2
+    layout: str = "default"
+    roles: int = 0
+
+    @property
+    def name(self) -> str:
+        """Name the scenario.
+
+        Returns:
+            str: A name unique to the scenario's parameters.
+        """
+        return (
+            f"{self.target}-p{self.projects}-i{self.inventories}"
+            f"-{self.layout}-r{self.roles}"
+        )
+
+
+def get_scenarios(max_projects: int) -> List[Scenario]:
+    """Build the scenarios to benchmark.
+
+    Args:
+        max_projects: The largest project count to include.
+
+    Returns:
+        List[Scenario]: The scenarios with at most ``max_projects`` projects.
+    """
+    scenarios = [
+        Scenario(target=target, projects=projects)
+        for target in TARGETS
+        for projects in (1, 100, 1000, 10000)
+    ]
+    for projects in (1, 100, 1000, 10000):
+        scenarios.extend(
+            (
+                Scenario(target="run", projects=projects, inventories=10),
+                Scenario(target="run", projects=projects, layout="alternate"),
+                Scenario(target="run", projects=projects, roles=5),
+                Scenario(
+                    target="run",
+                    projects=projects,
+                    inventories=10,
+                    layout="alternate",
+                    roles=5,
+                ),
+            )
+        )
+    return [scenario for scenario in scenarios if scenario.projects <= max_projects]
+
+
+def measure(
+    scenario: Scenario, repeat: int, directory: Union[Path, None], strace: bool
+) -> Dict[str, Any]:
+    """Measure a scenario, each time in a fresh interpreter and directory.
+
+    Args:
+        scenario: The scenario to measure.
+        repeat: The number of measurements to take.
+        directory: The directory to create scratch directories in, or None for
+            the system default.
+        strace: Count every syscall with strace, when it is installed.
+
+    Returns:
+        Dict[str, Any]: The median wall time in seconds, the filesystem calls,
+            the syscalls or None, and the largest peak RSS in KiB.
+    """
+    env = {**environ, "DISABLE_ANSIBLE_GENERATE_TELEMETRY": "1"}
+    arguments = [str(value) for value in scenario]
+    strace_executable = which("strace") if strace else None
+    results = []
+    syscalls = None
+    for _ in range(repeat):
+        with TemporaryDirectory(dir=directory) as scratch:
+            command = [executable, "-c", CHILD, *arguments]
+            if strace_executable is not None:
+                summary = Path(scratch).joinpath(".strace")
+                command = [strace_executable, "-f", "-c", "-o", str(summary), *command]
+            result = run(
+                command, cwd=scratch, env=env, stdout=PIPE, stderr=DEVNULL, text=True
+            )
+            if result.returncode != 0:
+                raise SystemExit(f"{scenario.name} exited with {result.returncode}")
+            results.append(loads(result.stdout.splitlines()[-1]))
+            if strace_executable is not None:
+                syscalls = parse_strace_total(summary.read_text(encoding="utf-8"))
+    return {
+        "wall": median(result["wall"] for result in results),
+        "filesystem_calls": results[-1]["filesystem_calls"],
+        "syscalls": syscalls,
+        "peak_rss_kb": max(result["peak_rss_kb"] for result in results),
+    }
+
+
+def parse_strace_total(summary: str) -> Union[int, None]:
+    """Read the total number of syscalls from an ``strace -c`` summary.
+
+    Args:
+        summary: The summary written by strace.
+
+    Returns:
+        Union[int, None]: The total number of calls, if found.
+    """
+    for line in summary.splitlines():
+        fields = line.split()
+        if fields and fields[-1] == "total":
+            return int(fields[3])
+    return None
+
+
+def load_baseline(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Load the stored baseline results, if any.
+
+    Args:
+        path: The path of the baseline file.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The baseline results keyed by scenario.
+    """
+    if not path.exists():
+        return {}
+    baseline: Dict[str, Dict[str, Any]] = loads(path.read_text(encoding="utf-8"))
+    return baseline
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """Compare results against the baseline.
+
+    Wall time and peak RSS may regress by ``tolerance``. Filesystem calls are
+    deterministic, so any increase is a regression.
+
+    Args:
+        results: The measured results keyed by scenario.
+        baseline: The baseline results keyed by scenario.
+        tolerance: The allowed fractional slowdown, e.g. ``0.25`` for 25%.
+
+    Returns:
+        List[str]: A description of every regression found.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        status = "no baseline"
+        if expected is not None:
+            change = (result["wall"] - expected["wall"]) / expected["wall"]
+            status = f"{change:+.1%} vs {expected['wall'] * 1000:.1f}ms"
+            if change > tolerance:
+                regressions.append(f"{name} wall time regressed {status}")
+            if result["filesystem_calls"] > expected["filesystem_calls"]:
+                regressions.append(
+                    f"{name} filesystem calls regressed "
+                    f"{expected['filesystem_calls']} -> {result['filesystem_calls']}"
+                )
+            if result["peak_rss_kb"] > expected["peak_rss_kb"] * (1 + tolerance):
+                regressions.append(
+                    f"{name} peak RSS regressed "
+                    f"{expected['peak_rss_kb']} -> {result['peak_rss_kb']} KiB"
+                )
+        syscalls = "-" if result["syscalls"] is None else result["syscalls"]
+        print(
+            f"{name:>42}: {result['wall'] * 1000:9.1f}ms "
+            f"{result['filesystem_calls']:>8} fs calls {syscalls:>8} syscalls "
+            f"{result['peak_rss_kb'] / 1024:7.1f}MiB ({status})"
+        )
+    return regressions
+
+
+def main() -> None:
+    """Run the layout benchmarks."""
+    parser = ArgumentParser(description="Benchmark ansible-generate layouts")
+    parser.add_argument("--repeat", default=3, type=int)
+    parser.add_argument("--tolerance", default=0.25, type=float)
+    parser.add_argument("--max-projects", default=1000, type=int)
+    parser.add_argument("--directory", default=None, type=Path)
+    parser.add_argument("--strace", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE_PATH, type=Path)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = {
+        scenario.name: measure(
+            scenario=scenario,
+            repeat=args.repeat,
+            directory=args.directory,
+            strace=args.strace,
+        )
+        for scenario in get_scenarios(max_projects=args.max_projects)
+    }
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results=results, baseline=baseline, tolerance=args.tolerance)
+    if args.update_baseline:
+        rounded = {
+            name: {**result, "wall": round(result["wall"], 4)}
+            for name, result in results.items()
+        }
+        args.baseline.write_text(
+            dumps({**baseline, **rounded}, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"wrote baseline to {args.baseline}")
+    elif regressions:
+        raise SystemExit("\n".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+""" Startup Benchmarks
+
+Measure the cold start wall time of ansible-generate for a few common
+invocations and compare them to a stored baseline. The script exits with a
+non-zero status when any scenario regresses by more than the allowed tolerance.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --update-baseline
+"""
+
+from argparse import ArgumentParser
+from json import dumps, loads
+from os import environ
+from pathlib import Path
+from statistics import median
+from subprocess import DEVNULL, run  # nosec
+from sys import executable
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Dict, List, Union
+
+BASELINE_PATH = Path(__file__).with_name("startup_baseline.json")
+CLI = "from ansible_generator import cli; cli()"
+SCENARIOS: Dict[str, List[str]] = {
+    "version": ["--version"],
+    "noop": ["-p", "project", "-r", "common", "web", "db", "-a"],
+    "typical": ["-p", "project", "-r", "common", "web", "db", "-a"],
+}
+
+
+def time_scenario(name: str, arguments: List[str], repeat: int) -> float:
+    """Measure the median wall time of a scenario in a fresh interpreter.
+
+    Args:
+        name: The scenario name. ``noop`` runs against an existing layout and
+            ``typical`` against an empty directory.
+        arguments: The ansible-generate arguments.
+        repeat: The number of measurements to take.
+
+    Returns:
+        float: The median wall time in seconds.
+    """
+    env = {**environ, "DISABLE_ANSIBLE_GENERATE_TELEMETRY": "1"}
+    command = [executable, "-c", CLI, *arguments]
+    timings = []
+    for _ in range(repeat):
+        with TemporaryDirectory() as directory:
+            if name == "noop":
+                run(command, cwd=directory, env=env, stdout=DEVNULL, stderr=DEVNULL)
+            start = perf_counter()
+            result = run(
+                command, cwd=directory, env=env, stdout=DEVNULL, stderr=DEVNULL
+            )
+            timings.append(perf_counter() - start)
+            if result.returncode != 0:
+                raise SystemExit(f"{name} exited with status {result.returncode}")
+    return median(timings)
+
+
+def load_baseline(path: Path) -> Dict[str, float]:
+    """Load the stored baseline timings, if any.
+
+    Args:
+        path: The path of the baseline file.
+
+    Returns:
+        Dict[str, float]: The baseline median timings keyed by scenario.
+    """
+    if not path.exists():
+        return {}
+    baseline: Dict[str, float] = loads(path.read_text(encoding="utf-8"))
+    return baseline
+
+
+def compare(
+    timings: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> List[str]:
+    """Compare timings against the baseline.
+
+    Args:
+        timings: The measured median timings keyed by scenario.
+        baseline: The baseline median timings keyed by scenario.
+        tolerance: The allowed fractional slowdown, e.g. ``0.25`` for 25%.
+
+    Returns:
+        List[str]: A description of every regression found.
+    """
+    regressions = []
+    for name, timing in timings.items():
+        expected: Union[float, None] = baseline.get(name)
+        status = "no baseline"
+        if expected is not None:
+            change = (timing - expected) / expected
+            status = f"{change:+.1%} vs {expected * 1000:.1f}ms"
+            if change > tolerance:
+                regressions.append(f"{name} regressed {status}")
+        print(f"{name:>10}: {timing * 1000:8.1f}ms ({status})")
+    return regressions
+
+
+def main() -> None:
+    """Run the startup benchmarks."""
+    parser = ArgumentParser(description="Benchmark ansible-generate startup time")
+    parser.add_argument("--repeat", default=10, type=int)
+    parser.add_argument("--tolerance", default=0.25, type=float)
+    parser.add_argument("--baseline", default=BASELINE_PATH, type=Path)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    timings = {
+        name: time_scenario(name=name, arguments=arguments, repeat=args.repeat)
+        for name, arguments in SCENARIOS.items()
+    }
+    regressions = compare(
+        timings=timings,
+        baseline=load_baseline(args.baseline),
+        tolerance=args.tolerance,
+    )
+    if args.update_baseline:
+        rounded = {name: round(timing, 4) for name, timing in timings.items()}
+        args.baseline.write_text(dumps(rounded, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote baseline to {args.baseline}")
+    elif regressions:
+        raise SystemExit("\n".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
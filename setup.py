@@ -63,7 +63,12 @@ setup(
     # your project is installed. For an analysis of "install_requires" vs pip's
     # requirements files see:
     # https://packaging.python.org/en/latest/requirements.html
-    install_requires=["sentry-sdk", "ansible"],
+    install_requires=[
+        "sentry-sdk",
+        "ansible",
+        "pyyaml",
+        'tomli; python_version < "3.11"',
+    ],
     python_requires=">=3.8",
     # List additional groups of dependencies here (e.g. development
     # dependencies). You can install these using the following syntax,
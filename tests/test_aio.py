@@ -0,0 +1,138 @@
+from asyncio import CancelledError, create_task, get_running_loop, run, sleep
+from logging import Logger, getLogger
+from pathlib import Path
+from threading import Event
+from time import perf_counter
+from typing import List, Sequence
+
+import pytest
+from pytest import MonkeyPatch
+
+from ansible_generator.backends import MemoryBackend
+from ansible_generator.galaxy import arun_galaxy_init
+from ansible_generator.main import AnsibleGenerator
+
+
+class BlockingBackend(MemoryBackend):
+    """A MemoryBackend whose directory batches wait to be released."""
+
+    started: Event
+    release: Event
+    batches: List[Sequence[str]]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.started = Event()
+        self.release = Event()
+        self.batches = []
+
+    def create_directories(
+        self, logger: Logger, dir_paths: Sequence[str], jobs: int = 1
+    ) -> bool:
+        self.batches.append(dir_paths)
+        self.started.set()
+        self.release.wait(timeout=10)
+        return super().create_directories(logger=logger, dir_paths=dir_paths)
+
+
+def test_arun_matches_run(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    synchronous = tmp_path / "sync"
+    asynchronous = tmp_path / "async"
+    synchronous.mkdir()
+    asynchronous.mkdir()
+    projects = [f"project{number}" for number in range(100)]
+    monkeypatch.chdir(synchronous)
+    AnsibleGenerator(projects=list(projects), roles=["web"]).run()
+    monkeypatch.chdir(asynchronous)
+    generator = AnsibleGenerator(projects=list(projects), roles=["web"])
+    assert run(generator.arun()) is None
+    assert sorted(
+        path.relative_to(synchronous) for path in synchronous.rglob("*")
+    ) == sorted(path.relative_to(asynchronous) for path in asynchronous.rglob("*"))
+    assert generator.stats.to_dict()["directories"]["created"] == 300
+
+    run(generator.arun())
+    assert generator.stats.to_dict()["directories"]["created"] == 0
+
+
+def test_arun_keep_going_reports_failures() -> None:
+    memory = MemoryBackend()
+    memory.write_file("b")
+    generator = AnsibleGenerator(
+        projects=["a", "b", "c"], backend=memory, keep_going=True, jobs=2
+    )
+    report = run(generator.arun())
+    assert report is not None
+    assert list(report.failures) == ["b"]
+    assert memory.exists("c/site.yml")
+
+
+def test_arun_cancellation_waits_for_the_batch_in_progress() -> None:
+    backend = BlockingBackend()
+    projects = [f"project{number}" for number in range(100)]
+    generator = AnsibleGenerator(projects=projects, backend=backend)
+
+    async def cancel() -> None:
+        task = create_task(generator.arun())
+        await get_running_loop().run_in_executor(None, backend.started.wait, 10)
+        task.cancel()
+        await sleep(0.01)
+        assert not task.done()
+        backend.release.set()
+        with pytest.raises(CancelledError):
+            await task
+
+    run(cancel())
+    assert len(backend.batches) == 1
+    assert backend.is_dir(backend.batches[0][0])
+    assert not backend.exists("project0/site.yml")
+
+
+def test_arun_galaxy_init(tmp_path: Path) -> None:
+    galaxy = tmp_path / "ansible-galaxy"
+    galaxy.write_text('#!/bin/sh\nmkdir "$2"\necho "- Role $2 was created"\n')
+    galaxy.chmod(0o755)
+    assert run(
+        arun_galaxy_init(
+            galaxy_executable=str(galaxy),
+            rolename="web",
+            directory=tmp_path,
+            logger=getLogger(),
+        )
+    )
+    assert (tmp_path / "web").is_dir()
+
+    galaxy.write_text("#!/bin/sh\necho failed >&2\n")
+    assert not run(
+        arun_galaxy_init(
+            galaxy_executable=str(galaxy),
+            rolename="db",
+            directory=tmp_path,
+            logger=getLogger(),
+        )
+    )
+
+
+def test_arun_galaxy_init_cancellation_kills_subprocess(tmp_path: Path) -> None:
+    galaxy = tmp_path / "ansible-galaxy"
+    galaxy.write_text("#!/bin/sh\nexec sleep 30\n")
+    galaxy.chmod(0o755)
+
+    async def cancel() -> None:
+        task = create_task(
+            arun_galaxy_init(
+                galaxy_executable=str(galaxy),
+                rolename="web",
+                directory=tmp_path,
+                logger=getLogger(),
+            )
+        )
+        await sleep(0.2)
+        task.cancel()
+        with pytest.raises(CancelledError):
+            await task
+
+    start = perf_counter()
+    run(cancel())
+    assert perf_counter() - start < 10
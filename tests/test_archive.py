@@ -0,0 +1,98 @@
+import tarfile
+import zipfile
+from io import BytesIO
+from logging import getLogger
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from ansible_generator.archive import ArchiveWriter, get_archive_format, write_plan
+from ansible_generator.main import AnsibleGenerator
+from ansible_generator.plan import LayoutPlan, build_plan
+
+
+def test_write_plan_to_tar() -> None:
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["project"],
+        inventories=["production"],
+        roles=["common"],
+    )
+    output = BytesIO()
+    with ArchiveWriter(output=output) as writer:
+        assert write_plan(plan=plan, writer=writer, logger=getLogger())
+    with tarfile.open(fileobj=BytesIO(output.getvalue())) as archive:
+        members = {member.name: member for member in archive.getmembers()}
+        tasks = archive.extractfile("project/roles/common/tasks/main.yml")
+        assert tasks is not None
+        assert b"tasks file for common" in tasks.read()
+    assert members["project"].isdir()
+    assert members["project/site.yml"].isfile()
+    assert members["project/roles/common/defaults"].isdir()
+    assert list(members).index("project") < list(members).index("project/roles")
+
+
+def test_write_plan_to_zip() -> None:
+    plan = LayoutPlan(directories=["a/roles"], files=["a/site.yml"])
+    output = BytesIO()
+    with ArchiveWriter(output=output, archive_format="zip") as writer:
+        assert write_plan(plan=plan, writer=writer, logger=getLogger())
+    with zipfile.ZipFile(BytesIO(output.getvalue())) as archive:
+        assert archive.namelist() == ["a/", "a/roles/", "a/site.yml"]
+
+
+def test_write_plan_rejects_parent_paths() -> None:
+    with ArchiveWriter(output=BytesIO()) as writer:
+        assert not write_plan(
+            plan=LayoutPlan(files=["../site.yml"]), writer=writer, logger=getLogger()
+        )
+
+
+def test_generator_writes_archive_without_layout(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    monkeypatch.chdir(tmp_path)
+    assert get_archive_format("layout.zip") == "zip"
+    AnsibleGenerator(projects=["project"], archive="layout.zip").run()
+    assert [path.name for path in tmp_path.iterdir()] == ["layout.zip"]
+    with zipfile.ZipFile(tmp_path / "layout.zip") as archive:
+        assert "project/staging" in archive.namelist()
+
+
+def test_generator_reports_archive_which_cannot_be_opened(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "missing" / "layout.tgz")
+    report = AnsibleGenerator(projects=["project"], archive=path).run()
+    assert report
+    assert list(report.failures) == [path]
+
+
+def test_generator_removes_incomplete_archive(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    # without ansible-galaxy, the roles fail after the layout was archived
+    monkeypatch.setenv("PATH", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    report = AnsibleGenerator(
+        projects=["project"],
+        roles=["common"],
+        role_backend="galaxy",
+        archive="layout.tgz",
+    ).run()
+    assert report
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_aborted_archive_is_not_finished() -> None:
+    output = BytesIO()
+    with ArchiveWriter(output=output, archive_format="zip") as writer:
+        writer.add_file("a/site.yml")
+        writer.abort()
+    with pytest.raises(zipfile.BadZipFile):
+        zipfile.ZipFile(BytesIO(output.getvalue()))
@@ -0,0 +1,120 @@
+from logging import getLogger
+from pathlib import Path
+
+import pytest
+from pytest import LogCaptureFixture, MonkeyPatch
+
+from ansible_generator.backends import (
+    DiskBackend,
+    FilesystemBackend,
+    MemoryBackend,
+    group_by_parent,
+)
+from ansible_generator.executor import apply_plan, dry_run_plan
+from ansible_generator.main import AnsibleGenerator
+from ansible_generator.plan import LayoutPlan, build_plan
+
+
+def test_memory_backend_matches_disk_backend(tmp_path: Path) -> None:
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["a", "b"],
+        inventories=["production", "staging"],
+        roles=["common", "web"],
+        alternate_layout=True,
+    )
+    memory = MemoryBackend()
+    assert apply_plan(plan=plan, logger=getLogger(), backend=memory)
+    assert apply_plan(plan=plan, logger=getLogger(), backend=DiskBackend(tmp_path))
+    on_disk = sorted(
+        f"{path.relative_to(tmp_path).as_posix()}{'/' if path.is_dir() else ''}"
+        for path in tmp_path.rglob("*")
+    )
+    assert memory.tree() == on_disk
+    assert (
+        memory.read("a/roles/web/meta/main.yml")
+        == (tmp_path / "a" / "roles" / "web" / "meta" / "main.yml").read_bytes()
+    )
+
+
+def test_memory_backend_dry_run_and_conflicts() -> None:
+    memory = MemoryBackend()
+    plan = LayoutPlan(directories=["project/roles"], files=["project/site.yml"])
+    assert apply_plan(plan=plan, logger=getLogger(), backend=memory)
+    report = dry_run_plan(plan=plan, logger=getLogger(), backend=memory)
+    assert report.existing_directories == ["project/roles"]
+    assert report.existing_files == ["project/site.yml"]
+    conflict = LayoutPlan(directories=["project/site.yml/group_vars"])
+    assert not apply_plan(plan=conflict, logger=getLogger(), backend=memory)
+
+
+def test_generator_with_memory_backend(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    monkeypatch.chdir(tmp_path)
+    memory = MemoryBackend()
+    projects = [f"project{number}" for number in range(200)]
+    AnsibleGenerator(projects=projects, roles=["common"], backend=memory).run()
+    assert memory.is_dir("project199/roles/common/tasks")
+    assert memory.exists("project0/staging")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_incomplete_backend_fails_on_instantiation() -> None:
+    class DirectoriesOnly(FilesystemBackend):
+        def create_directories(self, logger, dir_paths, jobs=1):  # type: ignore
+            return True
+
+    with pytest.raises(TypeError):
+        DirectoriesOnly()  # type: ignore[abstract]
+
+
+def test_group_by_parent() -> None:
+    assert group_by_parent(["b/y", "a/x/", "b/x", "a/y", "z", "a/b/c"]) == [
+        ["a/b/c"],
+        ["a/x/", "a/y"],
+        ["b/x", "b/y"],
+        ["z"],
+    ]
+
+
+def test_concurrent_disk_backend_matches_serial(
+    tmp_path: Path, caplog: LogCaptureFixture
+) -> None:
+    plan = build_plan(
+        logger=getLogger(),
+        projects=[f"project{number}" for number in range(20)],
+        inventories=["production", "staging"],
+        roles=["common"],
+        alternate_layout=True,
+    )
+    serial = tmp_path / "serial"
+    concurrent = tmp_path / "concurrent"
+    serial.mkdir()
+    concurrent.mkdir()
+    logger = getLogger("test_concurrent_disk_backend_matches_serial")
+    assert apply_plan(plan=plan, logger=logger, backend=DiskBackend(serial))
+    with caplog.at_level("INFO", logger=logger.name):
+        assert apply_plan(
+            plan=plan, logger=logger, backend=DiskBackend(concurrent), jobs=8
+        )
+    assert sorted(path.relative_to(serial) for path in serial.rglob("*")) == sorted(
+        path.relative_to(concurrent) for path in concurrent.rglob("*")
+    )
+    created = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("creating directory")
+    ]
+    assert created == sorted(created)
+    assert len(created) == len(plan.directories)
+
+
+def test_concurrent_disk_backend_stops_on_failure(tmp_path: Path) -> None:
+    (tmp_path / "blocked").write_text("")
+    backend = DiskBackend(tmp_path)
+    assert not backend.create_directories(
+        logger=getLogger(), dir_paths=["a/x", "blocked/x", "c/x"], jobs=4
+    )
+    assert (tmp_path / "a" / "x").is_dir()
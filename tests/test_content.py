@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from ansible_generator.backends import MemoryBackend
+from ansible_generator.content import LayoutTemplates, TemplateError, classify_path
+from ansible_generator.main import AnsibleGenerator
+
+
+def test_classify_path() -> None:
+    assert classify_path("site.yml") == ("site.yml", ".", "", "")
+    assert classify_path("a/production") == ("inventory", "a", "production", "")
+    assert classify_path("a/inventories/lab/hosts") == ("inventory", "a", "lab", "")
+    assert classify_path("a/inventories/lab/group_vars/all.yml") == (
+        "group_vars.yml",
+        "a",
+        "lab",
+        "all",
+    )
+    assert classify_path("a/host_vars/localhost.yml") == (
+        "host_vars.yml",
+        "a",
+        "",
+        "localhost",
+    )
+
+
+def test_templates_are_checked_when_compiled(tmp_path: Path) -> None:
+    with pytest.raises(TemplateError, match="unknown placeholder"):
+        LayoutTemplates(templates={"site.yml": "${host}"})
+    with pytest.raises(TemplateError, match="invalid template"):
+        LayoutTemplates(templates={"inventory": "$"})
+    with pytest.raises(TemplateError, match="unknown template"):
+        LayoutTemplates(templates={"README.md": ""})
+    with pytest.raises(TemplateError, match="does not exist"):
+        LayoutTemplates.from_directory(str(tmp_path / "missing"))
+
+    (tmp_path / "site.yml").write_text("# ${project}: ${roles}\n")
+    templates = LayoutTemplates.from_directory(str(tmp_path))
+    assert templates.to_dict()["site.yml"] == "# ${project}: ${roles}\n"
+
+
+def test_generator_renders_content(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    memory = MemoryBackend()
+    generator = AnsibleGenerator(
+        projects=["a", "b"],
+        roles=["common", "web"],
+        backend=memory,
+        templates=LayoutTemplates(templates={"site.yml": "# ${project}: ${roles}\n"}),
+    )
+    generator.run()
+    assert memory.read("a/site.yml") == b"# a: [common, web]\n"
+    assert memory.read("b/production") == (
+        b"[common]\n\n[web]\n\n[production:children]\ncommon\nweb\n"
+    )
+    assert memory.read("b/group_vars/all.yml").startswith(b"---\n")
+    assert b"ansible_connection: local" in memory.read("a/host_vars/localhost.yml")
+    assert generator.stats.to_dict()["bytes_written"] == sum(
+        len(content) for content in memory.files.values()
+    )
+
+
+def test_content_is_written_on_disk_without_overwriting(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a" / "inventories" / "lab").mkdir(parents=True)
+    (tmp_path / "a" / "inventories" / "lab" / "hosts").write_text("web1\n")
+    generator = AnsibleGenerator(
+        projects=["a", "b"],
+        inventories=["lab"],
+        alternate_layout=True,
+        templates=LayoutTemplates(),
+        jobs=2,
+    )
+    generator.run()
+    assert (tmp_path / "a" / "inventories" / "lab" / "hosts").read_text() == "web1\n"
+    assert (tmp_path / "b" / "inventories" / "lab" / "hosts").read_text() == "[lab]\n"
+    assert (tmp_path / "b" / "site.yml").read_text().endswith("roles: []\n")
+    assert (tmp_path / "b" / "inventories" / "lab" / "group_vars" / "all.yml").is_file()
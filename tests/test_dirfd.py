@@ -0,0 +1,79 @@
+import os
+from logging import getLogger
+from pathlib import Path
+from typing import Any, List
+
+from pytest import MonkeyPatch
+
+from ansible_generator.dirfd import (
+    DirectoryCursor,
+    create_directories_at,
+    split_path,
+    touch_files_at,
+)
+
+
+def test_split_path() -> None:
+    assert split_path("a/./b/") == [".", "a", "b"]
+    assert split_path("/srv/a") == ["/", "srv", "a"]
+    assert split_path("../a") == [".", "..", "a"]
+
+
+def test_create_directories_and_files_at(tmp_path: Path) -> None:
+    absolute = tmp_path / "absolute"
+    dir_paths = ["a/inventories/production/group_vars", "a/roles", str(absolute)]
+    filenames = ["a/inventories/production/hosts", "a/site.yml"]
+    for _ in range(2):
+        assert create_directories_at(
+            logger=getLogger(), dir_paths=dir_paths, base=tmp_path
+        )
+        assert touch_files_at(logger=getLogger(), filenames=filenames, base=tmp_path)
+    assert (tmp_path / "a" / "inventories" / "production" / "group_vars").is_dir()
+    assert (tmp_path / "a" / "roles").is_dir()
+    assert absolute.is_dir()
+    assert (tmp_path / "a" / "inventories" / "production" / "hosts").is_file()
+    assert (tmp_path / "a" / "site.yml").is_file()
+
+
+def test_create_directories_at_non_directory_target(tmp_path: Path) -> None:
+    (tmp_path / "a").touch()
+    assert not create_directories_at(
+        logger=getLogger(), dir_paths=["a/roles"], base=tmp_path
+    )
+
+
+def test_cursor_opens_each_directory_once(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    for name in "abc":
+        (tmp_path / "project" / "inventories" / name).mkdir(parents=True)
+    opened: List[Any] = []
+    real_open = os.open
+
+    def counting_open(path: Any, *args: Any, **kwargs: Any) -> int:
+        opened.append(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "open", counting_open)
+    filenames = [f"project/inventories/{name}/hosts" for name in "abc"]
+    assert touch_files_at(logger=getLogger(), filenames=filenames, base=tmp_path)
+    assert opened.count("project") == 1
+    assert opened.count("inventories") == 1
+    with DirectoryCursor(base=tmp_path) as cursor:
+        cursor.enter([".", "project"])
+    assert not cursor.stack
+
+
+def test_touch_files_at_preserves_existing_times(tmp_path: Path) -> None:
+    (tmp_path / "a").mkdir()
+    existing = tmp_path / "a" / "site.yml"
+    existing.touch()
+    os.utime(existing, (0, 0))
+    filenames = ["a/site.yml", "a/hosts"]
+    assert touch_files_at(logger=getLogger(), filenames=filenames, base=tmp_path)
+    assert existing.stat().st_mtime == 0
+    assert (tmp_path / "a" / "hosts").is_file()
+    assert touch_files_at(
+        logger=getLogger(), filenames=filenames, base=tmp_path, create_only=False
+    )
+    assert existing.stat().st_mtime > 0
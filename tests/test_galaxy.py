@@ -0,0 +1,82 @@
+from logging import getLogger
+from os import environ, pathsep
+from pathlib import Path
+
+from pytest import MonkeyPatch
+
+from ansible_generator.galaxy import (
+    SKELETON_ROLE_NAME,
+    get_galaxy_skeleton,
+    get_skeleton_cache_key,
+    materialize_role,
+)
+
+
+def test_skeleton_cache_key_depends_on_skeleton() -> None:
+    default_key = get_skeleton_cache_key(galaxy_executable="ansible-galaxy")
+    custom_key = get_skeleton_cache_key(
+        galaxy_executable="ansible-galaxy", role_skeleton="/srv/skeleton"
+    )
+    assert default_key != custom_key
+    assert default_key == get_skeleton_cache_key(galaxy_executable="ansible-galaxy")
+
+
+def test_skeleton_cache_key_depends_on_skeleton_files(tmp_path: Path) -> None:
+    skeleton = tmp_path / "skeleton"
+    (skeleton / "tasks").mkdir(parents=True)
+    (skeleton / "tasks" / "main.yml").write_text("---\n")
+    key = get_skeleton_cache_key(
+        galaxy_executable="ansible-galaxy", role_skeleton=str(skeleton)
+    )
+
+    (skeleton / "tasks" / "main.yml").write_text("---\n# changed\n")
+    assert key != get_skeleton_cache_key(
+        galaxy_executable="ansible-galaxy", role_skeleton=str(skeleton)
+    )
+
+
+def test_galaxy_skeleton_cache_hit_skips_ansible_galaxy(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    calls = tmp_path / "calls"
+    bin_directory = tmp_path / "bin"
+    bin_directory.mkdir()
+    galaxy = bin_directory / "ansible-galaxy"
+    galaxy.write_text(f'#!/bin/sh\necho "$2" >> {calls}\nmkdir -p "$2/tasks"\n')
+    galaxy.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_directory}{pathsep}{environ['PATH']}")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+    first = get_galaxy_skeleton(logger=getLogger())
+    assert first is not None and first.joinpath("tasks").is_dir()
+    assert calls.read_text() == f"{SKELETON_ROLE_NAME}\n"
+    assert get_galaxy_skeleton(logger=getLogger()) == first
+    assert calls.read_text() == f"{SKELETON_ROLE_NAME}\n"
+
+
+def test_materialize_role_substitutes_name(tmp_path: Path) -> None:
+    skeleton_path = tmp_path / "cache" / SKELETON_ROLE_NAME
+    (skeleton_path / "tasks").mkdir(parents=True)
+    (skeleton_path / "templates").mkdir()
+    (skeleton_path / "tasks" / "main.yml").write_text(
+        f"# tasks file for {SKELETON_ROLE_NAME}\n"
+    )
+
+    assert materialize_role(
+        rolename="common",
+        skeleton_path=skeleton_path,
+        directory=tmp_path,
+        logger=getLogger(),
+    )
+    assert (tmp_path / "common" / "templates").is_dir()
+    tasks = (tmp_path / "common" / "tasks" / "main.yml").read_text()
+    assert tasks == "# tasks file for common\n"
+
+    (tmp_path / "common" / "tasks" / "main.yml").write_text("# edited\n")
+    assert materialize_role(
+        rolename="common",
+        skeleton_path=skeleton_path,
+        directory=tmp_path,
+        logger=getLogger(),
+    )
+    assert (tmp_path / "common" / "tasks" / "main.yml").read_text() == "# edited\n"
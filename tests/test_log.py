@@ -0,0 +1,20 @@
+from typing import Any, List
+
+import sentry_sdk
+from pytest import MonkeyPatch
+
+from ansible_generator.log import SENTRY_SHUTDOWN_TIMEOUT, configure_sentry
+
+
+def test_configure_sentry_initializes_once(monkeypatch: MonkeyPatch) -> None:
+    calls: List[Any] = []
+    monkeypatch.delenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", raising=False)
+    monkeypatch.setattr(sentry_sdk, "init", lambda **kwargs: calls.append(kwargs))
+    configure_sentry.cache_clear()
+    try:
+        configure_sentry()
+        configure_sentry()
+    finally:
+        configure_sentry.cache_clear()
+    assert len(calls) == 1
+    assert calls[0]["shutdown_timeout"] == SENTRY_SHUTDOWN_TIMEOUT > 0
@@ -0,0 +1,88 @@
+from json import loads
+from pathlib import Path
+from os import umask
+from shutil import rmtree
+from stat import S_IMODE
+from typing import List
+
+from pytest import MonkeyPatch
+
+from ansible_generator.executor import DryRunReport
+from ansible_generator.main import AnsibleGenerator
+from ansible_generator.manifest import MANIFEST_NAME
+from ansible_generator.plan import LayoutPlan
+
+
+def generate(roles: List[str], applied: List[LayoutPlan]) -> None:
+    generator = AnsibleGenerator(projects=["project"], roles=roles)
+    apply = generator.apply
+
+    def recording_apply(plan: LayoutPlan) -> bool:
+        applied.append(plan)
+        return apply(plan=plan)
+
+    generator.apply = recording_apply  # type: ignore[method-assign]
+    generator.run()
+
+
+def test_manifest_skips_runs_with_the_same_inputs(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    monkeypatch.chdir(tmp_path)
+    applied: List[LayoutPlan] = []
+
+    generate(roles=["common"], applied=applied)
+    manifest = loads((tmp_path / MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert manifest["inputs"]["roles"] == ["common"]
+    assert "hashes" not in manifest
+    assert len(applied[0]) == len(LayoutPlan.from_dict(manifest["plan"]))
+
+    generate(roles=["common"], applied=applied)
+    assert len(applied) == 1
+
+    generate(roles=["common", "web"], applied=applied)
+    assert applied[1] == LayoutPlan.from_dict(
+        loads((tmp_path / MANIFEST_NAME).read_text(encoding="utf-8"))["plan"]
+    )
+    assert (tmp_path / "project" / "roles" / "web" / "tasks").is_dir()
+
+
+def test_manifest_restores_deleted_entries(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    monkeypatch.chdir(tmp_path)
+    applied: List[LayoutPlan] = []
+    generate(roles=["web"], applied=applied)
+
+    (tmp_path / "project" / "site.yml").unlink()
+    rmtree(tmp_path / "project" / "roles" / "web")
+    generate(roles=["web"], applied=applied)
+    assert len(applied) == 2
+    assert (tmp_path / "project" / "site.yml").is_file()
+    assert (tmp_path / "project" / "roles" / "web" / "tasks").is_dir()
+
+    (tmp_path / "project" / "site.yml").unlink()
+    generate(roles=["web", "db"], applied=applied)
+    assert (tmp_path / "project" / "site.yml").is_file()
+    assert (tmp_path / "project" / "roles" / "db" / "tasks").is_dir()
+
+
+def test_manifest_is_readable_and_used_by_dry_runs(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    monkeypatch.chdir(tmp_path)
+    previous = umask(0o022)
+    try:
+        generate(roles=["web"], applied=[])
+    finally:
+        umask(previous)
+    assert S_IMODE((tmp_path / MANIFEST_NAME).stat().st_mode) == 0o644
+
+    report = AnsibleGenerator(projects=["project"], roles=["web"]).run(dry_run=True)
+    assert isinstance(report, DryRunReport)
+    assert len(report.existing_files) == len(report.plan.files) > 0
+    assert len(report.existing_roles) == len(report.plan.roles) == 1
+    assert "create " not in report.format()
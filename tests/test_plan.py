@@ -0,0 +1,210 @@
+from logging import getLogger
+from pathlib import Path
+
+from pytest import MonkeyPatch
+
+from ansible_generator import backends
+from ansible_generator.executor import (
+    EXISTS_SYSCALLS,
+    apply_plan,
+    apply_plan_atomically,
+    apply_plan_keep_going,
+    dry_run_plan,
+    get_missing_roots,
+)
+from ansible_generator.plan import LayoutPlan, build_plan, iter_plans
+from ansible_generator.preflight import PreflightIndex, remove_existing
+
+
+def test_build_plan_default_layout() -> None:
+    plan = build_plan(
+        logger=getLogger(),
+        projects=[],
+        inventories=["production", "staging"],
+        roles=["common"],
+    )
+    assert plan.directories == ["group_vars", "host_vars", "roles"]
+    assert plan.files == ["production", "site.yml", "staging"]
+    assert plan.roles == [("roles", "common")]
+
+
+def test_build_plan_alternate_layout_with_projects() -> None:
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["b", "a"],
+        inventories=["lab/production", "."],
+        roles=["common"],
+        alternate_layout=True,
+    )
+    assert plan.directories == [
+        f"{project}/{path}"
+        for project in ("a", "b")
+        for path in (
+            "inventories/dot/group_vars",
+            "inventories/dot/host_vars",
+            "inventories/production/group_vars",
+            "inventories/production/host_vars",
+            "roles",
+        )
+    ]
+    assert "a/inventories/production/hosts" in plan.files
+    assert plan.roles == [("a/roles", "common"), ("b/roles", "common")]
+
+
+def test_plan_merge_and_serialization() -> None:
+    first = LayoutPlan(directories=["a"], files=["a/site.yml"])
+    second = LayoutPlan(directories=["a", "b"], roles=[("a/roles", "common")])
+    merged = first.merge(second)
+    assert merged.directories == ["a", "b"]
+    assert len(merged) == 4
+    assert LayoutPlan.from_dict(merged.to_dict()) == merged
+
+
+def test_apply_plan(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["project"],
+        inventories=["production"],
+        roles=["common"],
+    )
+    assert apply_plan(plan=plan, logger=getLogger())
+    assert (tmp_path / "project" / "group_vars").is_dir()
+    assert (tmp_path / "project" / "production").is_file()
+    assert (tmp_path / "project" / "roles" / "common" / "tasks").is_dir()
+
+
+def test_dry_run_plan(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "project" / "roles").mkdir(parents=True)
+    (tmp_path / "project" / "site.yml").touch()
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["project"],
+        inventories=["production"],
+        roles=["common"],
+    )
+    report = dry_run_plan(plan=plan, logger=getLogger())
+    assert report.existing_directories == ["project/roles"]
+    assert report.existing_files == ["project/site.yml"]
+    assert report.existing_roles == []
+    assert report.predicted_syscalls > len(plan)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["project"]
+    assert not (tmp_path / "project" / "group_vars").exists()
+
+    for filename in plan.files:
+        (tmp_path / filename).touch()
+    report = dry_run_plan(plan=LayoutPlan(files=plan.files), logger=getLogger())
+    assert report.predicted_syscalls == len(plan.files) * EXISTS_SYSCALLS
+
+
+def test_iter_plans_batches_projects() -> None:
+    projects = (f"project{number}" for number in range(5))
+    plans = list(
+        iter_plans(
+            logger=getLogger(),
+            projects=projects,
+            inventories=["production"],
+            roles=[],
+            batch_size=2,
+        )
+    )
+    assert [len(plan.files) for plan in plans] == [4, 4, 2]
+    assert plans[-1].directories == [
+        "project4/group_vars",
+        "project4/host_vars",
+        "project4/roles",
+    ]
+
+
+def test_apply_plan_atomically(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "project" / "roles").mkdir(parents=True)
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["project", "other"],
+        inventories=["production"],
+        roles=["common"],
+    )
+    index = PreflightIndex(base=tmp_path)
+    missing = remove_existing(plan=plan, logger=getLogger(), index=index)
+    assert get_missing_roots(plan=missing, index=index) == [
+        "other",
+        "project/group_vars",
+        "project/host_vars",
+        "project/production",
+        "project/roles/common",
+        "project/site.yml",
+    ]
+    assert apply_plan_atomically(plan=plan, logger=getLogger())
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["other", "project"]
+    assert (tmp_path / "other" / "roles" / "common" / "tasks").is_dir()
+    assert (tmp_path / "project" / "site.yml").is_file()
+
+
+def test_apply_plan_atomically_failure_leaves_layout(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(backends, "create_roles", lambda **kwargs: False)
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["project"],
+        inventories=["production"],
+        roles=["common"],
+    )
+    assert not apply_plan_atomically(plan=plan, logger=getLogger())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_apply_plan_atomically_failed_move_leaves_layout(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    rename = Path.rename
+
+    def fail_second_project(self: Path, target: Path) -> Path:
+        if Path(target) == tmp_path / "second":
+            raise PermissionError(target)
+        return rename(self, target)
+
+    monkeypatch.setattr(Path, "rename", fail_second_project)
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["first", "second"],
+        inventories=["production"],
+        roles=[],
+    )
+    assert not apply_plan_atomically(plan=plan, logger=getLogger())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_plan_partition() -> None:
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["a", "b"],
+        inventories=["production"],
+        roles=["common"],
+    )
+    partitions = plan.partition()
+    assert list(partitions) == ["a", "b"]
+    assert partitions["b"].roles == [("b/roles", "common")]
+    assert LayoutPlan().merge(*partitions.values()) == plan
+
+
+def test_apply_plan_keep_going(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "broken").touch()
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["first", "broken", "last"],
+        inventories=["production"],
+        roles=["common"],
+    )
+    for jobs in (1, 3):
+        report = apply_plan_keep_going(plan=plan, logger=getLogger(), jobs=jobs)
+        assert report.attempted == 3
+        assert list(report.failures) == ["broken"]
+        assert "UsageError" in report.failures["broken"][0]
+        assert report.format().endswith("1 of 3 projects failed:\nbroken")
+        assert (tmp_path / "last" / "roles" / "common" / "tasks").is_dir()
@@ -0,0 +1,83 @@
+import os
+from logging import getLogger
+from pathlib import Path
+from typing import Any, List
+
+from pytest import MonkeyPatch
+
+from ansible_generator.executor import apply_plan
+from ansible_generator.plan import LayoutPlan, build_plan
+from ansible_generator.preflight import PreflightIndex, remove_existing
+
+
+def test_index_reads_each_directory_once(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    (tmp_path / "project" / "roles" / "common").mkdir(parents=True)
+    (tmp_path / "project" / "site.yml").touch()
+    scanned: List[Any] = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path: Any) -> Any:
+        scanned.append(Path(path))
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    index = PreflightIndex(base=tmp_path)
+    assert index.is_dir("project/roles")
+    assert index.exists("project/site.yml")
+    assert not index.is_dir("project/site.yml")
+    assert index.exists("project/roles/common")
+    assert not index.exists("project/group_vars")
+    assert not index.exists("missing/deeper/hosts")
+    assert sorted(scanned) == [
+        tmp_path,
+        tmp_path / "project",
+        tmp_path / "project" / "roles",
+    ]
+
+
+def test_remove_existing(tmp_path: Path) -> None:
+    (tmp_path / "project" / "roles" / "common").mkdir(parents=True)
+    (tmp_path / "project" / "site.yml").touch()
+    plan = LayoutPlan(
+        directories=["project/group_vars", "project/roles"],
+        files=["project/production", "project/site.yml"],
+        roles=[("project/roles", "common"), ("project/roles", "web")],
+    )
+    missing = remove_existing(
+        plan=plan, logger=getLogger(), index=PreflightIndex(base=tmp_path)
+    )
+    assert missing.directories == ["project/group_vars"]
+    assert missing.files == ["project/production"]
+    assert missing.roles == [("project/roles", "web")]
+
+
+def test_apply_plan_skips_existing_files(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    plan = build_plan(
+        logger=getLogger(),
+        projects=["project"],
+        inventories=["production"],
+        roles=[],
+    )
+    assert apply_plan(plan=plan, logger=getLogger())
+    site = tmp_path / "project" / "site.yml"
+    os.utime(site, (0, 0))
+    assert apply_plan(plan=plan, logger=getLogger())
+    assert site.stat().st_mtime == 0
+
+
+def test_apply_plan_touches_existing_files_when_not_create_only(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "project").mkdir()
+    site = tmp_path / "project" / "site.yml"
+    site.touch()
+    os.utime(site, (0, 0))
+    plan = LayoutPlan(files=["project/site.yml"])
+    assert apply_plan(plan=plan, logger=getLogger(), create_only=False)
+    assert site.stat().st_mtime > 0
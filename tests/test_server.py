@@ -0,0 +1,207 @@
+from json import dumps, loads
+from os import environ, pathsep
+from pathlib import Path
+from stat import S_IMODE
+from threading import Thread
+from typing import Iterator, List
+
+import pytest
+from pytest import CaptureFixture, MonkeyPatch
+
+from ansible_generator.client import connect, forward
+from ansible_generator.galaxy import SKELETON_ROLE_NAME, read_skeleton
+from ansible_generator.server import GenerateServer, create_server, warm_caches
+
+
+@pytest.fixture
+def server(tmp_path: Path, monkeypatch: MonkeyPatch) -> Iterator[GenerateServer]:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    generate_server = create_server(socket_path=str(tmp_path / "server.sock"))
+    thread = Thread(target=generate_server.serve_forever, daemon=True)
+    thread.start()
+    yield generate_server
+    generate_server.shutdown()
+    generate_server.server_close()
+    thread.join()
+
+
+def test_server_health(server: GenerateServer) -> None:
+    assert S_IMODE(Path(str(server.server_address)).stat().st_mode) == 0o600
+    connection = connect(str(server.server_address))
+    connection.request("GET", "/health")
+    response = connection.getresponse()
+    assert response.status == 200
+    assert loads(response.read()) == {"status": "ok"}
+    connection.close()
+
+
+def test_server_rejects_requests_which_are_not_json(
+    server: GenerateServer, tmp_path: Path
+) -> None:
+    connection = connect(str(server.server_address))
+    connection.request(
+        "POST",
+        "/generate",
+        body=dumps({"argv": ["-p", "a"], "cwd": str(tmp_path)}),
+        headers={"Content-Type": "text/plain"},
+    )
+    response = connection.getresponse()
+    assert response.status == 415
+    response.read()
+    connection.close()
+    assert not (tmp_path / "a").exists()
+
+
+@pytest.mark.parametrize("length", ["-1", "many"])
+def test_server_rejects_invalid_content_length(
+    server: GenerateServer, length: str
+) -> None:
+    connection = connect(str(server.server_address))
+    connection.putrequest("POST", "/generate")
+    connection.putheader("Content-Type", "application/json")
+    connection.putheader("Content-Length", length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    assert "Content-Length" in loads(response.read())["error"]
+    connection.close()
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--stats", "stats.json"],
+        ["--archive", "out.tar.gz"],
+        ["--projects-from", "projects.txt"],
+        ["--spec", "spec.yml"],
+        ["--templates", "templates"],
+    ],
+)
+def test_forward_rejects_paths(
+    server: GenerateServer,
+    tmp_path: Path,
+    monkeypatch: MonkeyPatch,
+    capsys: CaptureFixture[str],
+    argv: List[str],
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    assert forward(address=str(server.server_address), argv=["-p", "a", *argv]) == 2
+    assert "forwarded to a server" in capsys.readouterr().err
+    assert not (tmp_path / "a").exists()
+
+
+def test_forward_generates_in_the_client_directory(
+    server: GenerateServer,
+    tmp_path: Path,
+    monkeypatch: MonkeyPatch,
+    capsys: CaptureFixture[str],
+) -> None:
+    project_directory = tmp_path / "layouts"
+    project_directory.mkdir()
+    monkeypatch.chdir(project_directory)
+    address = str(server.server_address)
+    exit_code = forward(
+        address=address,
+        argv=["--projects-from", "-", "-r", "web", "--stats"],
+        stdin="alpha\nbeta\n",
+    )
+    assert exit_code == 0
+    stats = loads(capsys.readouterr().out)
+    assert stats["roles"]["created"] == 2
+    assert (project_directory / "alpha" / "roles" / "web" / "tasks").is_dir()
+    assert (project_directory / "beta" / "site.yml").is_file()
+    assert Path.cwd() == project_directory
+
+    (project_directory / "gamma").write_text("")
+    assert forward(address=address, argv=["-p", "gamma", "delta", "-k"]) == 1
+    assert "gamma" in capsys.readouterr().err
+    assert (project_directory / "delta" / "site.yml").is_file()
+
+    assert forward(address=address, argv=["--jobs", "many"]) == 2
+    assert "invalid int value" in capsys.readouterr().err
+
+
+def test_forward_reports_unreachable_server(
+    tmp_path: Path, capsys: CaptureFixture[str]
+) -> None:
+    assert forward(address=str(tmp_path / "missing.sock"), argv=["-p", "a"]) == 1
+    assert "failed to reach server" in capsys.readouterr().err
+
+
+def test_warm_caches_reads_the_galaxy_skeleton(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    calls = tmp_path / "calls"
+    bin_directory = tmp_path / "bin"
+    bin_directory.mkdir()
+    galaxy = bin_directory / "ansible-galaxy"
+    galaxy.write_text(f'#!/bin/sh\necho "$2" >> {calls}\nmkdir -p "$2/tasks"\n')
+    galaxy.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_directory}{pathsep}{environ['PATH']}")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+    warm_caches()
+    assert calls.read_text() == f"{SKELETON_ROLE_NAME}\n"
+    skeleton_path = next((tmp_path / "cache").rglob(SKELETON_ROLE_NAME))
+    hits = read_skeleton.cache_info().hits
+    read_skeleton(str(skeleton_path))
+    assert read_skeleton.cache_info().hits == hits + 1
+
+
+def test_create_server_refuses_a_live_socket(
+    server: GenerateServer, tmp_path: Path
+) -> None:
+    with pytest.raises(OSError, match="already listening"):
+        create_server(socket_path=str(server.server_address))
+    connection = connect(str(server.server_address))
+    connection.request("GET", "/health")
+    assert connection.getresponse().status == 200
+    connection.close()
+
+
+def test_create_server_replaces_a_stale_socket(tmp_path: Path) -> None:
+    socket_path = str(tmp_path / "server.sock")
+    create_server(socket_path=socket_path).server_close()
+    assert Path(socket_path).exists()
+    create_server(socket_path=socket_path).server_close()
+
+
+def test_server_runs_requests_with_the_client_environment(
+    server: GenerateServer, tmp_path: Path
+) -> None:
+    calls = tmp_path / "calls"
+    bin_directory = tmp_path / "bin"
+    bin_directory.mkdir()
+    galaxy = bin_directory / "ansible-galaxy"
+    galaxy.write_text(f'#!/bin/sh\necho "$2" >> {calls}\nmkdir -p "$2/tasks"\n')
+    galaxy.chmod(0o755)
+    env = {
+        "PATH": f"{bin_directory}{pathsep}{environ['PATH']}",
+        "XDG_CACHE_HOME": str(tmp_path / "cache"),
+        "DISABLE_ANSIBLE_GENERATE_TELEMETRY": "1",
+    }
+    argv = ["-p", "a", "-r", "web", "--role-backend", "galaxy"]
+    connection = connect(str(server.server_address))
+    connection.request(
+        "POST",
+        "/generate",
+        body=dumps({"argv": argv, "cwd": str(tmp_path), "env": env}),
+        headers={"Content-Type": "application/json"},
+    )
+    response = connection.getresponse()
+    assert response.status == 200
+    assert loads(response.read())["exit_code"] == 0
+    assert calls.read_text() == f"{SKELETON_ROLE_NAME}\n"
+    assert (tmp_path / "a" / "roles" / "web" / "tasks").is_dir()
+
+    connection.request(
+        "POST",
+        "/generate",
+        body=dumps({"argv": argv, "cwd": str(tmp_path), "env": {"HOME": "/"}}),
+        headers={"Content-Type": "application/json"},
+    )
+    response = connection.getresponse()
+    assert response.status == 400
+    response.read()
+    connection.close()
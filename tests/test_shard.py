@@ -0,0 +1,89 @@
+from logging import getLogger
+from pathlib import Path
+from pickle import dumps, loads
+
+from pytest import LogCaptureFixture, MonkeyPatch
+
+from ansible_generator.main import AnsibleGenerator
+from ansible_generator.shard import apply_shards, get_shard_size
+from ansible_generator.spec import ProjectSpec
+from ansible_generator.stats import RunStats
+
+
+def test_shard_sizes() -> None:
+    assert get_shard_size(count=10, processes=4) == 3
+    assert get_shard_size(count=1, processes=4) == 1
+    assert get_shard_size(count=10**6, processes=4) == 1000
+    assert get_shard_size(count=None, processes=4) == 1000
+
+
+def test_run_stats_pickle_and_merge() -> None:
+    stats = RunStats()
+    stats.add_time(name="plan", seconds=1.0)
+    stats.count("directories", created=2)
+    stats.record_role(seconds=0.5)
+    copy = loads(dumps(stats))
+    stats.merge(copy)
+    result = stats.to_dict()
+    assert result["phases"] == {"plan": 2.0}
+    assert result["directories"]["created"] == 4
+    assert result["roles"]["created"] == 2
+
+
+def test_sharded_run_matches_serial(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    projects = [f"project{number}" for number in range(9)]
+    serial = tmp_path / "serial"
+    sharded = tmp_path / "sharded"
+    serial.mkdir()
+    sharded.mkdir()
+    monkeypatch.chdir(serial)
+    AnsibleGenerator(projects=list(projects), roles=["web"], manifest=None).run()
+    monkeypatch.chdir(sharded)
+    generator = AnsibleGenerator(projects=list(projects), roles=["web"], shards=2)
+    report = generator.run()
+    assert report is not None and not report
+    assert report.attempted == 9
+    assert sorted(path.relative_to(serial) for path in serial.rglob("*")) == sorted(
+        path.relative_to(sharded) for path in sharded.rglob("*")
+    )
+    stats = generator.stats.to_dict()
+    assert stats["directories"]["created"] == 27
+    assert stats["roles"]["created"] == 9
+
+
+def test_sharded_run_reports_failures(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "b").write_text("")
+    specs = [ProjectSpec(name=name) for name in ("a", "b", "c", "d")]
+    report = AnsibleGenerator(specs=specs, shards=2).run()
+    assert report is not None
+    assert report.attempted == 4
+    assert list(report.failures) == ["b"]
+    assert (tmp_path / "d" / "site.yml").exists()
+
+
+def test_apply_shards_replays_output_in_order(
+    tmp_path: Path, caplog: LogCaptureFixture
+) -> None:
+    projects = [f"project{number:02}" for number in range(12)]
+    logger = getLogger("test_apply_shards_replays_output_in_order")
+    with caplog.at_level("INFO", logger=logger.name):
+        # a count of one gives every project its own shard, more than are in flight
+        report = apply_shards(
+            logger=logger,
+            projects=iter(projects),
+            count=1,
+            processes=2,
+            inventories=["production"],
+            base=tmp_path,
+        )
+    assert report.attempted == 12 and not report
+    created = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("creating directory")
+    ]
+    assert created == sorted(created)
+    assert len(created) == 12 * 3
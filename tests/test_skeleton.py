@@ -0,0 +1,29 @@
+from logging import getLogger
+from pathlib import Path
+
+from ansible_generator.files import create_role, create_roles
+from ansible_generator.skeleton import ROLE_DIRECTORIES, ROLE_FILES, render_role
+
+
+def test_render_role_substitutes_name() -> None:
+    rendered = render_role("webserver")
+    assert set(rendered) == set(ROLE_FILES)
+    assert "# tasks file for webserver" in rendered["tasks/main.yml"]
+    assert "- webserver" in rendered["tests/test.yml"]
+
+
+def test_create_native_role(tmp_path: Path) -> None:
+    assert create_role(rolename="common", directory=tmp_path, logger=getLogger())
+    role_path = tmp_path / "common"
+    for role_directory in ROLE_DIRECTORIES:
+        assert (role_path / role_directory).is_dir()
+    for role_file in ROLE_FILES:
+        assert (role_path / role_file).is_file()
+
+
+def test_create_roles_concurrently(tmp_path: Path) -> None:
+    rolenames = [f"role{number}" for number in range(8)]
+    role_targets = [(str(tmp_path), rolename) for rolename in rolenames]
+    assert create_roles(role_targets=role_targets, logger=getLogger(), jobs=4)
+    for rolename in rolenames:
+        assert (tmp_path / rolename / "tasks" / "main.yml").is_file()
@@ -0,0 +1,64 @@
+from logging import getLogger
+from pathlib import Path
+
+from pytest import raises
+
+from ansible_generator.spec import SpecError, build_spec_plan, load_spec, parse_spec
+
+YAML_SPEC = """
+defaults:
+  roles: [common]
+projects:
+  - name: web
+    inventories: [production]
+  - name: db
+    alternate_layout: true
+    roles: [postgres]
+"""
+
+
+def test_parse_yaml_spec_applies_defaults() -> None:
+    web, db = parse_spec(text=YAML_SPEC, spec_format="yaml")
+    assert web.name == "web"
+    assert web.inventories == ["production"]
+    assert web.roles == ["common"]
+    assert not web.alternate_layout
+    assert db.inventories == ["production", "staging"]
+    assert db.roles == ["postgres"]
+    assert db.alternate_layout
+
+
+def test_load_json_and_toml_specs(tmp_path: Path) -> None:
+    json_spec = tmp_path / "spec.json"
+    json_spec.write_text('{"projects": [{"name": "web", "roles": ["nginx"]}]}')
+    toml_spec = tmp_path / "spec.toml"
+    toml_spec.write_text('[[projects]]\nname = "web"\nroles = ["nginx"]\n')
+    assert repr(load_spec(str(json_spec))) == repr(load_spec(str(toml_spec)))
+
+
+def test_invalid_specs_raise_spec_error(tmp_path: Path) -> None:
+    with raises(SpecError):
+        parse_spec(text="projects: web", spec_format="yaml")
+    with raises(SpecError):
+        parse_spec(text="projects: [{name: web, hosts: []}]", spec_format="yaml")
+    with raises(SpecError):
+        parse_spec(text="{", spec_format="json")
+    with raises(SpecError, match="alternate_layout must be a bool"):
+        parse_spec(
+            text='projects = [{name = "web", alternate_layout = "false"}]',
+            spec_format="toml",
+        )
+    with raises(SpecError):
+        load_spec(str(tmp_path / "missing.yml"))
+
+
+def test_build_spec_plan() -> None:
+    plan = build_spec_plan(
+        logger=getLogger(), specs=parse_spec(text=YAML_SPEC, spec_format="yaml")
+    )
+    assert "web/production" in plan.files
+    assert "db/inventories/staging/hosts" in plan.files
+    assert plan.roles == [
+        ("db/roles", "postgres"),
+        ("web/roles", "common"),
+    ]
@@ -0,0 +1,35 @@
+import sys
+from subprocess import run  # nosec
+from time import perf_counter
+
+# generous wall clock budget for a cold ``ansible-generate --version``
+VERSION_STARTUP_BUDGET = 2.0
+# modules which --version must not pay to import
+VERSION_FORBIDDEN_MODULES = (
+    "ansible_generator.galaxy",
+    "ansible_generator.main",
+    "concurrent.futures",
+    "sentry_sdk",
+    "shlex",
+    "subprocess",
+)
+
+
+def test_version_is_fast_and_only_imports_what_it_uses() -> None:
+    script = (
+        "import sys\n"
+        "sys.argv = ['ansible-generate', '--version']\n"
+        "from ansible_generator import cli\n"
+        "try:\n"
+        "    cli()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"loaded = [m for m in {VERSION_FORBIDDEN_MODULES!r} if m in sys.modules]\n"
+        "assert not loaded, loaded\n"
+    )
+    start = perf_counter()
+    result = run([sys.executable, "-c", script], capture_output=True, text=True)
+    elapsed = perf_counter() - start
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith("ansible-generate ")
+    assert elapsed < VERSION_STARTUP_BUDGET
@@ -0,0 +1,81 @@
+from json import dumps
+from pathlib import Path
+
+from pytest import MonkeyPatch
+
+from ansible_generator.backends import MemoryBackend
+from ansible_generator.main import AnsibleGenerator
+from ansible_generator.stats import RunStats, percentile
+
+
+def test_percentile() -> None:
+    assert percentile([], 0.5) is None
+    assert percentile([1.0], 0.95) == 1.0
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.95) == 95.0
+    assert percentile(values, 1.0) == 100.0
+
+
+def test_run_stats_phases() -> None:
+    stats = RunStats()
+    with stats.phase("plan"):
+        pass
+    assert list(stats.time_iter("plan", [1, 2])) == [1, 2]
+    stats.count("files", created=2, skipped=1)
+    stats.record_role(seconds=0.5)
+    stats.add_bytes(10)
+    result = stats.to_dict()
+    assert list(result["phases"]) == ["plan"]
+    assert result["files"] == {"created": 2, "skipped": 1}
+    assert result["roles"]["created"] == 1
+    assert result["roles"]["latency"] == {"p50": 0.5, "p95": 0.5, "max": 0.5}
+    assert result["bytes_written"] == 10
+    dumps(result)
+
+
+def test_generator_stats_count_created_and_skipped(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    memory = MemoryBackend()
+    generator = AnsibleGenerator(
+        projects=["a", "b"], roles=["common", "web"], backend=memory
+    )
+    generator.run()
+    first = generator.stats.to_dict()
+    assert first["directories"] == {"created": 6, "skipped": 0}
+    assert first["files"] == {"created": 6, "skipped": 0}
+    assert first["roles"]["created"] == 4
+    assert first["roles"]["latency"]["max"] is not None
+    assert first["bytes_written"] == sum(
+        len(content) for content in memory.files.values()
+    )
+    assert {"telemetry", "plan", "preflight", "directories", "files", "roles"} <= set(
+        first["phases"]
+    )
+
+    generator.run()
+    second = generator.stats.to_dict()
+    assert second["directories"] == {"created": 0, "skipped": 6}
+    assert second["files"] == {"created": 0, "skipped": 6}
+    assert second["roles"]["created"] == 0
+    assert second["roles"]["skipped"] == 4
+    assert second["bytes_written"] == 0
+    assert "telemetry" in second["phases"]
+
+
+def test_generator_stats_with_manifest(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("DISABLE_ANSIBLE_GENERATE_TELEMETRY", "1")
+    monkeypatch.chdir(tmp_path)
+    generator = AnsibleGenerator(projects=["a"], roles=["web"])
+    generator.run()
+    stats = generator.stats.to_dict()
+    assert "manifest" in stats["phases"]
+    assert stats["roles"]["created"] == 1
+    written = sum(
+        path.stat().st_size
+        for path in (tmp_path / "a" / "roles" / "web").rglob("*")
+        if path.is_file()
+    )
+    assert stats["bytes_written"] == written
@@ -1,8 +1,62 @@
-from ansible_generator.utilities import join_cwd_and_directory_path
+from ansible_generator.utilities import (
+    PathResolver,
+    iter_batches,
+    join_cwd_and_directory_path,
+    normalize_inventories,
+    read_names,
+)
 from pathlib import Path
+import pytest
 
 
 def test_join_path() -> None:
     path_extension = "roles"
     expected_path = Path.cwd().joinpath(path_extension).resolve()
     assert expected_path == join_cwd_and_directory_path(path_extension)
+
+
+def test_path_resolver_matches_resolve(tmp_path: Path) -> None:
+    tmp_path.joinpath("real", "roles").mkdir(parents=True)
+    tmp_path.joinpath("project").symlink_to(tmp_path.joinpath("real"))
+    resolver = PathResolver(base=tmp_path)
+    for path in [
+        "project/roles/web",
+        "project/../real/site.yml",
+        "./project/roles",
+        "missing/child",
+        str(tmp_path.joinpath("project", "roles")),
+    ]:
+        assert resolver.resolve(path) == tmp_path.joinpath(path).resolve()
+
+
+def test_path_resolver_memoizes_prefixes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    checked = []
+    monkeypatch.setattr(Path, "is_symlink", lambda self: checked.append(self))
+    resolver = PathResolver(base=tmp_path)
+    resolver.resolve("project/roles/web")
+    assert len(checked) == 3
+    resolver.resolve("project/roles/db")
+    assert checked[3:] == [tmp_path.joinpath("project", "roles", "db")]
+
+
+def test_normalize_inventories() -> None:
+    inventories = ["lab/production", ".", "..", "*", "staging"]
+    assert normalize_inventories(inventories) == [
+        "production",
+        "dot",
+        "dotdot",
+        "star",
+        "staging",
+    ]
+
+
+def test_read_names_skips_blank_and_comment_lines() -> None:
+    lines = ["web\n", "\n", "# comment\n", "  db  \n"]
+    assert list(read_names(lines)) == ["web", "db"]
+
+
+def test_iter_batches() -> None:
+    assert list(iter_batches(iter(range(7)), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(iter_batches([], 3)) == []